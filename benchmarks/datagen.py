@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Synthetic, seeded data for the benchmark suite.
+
+Generates packs of EN and ZH items in the packs/ layout and a SQLite database of
+users and attempts (with rollups) shaped like production data. The same seed
+always produces the same data.
+
+Usage:
+  python benchmarks/datagen.py --out /tmp/typing-bench --users 200 --attempts 50000 --packs 20 --items 2000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+EN_WORDS = (
+    "the quick brown fox jumps over lazy dog where is station museum ticket coffee please "
+    "thank you morning evening weather train city market friend family water book open close "
+    "left right street hotel room price today tomorrow yesterday beautiful small large"
+).split()
+# Common characters, so ZH texts exercise the same code paths as real packs
+ZH_CHARS = "的一是不了人我在有他这中大来上国个到说们为子和你地出道也时年得就那要下以生会自着去之过家学对可里后小么心多天而能好都然没日于起还发成事只作当想看文无开手十用主行方又如前所本见经头面公同三已老从动两长"
+TOPICS = ("travel", "food", "daily", "work", "school", "health", "shopping", "weather")
+LEVELS = ("A1", "A2", "B1", "B2")
+
+
+def en_text(rng: random.Random, length: int) -> str:
+    words: List[str] = []
+    while sum(len(w) + 1 for w in words) < length:
+        words.append(rng.choice(EN_WORDS))
+    return " ".join(words)[:length]
+
+
+def zh_text(rng: random.Random, length: int) -> str:
+    return "".join(rng.choice(ZH_CHARS) for _ in range(length))
+
+
+def text_for(lang: str, rng: random.Random, length: int) -> str:
+    return zh_text(rng, length) if lang == "zh" else en_text(rng, length)
+
+
+def typo(rng: random.Random, text: str, rate: float = 0.05) -> str:
+    """``text`` with roughly ``rate`` of its characters substituted, dropped or doubled."""
+    out = []
+    for c in text:
+        r = rng.random()
+        if r < rate / 3:
+            out.append(rng.choice(text) if text else c)
+        elif r < 2 * rate / 3:
+            continue
+        elif r < rate:
+            out.append(c + c)
+        else:
+            out.append(c)
+    return "".join(out)
+
+
+def make_item(rng: random.Random, pack_id: str, n: int, lang: str) -> Dict[str, Any]:
+    text = text_for(lang, rng, rng.randint(4, 12) if lang == "zh" else rng.randint(12, 60))
+    other = "en" if lang == "zh" else "zh"
+    item = {
+        "id": f"{pack_id}-{n:06d}",
+        "type": rng.choice(("word", "sentence")),
+        "lang": lang,
+        "text": text,
+        "translation": {other: text_for(other, rng, 20 if other == "en" else 6)},
+        "tags": sorted(rng.sample(TOPICS, 2)) + [rng.choice(LEVELS)],
+        "difficulty": {"freq_band": rng.randint(1, 5)},
+        "source": "Synthetic benchmark data",
+        "license": "CC0",
+    }
+    if lang == "zh":
+        item["romanization"] = " ".join(rng.choice(("ni3", "hao3", "xie4", "zai4", "jian4")) for _ in text)
+    return item
+
+
+def write_pack(packs_dir: Path, pack_id: str, items: int, lang: str, seed: int = 0) -> Path:
+    rng = random.Random(f"{seed}:{pack_id}")
+    pd = packs_dir / pack_id
+    pd.mkdir(parents=True, exist_ok=True)
+    other = "en" if lang == "zh" else "zh"
+    metadata = {
+        "id": pack_id,
+        "name": f"Benchmark {lang.upper()} {pack_id}",
+        "languages": [lang, other],
+        "license": "CC0",
+        "source": "benchmarks/datagen.py",
+        "topics": sorted(rng.sample(TOPICS, 3)),
+    }
+    (pd / "metadata.json").write_text(json.dumps(metadata, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    with (pd / "items.jsonl").open("w", encoding="utf-8") as f:
+        for n in range(items):
+            f.write(json.dumps(make_item(rng, pack_id, n, lang), ensure_ascii=False) + "\n")
+    return pd
+
+
+def write_packs(packs_dir: Path, packs: int, items: int, seed: int = 0) -> List[str]:
+    """``packs`` packs of ``items`` items each, alternating EN and ZH."""
+    ids = []
+    for p in range(packs):
+        lang = "zh" if p % 2 else "en"
+        pack_id = f"bench-{lang}-{p:04d}"
+        write_pack(packs_dir, pack_id, items, lang, seed)
+        ids.append(pack_id)
+    return ids
+
+
+def make_attempt(rng: random.Random, user_id: str, pack_ids: List[str], items: int) -> Dict[str, Any]:
+    """A plausible attempt with synthetic (not computed) metrics, for bulk seeding."""
+    pack_id = rng.choice(pack_ids)
+    lang = "zh" if "-zh-" in pack_id else "en"
+    target = text_for(lang, rng, rng.randint(4, 12) if lang == "zh" else rng.randint(12, 60))
+    wpm = rng.gauss(45, 12)
+    return {
+        "user_id": user_id,
+        "item_id": f"{pack_id}-{rng.randrange(items):06d}",
+        "pack_id": pack_id,
+        "lang": lang,
+        "typed_text": typo(rng, target),
+        "target_text": target,
+        "duration_ms": rng.randint(2000, 30000),
+        "metrics": {
+            "wpm": max(1.0, wpm),
+            "cpm": max(5.0, wpm * 5),
+            "cer": min(1.0, abs(rng.gauss(0.04, 0.03))),
+            "error_count": rng.randint(0, 4),
+            "accuracy": min(100.0, max(0.0, rng.gauss(95, 4))),
+            "error_heatmap": {},
+        },
+    }
+
+
+def seed_database(
+    users: int,
+    attempts: int,
+    pack_ids: List[str],
+    items: int,
+    seed: int = 0,
+    history: Optional[Dict[str, int]] = None,
+) -> None:
+    """
+    Insert ``users`` users sharing ``attempts`` attempts (skewed, like real usage),
+    plus one user per ``history`` entry with exactly that many attempts.
+
+    The database is the one named by TYPING_DB_PATH, which must be set before
+    server.database is first imported (importing it creates the schema).
+    """
+    from server import database
+    import server.achievements  # noqa: F401  (creates the achievement tables)
+
+    rng = random.Random(seed)
+
+    user_ids = [f"user-{u:05d}" for u in range(users)]
+    weights = [1.0 / (u + 1) for u in range(users)]
+    plan: List[str] = rng.choices(user_ids, weights, k=attempts) if users else []
+    for user_id, n in (history or {}).items():
+        user_ids.append(user_id)
+        plan.extend([user_id] * n)
+
+    with database.get_cursor() as cursor:
+        cursor.executemany(
+            "INSERT OR IGNORE INTO users (id, username) VALUES (?, ?)", [(u, u) for u in user_ids]
+        )
+    for start in range(0, len(plan), 5000):
+        database.record_attempts([make_attempt(rng, u, pack_ids, items) for u in plan[start:start + 5000]])
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--out", type=Path, required=True)
+    ap.add_argument("--users", type=int, default=200)
+    ap.add_argument("--attempts", type=int, default=50_000)
+    ap.add_argument("--packs", type=int, default=20)
+    ap.add_argument("--items", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    # Must be set before server.database opens its first connection
+    os.environ["TYPING_DB_PATH"] = str(args.out / "typing.db")
+    pack_ids = write_packs(args.out / "packs", args.packs, args.items, args.seed)
+    seed_database(args.users, args.attempts, pack_ids, args.items, args.seed)
+    print(f"Wrote {args.packs} packs x {args.items} items and {args.attempts} attempts by {args.users} users to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
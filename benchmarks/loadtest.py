@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+In-process load test of server.main:app.
+
+Seeds a scratch database and synthetic packs (benchmarks/datagen.py), then runs
+--concurrency closed-loop clients for --duration seconds. Each request is drawn
+from a weighted endpoint mix. Requests go straight to the ASGI app through
+httpx.ASGITransport, or over real HTTP to a uvicorn server started in this
+process (--transport uvicorn). External source fetches are served from local
+fixtures, so the run never touches the network.
+
+Reports throughput, status codes and p50/p95/p99 latency per endpoint.
+
+Usage:
+  python benchmarks/loadtest.py --concurrency 32 --duration 20
+  python benchmarks/loadtest.py --mix items=50,attempt=50 --transport uvicorn --out /tmp/load.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Default mix (relative weights), roughly the shape of production traffic
+DEFAULT_MIX = {
+    "items": 30,
+    "items_revalidate": 8,
+    "attempt": 25,
+    "packs": 8,
+    "progress": 8,
+    "history": 8,
+    "achievements": 5,
+    "streak": 4,
+    "sources": 2,
+    "attempt_batch": 2,
+}
+
+Request = Tuple[str, str, Dict[str, Any]]
+
+
+class Scenario:
+    """Builds the requests of one load test from seeded state."""
+
+    def __init__(self, rng: random.Random, users: List[str], pack_ids: List[str], items: int, sources: List[str]):
+        self.rng = rng
+        self.users = users
+        self.pack_ids = pack_ids
+        self.items = items
+        self.sources = sources
+        # (pack_id, offset) -> last ETag seen, for conditional requests
+        self.etags: Dict[Tuple[str, int], str] = {}
+
+    def _page(self) -> Tuple[str, int]:
+        # Early pages are far more popular than deep ones
+        offset = min(self.items - 1, int(self.rng.expovariate(1 / 200))) // 50 * 50
+        return self.rng.choice(self.pack_ids), offset
+
+    def _attempt(self) -> Dict[str, Any]:
+        from benchmarks.datagen import make_attempt
+
+        attempt = make_attempt(self.rng, self.rng.choice(self.users), self.pack_ids, self.items)
+        del attempt["metrics"]
+        return attempt
+
+    def build(self, name: str) -> Request:
+        rng = self.rng
+        if name == "items" or name == "items_revalidate":
+            pack_id, offset = self._page()
+            headers = {}
+            if name == "items_revalidate" and (pack_id, offset) in self.etags:
+                headers["If-None-Match"] = self.etags[(pack_id, offset)]
+            return "GET", f"/packs/{pack_id}/items", {"params": {"offset": offset, "limit": 50}, "headers": headers}
+        if name == "packs":
+            params = {"lang": rng.choice(("en", "zh"))} if rng.random() < 0.5 else {}
+            return "GET", "/packs", {"params": params}
+        if name == "attempt":
+            return "POST", "/attempts", {"json": self._attempt()}
+        if name == "attempt_batch":
+            return "POST", "/attempts/batch", {"json": {"attempts": [self._attempt() for _ in range(10)]}}
+        if name == "progress":
+            return "GET", f"/users/{rng.choice(self.users)}/progress", {}
+        if name == "history":
+            return "GET", f"/users/{rng.choice(self.users)}/attempts", {"params": {"limit": 20}}
+        if name == "achievements":
+            return "GET", f"/users/{rng.choice(self.users)}/achievements", {}
+        if name == "streak":
+            return "GET", f"/users/{rng.choice(self.users)}/streak", {}
+        if name == "sources":
+            return "GET", f"/external/sources/{rng.choice(self.sources)}", {"params": {"limit": 50}}
+        raise ValueError(f"Unknown endpoint in mix: {name}")
+
+
+def parse_mix(text: Optional[str]) -> Dict[str, float]:
+    if not text:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    unknown = set(mix) - set(DEFAULT_MIX)
+    if unknown:
+        raise SystemExit(f"Unknown endpoint(s) in --mix: {', '.join(sorted(unknown))}; known: {', '.join(DEFAULT_MIX)}")
+    return mix
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(q / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+# ---------------------------------------------------------------------------
+# Offline external sources
+
+def write_source_fixtures(fixture_dir: Path, rng: random.Random) -> Dict[str, Path]:
+    """Bodies shaped like each built-in source's upstream response, keyed by URL."""
+    from benchmarks.datagen import en_text, zh_text
+    from server.external_sources import DEFAULT_SOURCES
+
+    fixture_dir.mkdir(parents=True, exist_ok=True)
+    bodies: Dict[str, Path] = {}
+    for source_id, config in DEFAULT_SOURCES.items():
+        if config["format"] == "tatoeba":
+            target_lang = config.get("target_lang", "zh")
+            data: Any = {"results": [
+                {"text": en_text(rng, 40), "translations": [{"language": target_lang, "text": zh_text(rng, 10)}]}
+                for _ in range(500)
+            ]}
+        else:
+            data = [
+                {config["text_field"]: zh_text(rng, 2), "pinyin": "ni3 hao3", "translations": [en_text(rng, 10)]}
+                for _ in range(500)
+            ]
+        path = fixture_dir / f"{source_id}.json"
+        path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        bodies[config["url"]] = path
+    return bodies
+
+
+def stub_external_sources(bodies: Dict[str, Path]) -> None:
+    from server import external_sources
+
+    async def fetch_url(url: str) -> Path:
+        if url not in bodies:
+            raise external_sources.SourceNotAvailable(f"No offline fixture for {url}")
+        return bodies[url]
+
+    external_sources.fetch_url = fetch_url
+
+
+# ---------------------------------------------------------------------------
+# Driver
+
+async def run_load(
+    send: Callable[[str, str, Dict[str, Any]], Any],
+    scenario: Scenario,
+    mix: Dict[str, float],
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    seed: int,
+) -> Dict[str, Any]:
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    latencies: Dict[str, List[float]] = {n: [] for n in names}
+    statuses: Dict[str, Dict[str, int]] = {n: {} for n in names}
+    measure_from = time.perf_counter() + warmup
+    stop_at = measure_from + duration
+
+    async def client(n: int) -> None:
+        rng = random.Random(f"{seed}:client:{n}")
+        while True:
+            now = time.perf_counter()
+            if now >= stop_at:
+                return
+            name = rng.choices(names, weights)[0]
+            method, path, kwargs = scenario.build(name)
+            start = time.perf_counter()
+            try:
+                response = await send(method, path, kwargs)
+                status = str(response.status_code)
+                etag = response.headers.get("etag")
+                if etag and name.startswith("items"):
+                    scenario.etags[(path.split("/")[2], kwargs["params"]["offset"])] = etag
+            except Exception as exc:  # keep loading; the failure is counted
+                status = type(exc).__name__
+            elapsed = time.perf_counter() - start
+            if start >= measure_from:
+                latencies[name].append(elapsed)
+                statuses[name][status] = statuses[name].get(status, 0) + 1
+
+    await asyncio.gather(*(client(n) for n in range(concurrency)))
+
+    endpoints = {}
+    total = 0
+    for name in names:
+        values = sorted(latencies[name])
+        total += len(values)
+        endpoints[name] = {
+            "requests": len(values),
+            "rps": len(values) / duration,
+            "statuses": statuses[name],
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "max_ms": (values[-1] if values else 0.0) * 1000,
+        }
+    return {"requests": total, "rps": total / duration, "endpoints": endpoints}
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"\n{'endpoint':<18} {'requests':>9} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  statuses")
+    for name, r in sorted(report["endpoints"].items(), key=lambda kv: -kv[1]["requests"]):
+        codes = " ".join(f"{k}:{v}" for k, v in sorted(r["statuses"].items()))
+        print(
+            f"{name:<18} {r['requests']:>9} {r['rps']:>9.1f} {r['p50_ms']:>9.2f} "
+            f"{r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f}  {codes}"
+        )
+    print(f"{'total':<18} {report['requests']:>9} {report['rps']:>9.1f}")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def drive(args: argparse.Namespace, scenario: Scenario, mix: Dict[str, float]) -> Dict[str, Any]:
+    import httpx
+    from server.main import app
+
+    async def run(client: "httpx.AsyncClient") -> Dict[str, Any]:
+        async def send(method: str, path: str, kwargs: Dict[str, Any]):
+            return await client.request(method, path, **kwargs)
+        return await run_load(send, scenario, mix, args.concurrency, args.duration, args.warmup, args.seed)
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    if args.transport == "asgi":
+        # ASGITransport does not run the lifespan, so enter it here
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+                return await run(client)
+
+    import uvicorn
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.ensure_future(server.serve())
+    while not server.started:
+        if serving.done():
+            serving.result()
+        await asyncio.sleep(0.05)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            return await run(client)
+    finally:
+        server.should_exit = True
+        await serving
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--mix", help=f"endpoint=weight,... (default: {','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items())})")
+    ap.add_argument("--concurrency", type=int, default=16)
+    ap.add_argument("--duration", type=float, default=10.0, help="measured seconds")
+    ap.add_argument("--warmup", type=float, default=2.0, help="seconds of load before measuring")
+    ap.add_argument("--transport", choices=["asgi", "uvicorn"], default="asgi")
+    ap.add_argument("--users", type=int, default=200)
+    ap.add_argument("--history", type=int, default=20_000, help="attempts seeded across users")
+    ap.add_argument("--packs", type=int, default=10)
+    ap.add_argument("--items", type=int, default=2_000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", type=Path, help="also write the report as JSON")
+    args = ap.parse_args()
+    mix = parse_mix(args.mix)
+
+    with tempfile.TemporaryDirectory(prefix="typing-load-") as tmp:
+        work = Path(tmp)
+        # Must be set before server.database opens its first connection
+        os.environ["TYPING_DB_PATH"] = str(work / "typing.db")
+        os.environ["TYPING_SOURCE_SYNC_INTERVAL_S"] = "0"
+        from benchmarks.datagen import seed_database, write_packs
+        from server import packs
+
+        print("Seeding data...", file=sys.stderr)
+        pack_ids = write_packs(work / "packs", args.packs, args.items, args.seed)
+        packs.PACKS_DIR = work / "packs"
+        seed_database(args.users, args.history, pack_ids, args.items, args.seed)
+
+        rng = random.Random(args.seed)
+        bodies = write_source_fixtures(work / "sources", rng)
+        stub_external_sources(bodies)
+        from server.external_sources import DEFAULT_SOURCES
+
+        users = [f"user-{u:05d}" for u in range(args.users)]
+        scenario = Scenario(rng, users, pack_ids, args.items, list(DEFAULT_SOURCES))
+        print(
+            f"Running {args.concurrency} clients for {args.duration:g}s (+{args.warmup:g}s warmup) "
+            f"over {args.transport}...", file=sys.stderr,
+        )
+        report = asyncio.run(drive(args, scenario, mix))
+
+    print_report(report)
+    if args.out:
+        report["params"] = {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()}
+        report["mix"] = mix
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the backend hot paths.
+
+Generates seeded synthetic data (benchmarks/datagen.py) in a scratch directory,
+then times:
+
+  compute_metrics        per call, by text length, EN and ZH
+  get_pack_items         per page of 50, by offset depth (JSONL index and items.bin)
+  list_packs             cold (first scan) and warm, by pack count
+  record_attempt         attempts/s, one transaction each and batched via record_attempts
+  check_achievements     per call, by the user's history size
+  get_user_stats         per call, by the user's history size
+
+Results are written as JSON. Pass --baseline to compare against an earlier
+results file; changes beyond --threshold are reported as regressions (and fail
+the run with --fail-on-regression). Timings are the best of --repeat rounds.
+
+Usage:
+  python benchmarks/run.py --quick
+  python benchmarks/run.py --out benchmarks/results/latest.json --baseline benchmarks/results/baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+SCALES = {
+    "quick": {
+        "users": 50, "attempts": 5_000, "items": 5_000, "pack_counts": [10, 100],
+        "history": [10, 100, 1_000], "text_lengths": [16, 64, 256], "writes": 200,
+    },
+    "full": {
+        "users": 500, "attempts": 200_000, "items": 50_000, "pack_counts": [10, 100, 1_000],
+        "history": [10, 100, 1_000, 10_000], "text_lengths": [16, 64, 256, 1_024], "writes": 2_000,
+    },
+}
+PAGE = 50
+
+
+class Suite:
+    def __init__(self, repeat: int):
+        self.repeat = repeat
+        self.results: List[Dict[str, Any]] = []
+
+    def record(self, name: str, value: float, unit: str, higher_is_better: bool = False) -> None:
+        self.results.append({"name": name, "value": value, "unit": unit, "higher_is_better": higher_is_better})
+        print(f"  {name:<44} {value:>12.2f} {unit}", file=sys.stderr)
+
+    def per_call(self, name: str, fn: Callable[[], Any], number: int) -> None:
+        """Best-of-``repeat`` time per call, in microseconds."""
+        best = min(timeit.repeat(fn, number=number, repeat=self.repeat))
+        self.record(name, best / number * 1e6, "us/call")
+
+
+def bench_compute_metrics(suite: Suite, scale: Dict[str, Any], seed: int) -> None:
+    import random
+    from benchmarks.datagen import text_for, typo
+    from server.metrics import compute_metrics
+
+    for lang in ("en", "zh"):
+        for length in scale["text_lengths"]:
+            rng = random.Random(f"{seed}:{lang}:{length}")
+            target = text_for(lang, rng, length)
+            typed = typo(rng, target)
+            number = max(5, 20_000 // length)
+            suite.per_call(
+                f"compute_metrics[{lang},len={length}]",
+                lambda: compute_metrics(lang, typed, target, 30_000), number,
+            )
+
+
+def bench_pack_items(suite: Suite, scale: Dict[str, Any], work: Path, seed: int) -> None:
+    from benchmarks.datagen import write_pack
+    from server import packs
+    from server.binpack import write_binary_pack
+
+    packs.PACKS_DIR = work / "packs-items"
+    items = scale["items"]
+    pd = write_pack(packs.PACKS_DIR, "bench-depth", items, "zh", seed)
+    offsets = sorted({0, items // 10, items // 2, max(0, items - PAGE)})
+
+    for variant in ("jsonl", "bin"):
+        if variant == "bin":
+            write_binary_pack(pd / "items.jsonl", pd / packs.BINARY_NAME)
+        list(packs.get_pack_items("bench-depth", offset=0, limit=PAGE))  # build/load the index
+        for offset in offsets:
+            suite.per_call(
+                f"get_pack_items[{variant},offset={offset}]",
+                lambda: list(packs.get_pack_items("bench-depth", offset=offset, limit=PAGE)), 200,
+            )
+        suite.per_call(
+            f"get_pack_items[{variant},tag=A1,offset={items // 20}]",
+            lambda: list(packs.get_pack_items("bench-depth", offset=items // 20, limit=PAGE, tag="A1")), 100,
+        )
+
+
+def bench_list_packs(suite: Suite, scale: Dict[str, Any], work: Path, seed: int) -> None:
+    from benchmarks.datagen import write_packs
+    from server import packs
+
+    for count in scale["pack_counts"]:
+        packs.PACKS_DIR = work / f"packs-{count}"
+        write_packs(packs.PACKS_DIR, count, 20, seed)
+        start = time.perf_counter()
+        packs.list_packs()
+        suite.record(f"list_packs[cold,packs={count}]", (time.perf_counter() - start) * 1e6, "us/call")
+        suite.per_call(f"list_packs[warm,packs={count}]", lambda: packs.list_packs(), 50)
+        suite.per_call(f"list_packs[warm,lang=zh,packs={count}]", lambda: packs.list_packs(lang="zh"), 50)
+
+
+def bench_history(suite: Suite, scale: Dict[str, Any]) -> None:
+    from benchmarks.datagen import make_attempt
+    from server.achievements import check_achievements
+    from server.database import get_user_stats
+    import random
+
+    rng = random.Random(0)
+    for n in scale["history"]:
+        user_id = f"hist-{n}"
+        check_achievements(user_id)  # award whatever the seeded history already earns
+        attempt = make_attempt(rng, user_id, ["bench-en-0000"], 100)
+        suite.per_call(f"check_achievements[full,history={n}]", lambda: check_achievements(user_id), 200)
+        suite.per_call(
+            f"check_achievements[incremental,history={n}]", lambda: check_achievements(user_id, [attempt]), 200
+        )
+        suite.per_call(f"get_user_stats[history={n}]", lambda: get_user_stats(user_id), 200)
+
+
+def bench_record_attempt(suite: Suite, scale: Dict[str, Any], pack_ids: List[str]) -> None:
+    import random
+    from benchmarks.datagen import make_attempt
+    from server.database import record_attempt, record_attempts
+
+    rng = random.Random(1)
+    writes = scale["writes"]
+    attempts = [make_attempt(rng, f"user-{rng.randrange(scale['users']):05d}", pack_ids, 100) for _ in range(writes)]
+
+    start = time.perf_counter()
+    for a in attempts:
+        record_attempt(
+            a["user_id"], a["item_id"], a["lang"], a["typed_text"], a["target_text"],
+            a["duration_ms"], a["pack_id"], a["metrics"],
+        )
+    suite.record("record_attempt[single]", writes / (time.perf_counter() - start), "attempts/s", True)
+
+    start = time.perf_counter()
+    for i in range(0, writes, 100):
+        record_attempts(attempts[i:i + 100])
+    suite.record("record_attempt[batch=100]", writes / (time.perf_counter() - start), "attempts/s", True)
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Print a comparison table; returns the names of benchmarks that regressed."""
+    if baseline.get("params") != results["params"]:
+        print("warning: baseline was run with different parameters", file=sys.stderr)
+    before = {r["name"]: r for r in baseline.get("results", [])}
+    regressions = []
+    print(f"\n{'benchmark':<44} {'baseline':>12} {'current':>12} {'change':>8}")
+    for r in results["results"]:
+        b = before.get(r["name"])
+        if b is None or not b["value"]:
+            print(f"{r['name']:<44} {'-':>12} {r['value']:>12.2f} {'new':>8}")
+            continue
+        change = r["value"] / b["value"] - 1
+        # Positive "worse" means slower (or fewer attempts/s)
+        worse = -change if r["higher_is_better"] else change
+        flag = ""
+        if worse > threshold:
+            flag = "  REGRESSION"
+            regressions.append(r["name"])
+        elif worse < -threshold:
+            flag = "  improved"
+        print(f"{r['name']:<44} {b['value']:>12.2f} {r['value']:>12.2f} {change:>+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--quick", action="store_true", help="small data set, for a fast local check")
+    ap.add_argument("--only", nargs="+", choices=["metrics", "pack_items", "list_packs", "history", "record"])
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", type=Path, default=ROOT / "benchmarks" / "results" / "latest.json")
+    ap.add_argument("--baseline", type=Path, help="earlier results file to compare against")
+    ap.add_argument("--threshold", type=float, default=0.10, help="relative change treated as significant (default 0.10)")
+    ap.add_argument("--fail-on-regression", action="store_true")
+    args = ap.parse_args()
+
+    scale_name = "quick" if args.quick else "full"
+    scale = SCALES[scale_name]
+    selected = set(args.only or ["metrics", "pack_items", "list_packs", "history", "record"])
+    suite = Suite(args.repeat)
+
+    with tempfile.TemporaryDirectory(prefix="typing-bench-") as tmp:
+        work = Path(tmp)
+        # Must be set before server.database opens its first connection
+        os.environ["TYPING_DB_PATH"] = str(work / "typing.db")
+        from benchmarks.datagen import seed_database, write_packs
+
+        pack_ids = [f"bench-{'zh' if p % 2 else 'en'}-{p:04d}" for p in range(4)]
+        if selected & {"history", "record"}:
+            print("Seeding database...", file=sys.stderr)
+            write_packs(work / "packs-db", len(pack_ids), 100, args.seed)
+            seed_database(
+                scale["users"], scale["attempts"], pack_ids, 100, args.seed,
+                history={f"hist-{n}": n for n in scale["history"]},
+            )
+
+        print(f"Running {scale_name} benchmarks...", file=sys.stderr)
+        if "metrics" in selected:
+            bench_compute_metrics(suite, scale, args.seed)
+        if "pack_items" in selected:
+            bench_pack_items(suite, scale, work, args.seed)
+        if "list_packs" in selected:
+            bench_list_packs(suite, scale, work, args.seed)
+        if "history" in selected:
+            bench_history(suite, scale)
+        if "record" in selected:
+            bench_record_attempt(suite, scale, pack_ids)
+
+    results = {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {"scale": scale_name, "seed": args.seed, "repeat": args.repeat, **scale},
+        "results": suite.results,
+    }
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(results, indent=2) + "\n", encoding="utf-8")
+    print(f"Wrote {len(suite.results)} results to {args.out}", file=sys.stderr)
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}", file=sys.stderr)
+            if args.fail_on_regression:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -13,6 +13,14 @@ Usage examples:
 Input CSV columns:
   zh,en,tag (optional)
 
+The CSV is read in blocks that end on record boundaries; a pool of --workers
+processes (default: CPU count) parses, romanizes and normalizes the blocks, and
+output order always matches input order. With --incremental, rows unchanged
+since the last build (per the row-hash manifest beside the pack) are copied
+from the previous items.jsonl instead of being romanized again. --binary also
+compiles items.bin (see server/binpack.py), which the server prefers over the
+JSONL while it matches it.
+
 Optional libraries:
   - pypinyin (pinyin romanization)
   - opencc (S/T conversion)
@@ -20,21 +28,382 @@ Optional libraries:
 """
 
 import csv
+import hashlib
+import io
 import json
 import argparse
+import os
+import sys
+import mmap
+import tempfile
+import time
+from collections import deque
+from multiprocessing import Pool
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, Deque, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from server.binpack import read_source_sig, write_binary_pack  # noqa: E402
+
+try:
+    from pypinyin import lazy_pinyin, Style
+except ImportError:  # optional dependency
+    lazy_pinyin = None
+
+# Bytes of CSV text handed to a worker at a time
+CHUNK_BYTES = 1 << 20
+
+# Row-hash manifest kept next to items.jsonl for incremental rebuilds
+MANIFEST_NAME = "build_manifest.json"
+MANIFEST_VERSION = 1
+
+# Per-process build settings, set by _init_worker
+_settings: Dict[str, Any] = {}
 
 
 def try_pinyin(text: str) -> str:
+    if lazy_pinyin is None:
+        return ""
     try:
-        from pypinyin import lazy_pinyin, Style
         py = lazy_pinyin(text, style=Style.TONE3, errors='ignore')
         return " ".join(py)
     except Exception:
         return ""
 
 
+def _balanced_cut(text: str) -> int:
+    """
+    Index just past the last newline in ``text`` that ends a complete CSV record,
+    i.e. one not inside a quoted field (quotes before it are balanced); -1 if none.
+    """
+    cut = text.rfind("\n")
+    while cut != -1 and text.count('"', 0, cut) % 2:
+        cut = text.rfind("\n", 0, cut)
+    return cut + 1 if cut != -1 else -1
+
+
+def read_header(f: TextIO) -> List[str]:
+    record = f.readline()
+    while record.count('"') % 2:
+        line = f.readline()
+        if not line:
+            break
+        record += line
+    return next(csv.reader([record]), [])
+
+
+def read_chunks(f: TextIO, chunk_bytes: int = CHUNK_BYTES) -> Iterator[str]:
+    """
+    Stream the remaining CSV text in blocks of roughly ``chunk_bytes`` that each
+    end on a record boundary, so workers can parse them independently.
+    """
+    carry = ""
+    while True:
+        block = f.read(chunk_bytes)
+        if not block:
+            break
+        text = carry + block
+        cut = _balanced_cut(text)
+        if cut == -1:
+            carry = text
+            continue
+        carry = text[cut:]
+        yield text[:cut]
+    if carry:
+        yield carry
+
+
+def _init_worker(settings: Dict[str, Any]) -> None:
+    global _settings
+    _settings = settings
+
+
+def row_hash(zh: str, en: str, tag: str) -> str:
+    return hashlib.blake2b("\x1f".join((zh, en, tag)).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def normalize_chunk(text: str) -> Tuple[int, List[Tuple[str, Optional[str]]]]:
+    """
+    Parse, romanize and normalize a block of CSV records into (row hash, item)
+    pairs. Items are serialized *without* their id (ids depend on how many rows
+    were kept before this block, so the parent assigns them) and are None for
+    rows the previous build already produced. Rows missing either side are
+    dropped. Returns (rows seen, pairs).
+    """
+    s = _settings
+    known = s["known"]
+    columns = s["columns"]
+    zh_i, en_i, tag_i = (columns.get(c) for c in ("zh", "en", "tag"))
+    rows = 0
+    out = []
+    for row in csv.reader(io.StringIO(text)):
+        if not row:
+            continue
+        rows += 1
+        zh = (row[zh_i] if zh_i is not None and zh_i < len(row) else "").strip()
+        en = (row[en_i] if en_i is not None and en_i < len(row) else "").strip()
+        if not zh or not en:
+            continue
+        tag = row[tag_i] if tag_i is not None and tag_i < len(row) else ""
+        digest = row_hash(zh, en, tag)
+        if digest in known:
+            out.append((digest, None))
+            continue
+        item = {
+            "type": "sentence",
+            "lang": s["lang"],
+            "text": zh,
+            "romanization": try_pinyin(zh),
+            "translation": {s["target"]: en},
+            "tags": [t for t in tag.split(";") if t] + s["topics"],
+            "difficulty": {"freq_band": 0},
+            "source": s["source"],
+            "license": s["license"],
+        }
+        out.append((digest, json.dumps(item, ensure_ascii=False)))
+    return rows, out
+
+
+def id_prefix(item_id: str) -> bytes:
+    """
+    Start of an item line up to its first non-id field; a serialized item from
+    normalize_chunk continues it after its opening brace.
+    """
+    return ('{"id": ' + json.dumps(item_id, ensure_ascii=False) + ", ").encode("utf-8")
+
+
+def _settings_sig(settings: Dict[str, Any]) -> str:
+    """Everything besides the row itself that shapes an item; a change forces a full rebuild."""
+    parts = [MANIFEST_VERSION, lazy_pinyin is not None] + [
+        settings[k] for k in ("lang", "target", "topics", "source", "license")
+    ]
+    return hashlib.sha1(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def load_manifest(out_dir: Path, settings_sig: str) -> Optional[Dict[str, Any]]:
+    """
+    The previous build's manifest, if it was made with the same settings and the
+    items.jsonl it describes is still on disk untouched.
+    """
+    try:
+        manifest = json.loads((out_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+        st = (out_dir / "items.jsonl").stat()
+    except (OSError, ValueError):
+        return None
+    if (
+        manifest.get("version") != MANIFEST_VERSION
+        or manifest.get("settings") != settings_sig
+        or manifest.get("items_size") != st.st_size
+        or manifest.get("items_mtime_ns") != st.st_mtime_ns
+    ):
+        return None
+    return manifest
+
+
+def _temp_file(path: Path):
+    """A uniquely named temp file beside ``path``, so concurrent builds never share one."""
+    return tempfile.NamedTemporaryFile(dir=path.parent, prefix=path.name + ".", suffix=".tmp", delete=False)
+
+
+def _replace(tmp_path: Path, path: Path) -> None:
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
+
+
+def _write_atomic(path: Path, data: bytes) -> None:
+    out = _temp_file(path)
+    try:
+        with out:
+            out.write(data)
+        _replace(Path(out.name), path)
+    except BaseException:
+        Path(out.name).unlink(missing_ok=True)
+        raise
+
+
+def ordered_map(pool: Pool, fn, chunks: Iterator, window: int) -> Iterator:
+    """
+    Like pool.imap, but with at most ``window`` chunks read ahead: imap drains its
+    input eagerly, which would pull a whole large CSV into memory.
+    """
+    pending: Deque = deque()
+    for chunk in chunks:
+        pending.append(pool.apply_async(fn, (chunk,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+class Progress:
+    """Throttled rows/items throughput report on stderr."""
+
+    def __init__(self, enabled: bool, every_s: float = 1.0):
+        self.enabled = enabled
+        self.every_s = every_s
+        self.start = self.last = time.perf_counter()
+
+    def update(self, rows: int, items: int, final: bool = False) -> None:
+        now = time.perf_counter()
+        if not self.enabled or (not final and now - self.last < self.every_s):
+            return
+        self.last = now
+        elapsed = max(now - self.start, 1e-9)
+        print(f"\r{rows:,} rows read, {items:,} items written, {rows / elapsed:,.0f} rows/s",
+              end="\n" if final else "", file=sys.stderr, flush=True)
+
+
+def build(
+    pack_id: str,
+    name: str,
+    source_csv: Path,
+    lang: str = "zh",
+    target: str = "en",
+    license: str = "CC BY 4.0",
+    source: str = "",
+    topics: Sequence[str] = (),
+    packs_dir: Path = Path("packs"),
+    workers: Optional[int] = None,
+    chunk_bytes: int = CHUNK_BYTES,
+    progress: bool = True,
+    incremental: bool = False,
+    binary: bool = False,
+) -> Dict[str, Any]:
+    """
+    Build packs_dir/pack_id from source_csv. With ``incremental``, rows whose hash
+    is in the previous build's manifest reuse their item from the old items.jsonl
+    instead of being romanized again. items.jsonl and metadata.json are replaced
+    atomically, and left untouched when their content would not change. With
+    ``binary``, items.bin is (re)compiled alongside whenever it is missing or stale.
+    Returns counts of items written, reused and built.
+    """
+    out_dir = Path(packs_dir) / pack_id
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    items_path = out_dir / "items.jsonl"
+    meta_path = out_dir / "metadata.json"
+    manifest_path = out_dir / MANIFEST_NAME
+
+    # Write metadata
+    meta = {
+        "id": pack_id,
+        "name": name,
+        "languages": [lang, target],
+        "license": license,
+        "source": source or "",
+        "topics": list(topics),
+    }
+    meta_bytes = json.dumps(meta, ensure_ascii=False, indent=2).encode("utf-8")
+    if not meta_path.exists() or meta_path.read_bytes() != meta_bytes:
+        _write_atomic(meta_path, meta_bytes)
+
+    workers = (os.cpu_count() or 1) if workers is None else max(1, workers)
+    report = Progress(progress)
+    src = open(source_csv, "r", encoding="utf-8", newline="")
+    # First occurrence wins, as with csv.DictReader
+    columns: Dict[str, int] = {}
+    for i, column in enumerate(read_header(src)):
+        columns.setdefault(column, i)
+    settings = {
+        "lang": lang, "target": target, "topics": list(topics), "source": meta["source"],
+        "license": license, "columns": columns,
+    }
+    settings_sig = _settings_sig(settings)
+
+    # Previous items by row hash: (offset, length) of the item after its id prefix
+    previous: Dict[str, Tuple[int, int]] = {}
+    old_manifest = load_manifest(out_dir, settings_sig) if incremental else None
+    old_file = old_map = None
+    if old_manifest is not None and old_manifest["hashes"]:
+        for digest, offset, length in zip(old_manifest["hashes"], old_manifest["offsets"], old_manifest["lengths"]):
+            previous[digest] = (offset, length)
+        old_file = open(items_path, "rb")
+        old_map = mmap.mmap(old_file.fileno(), 0, access=mmap.ACCESS_READ)
+    settings["known"] = frozenset(previous)
+    chunks = read_chunks(src, chunk_bytes)
+
+    # Build items
+    pool = None
+    if workers > 1:
+        pool = Pool(workers, initializer=_init_worker, initargs=(settings,))
+        results = ordered_map(pool, normalize_chunk, chunks, window=workers * 2)
+    else:
+        _init_worker(settings)
+        results = map(normalize_chunk, chunks)
+
+    hashes: List[str] = []
+    offsets: List[int] = []
+    lengths: List[int] = []
+    output_sha = hashlib.sha1()
+    rows = n = reused = position = 0
+    out = _temp_file(items_path)
+    tmp_path = Path(out.name)
+    try:
+        with out:
+            for seen, pairs in results:
+                lines = []
+                for digest, body in pairs:
+                    n += 1
+                    prefix = id_prefix(f"{pack_id}-{n:04d}")
+                    if body is None:
+                        offset, length = previous[digest]
+                        tail = old_map[offset:offset + length]
+                        reused += 1
+                    else:
+                        tail = body[1:].encode("utf-8")
+                    line = prefix + tail + b"\n"
+                    hashes.append(digest)
+                    offsets.append(position + len(prefix))
+                    lengths.append(len(tail))
+                    position += len(line)
+                    lines.append(line)
+                chunk = b"".join(lines)
+                output_sha.update(chunk)
+                out.write(chunk)
+                rows += seen
+                report.update(rows, n)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    finally:
+        src.close()
+        if old_map is not None:
+            old_map.close()
+            old_file.close()
+        if pool is not None:
+            pool.close()
+            pool.join()
+    report.update(rows, n, final=True)
+
+    unchanged = old_manifest is not None and old_manifest.get("items_sha1") == output_sha.hexdigest()
+    if unchanged:
+        # Same bytes as before: keep the old file so its mtime (and every cache keyed on it) survives
+        tmp_path.unlink()
+    else:
+        _replace(tmp_path, items_path)
+    st = items_path.stat()
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "settings": settings_sig,
+        "items_size": st.st_size,
+        "items_mtime_ns": st.st_mtime_ns,
+        "items_sha1": output_sha.hexdigest(),
+        "hashes": hashes,
+        "offsets": offsets,
+        "lengths": lengths,
+    }
+    _write_atomic(manifest_path, json.dumps(manifest, separators=(",", ":")).encode("utf-8"))
+
+    bin_path = out_dir / "items.bin"
+    if binary and read_source_sig(bin_path) != (st.st_size, st.st_mtime_ns):
+        write_binary_pack(items_path, bin_path)
+    elif not binary and bin_path.exists() and read_source_sig(bin_path) != (st.st_size, st.st_mtime_ns):
+        # A stale compiled pack is ignored by readers anyway; don't leave it lying around
+        bin_path.unlink()
+    return {"rows": rows, "items": n, "reused": reused, "built": n - reused, "unchanged": unchanged}
+
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--id", required=True)
@@ -45,52 +414,31 @@ def main():
     ap.add_argument("--license", default="CC BY 4.0")
     ap.add_argument("--source", default="")
     ap.add_argument("--topic", action="append", default=[])
+    ap.add_argument("--workers", type=int, default=None, help="romanization processes (default: CPU count)")
+    ap.add_argument("--chunk-bytes", type=int, default=CHUNK_BYTES, help="CSV bytes per worker task")
+    ap.add_argument("--packs-dir", default="packs")
+    ap.add_argument("--quiet", action="store_true", help="no progress output")
+    ap.add_argument("--incremental", action="store_true",
+                    help=f"reuse items of rows unchanged since the last build (per {MANIFEST_NAME})")
+    ap.add_argument("--binary", action="store_true", help="also compile items.bin for mmap-backed serving")
     args = ap.parse_args()
 
-    out_dir = Path("packs") / args.id
-    out_dir.mkdir(parents=True, exist_ok=True)
-
-    items_path = out_dir / "items.jsonl"
-    meta_path = out_dir / "metadata.json"
-
-    # Write metadata
-    meta = {
-        "id": args.id,
-        "name": args.name,
-        "languages": [args.lang, args.target],
-        "license": args.license,
-        "source": args.source or "",
-        "topics": args.topic or [],
-    }
-    meta_path.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
-
-    # Build items
-    with open(args.source_csv, "r", encoding="utf-8") as f, open(items_path, "w", encoding="utf-8") as out:
-        reader = csv.DictReader(f)
-        n = 0
-        for row in reader:
-            zh = (row.get("zh") or "").strip()
-            en = (row.get("en") or "").strip()
-            if not zh or not en:
-                continue
-            n += 1
-            item = {
-                "id": f"{args.id}-{n:04d}",
-                "type": "sentence",
-                "lang": args.lang,
-                "text": zh,
-                "romanization": try_pinyin(zh),
-                "translation": {args.target: en},
-                "tags": [t for t in (row.get("tag") or "").split(";") if t] + (args.topic or []),
-                "difficulty": {"freq_band": 0},
-                "source": meta["source"],
-                "license": args.license,
-            }
-            out.write(json.dumps(item, ensure_ascii=False) + "\n")
-
-    print(f"Wrote {n} items to {items_path}")
+    start = time.perf_counter()
+    result = build(
+        args.id, args.name, Path(args.source_csv),
+        lang=args.lang, target=args.target, license=args.license, source=args.source,
+        topics=args.topic, packs_dir=Path(args.packs_dir), workers=args.workers,
+        chunk_bytes=args.chunk_bytes, progress=not args.quiet, incremental=args.incremental,
+        binary=args.binary,
+    )
+    elapsed = time.perf_counter() - start
+    items_path = Path(args.packs_dir) / args.id / "items.jsonl"
+    if result["unchanged"]:
+        print(f"{items_path} is up to date ({result['items']} items, {elapsed:.1f}s)")
+    else:
+        print(f"Wrote {result['items']} items to {items_path} in {elapsed:.1f}s "
+              f"({result['reused']} reused, {result['built']} built)")
 
 
 if __name__ == "__main__":
     main()
-
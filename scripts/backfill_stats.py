@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Rebuild the user_pack_stats rollup and achievement counters from the attempts table.
+
+The server maintains these incrementally and backfills them once when the
+tables are first created; run this after importing or editing attempts directly.
+
+Usage:
+  python scripts/backfill_stats.py
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from server.database import DB_PATH, backfill_rollups  # noqa: E402
+
+
+def main():
+    start = time.perf_counter()
+    rows = backfill_rollups()
+    print(f"Rebuilt {rows} user_pack_stats rows in {DB_PATH} ({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
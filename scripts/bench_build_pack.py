@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark etl/build_pack.py over a synthetic CSV, single process vs a worker pool.
+
+Generates --rows zh/en/tag rows in a scratch directory and builds the pack once
+per --workers value, checking that every run produces identical items.jsonl.
+Romanization only runs when pypinyin is installed; without it the numbers cover
+CSV parsing, normalization and serialization alone.
+
+Usage:
+  python scripts/bench_build_pack.py --rows 1000000 --workers 1 4 8
+"""
+
+import argparse
+import csv
+import hashlib
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "etl"))
+
+import build_pack  # noqa: E402
+
+HANZI = "的一是不了人我在有他这为之大来以个中上们到说国和地也子时道出而要于就下得可你年生"
+WORDS = ["travel", "hello", "station", "museum", "ticket", "where", "please", "thank", "water", "hotel"]
+
+
+def write_csv(path: Path, rows: int) -> None:
+    rng = random.Random(42)
+    with path.open("w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["zh", "en", "tag"])
+        for _ in range(rows):
+            zh = "".join(rng.choice(HANZI) for _ in range(rng.randint(4, 16)))
+            en = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 8)))
+            w.writerow([zh, en, ";".join(rng.sample(WORDS, rng.randint(0, 2)))])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, os.cpu_count() or 1])
+    ap.add_argument("--chunk-bytes", type=int, default=build_pack.CHUNK_BYTES)
+    args = ap.parse_args()
+
+    print(f"pypinyin: {'yes' if build_pack.lazy_pinyin is not None else 'no (romanization skipped)'}")
+    with tempfile.TemporaryDirectory() as tmp:
+        source_csv = Path(tmp) / "synthetic.csv"
+        t0 = time.perf_counter()
+        write_csv(source_csv, args.rows)
+        print(f"Generated {args.rows:,} rows ({source_csv.stat().st_size / 1e6:.0f} MB) in {time.perf_counter() - t0:.1f}s")
+
+        digests = {}
+        baseline = None
+        for workers in args.workers:
+            start = time.perf_counter()
+            n = build_pack.build(
+                "bench", "Bench", source_csv, topics=["bench"], packs_dir=Path(tmp) / "packs",
+                workers=workers, chunk_bytes=args.chunk_bytes, progress=False,
+            )["items"]
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            digests[workers] = hashlib.sha1((Path(tmp) / "packs/bench/items.jsonl").read_bytes()).hexdigest()
+            print(f"workers={workers:<3} {n:,} items in {elapsed:6.1f}s  "
+                  f"{args.rows / elapsed:10,.0f} rows/s  {baseline / elapsed:4.1f}x")
+
+        if len(set(digests.values())) != 1:
+            sys.exit(f"Output differs between worker counts: {digests}")
+
+
+if __name__ == "__main__":
+    main()
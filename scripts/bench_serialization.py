@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of per-request JSON serialization cost for each API response shape.
+
+Compares FastAPI's default path (jsonable_encoder + stdlib json via JSONResponse)
+with server.serialization.dumps (orjson when installed), and for pack item pages
+with splicing the raw items.jsonl lines into the body.
+
+Usage:
+  python scripts/bench_serialization.py --repeat 2000
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from server import packs, serialization  # noqa: E402
+
+SAMPLE_ZH = "请问地铁站在哪里？我想去博物馆看看。"
+SAMPLE_EN = "Excuse me, where is the subway station? I would like to visit the museum."
+
+
+def make_item(n: int) -> dict:
+    return {
+        "id": f"bench-{n:06d}",
+        "type": "sentence",
+        "lang": "zh",
+        "text": SAMPLE_ZH,
+        "romanization": "qing3 wen4 di4 tie3 zhan4 zai4 na3 li3",
+        "translation": {"en": SAMPLE_EN},
+        "tags": ["travel", "directions", "A1"],
+        "difficulty": {"freq_band": n % 5},
+        "source": "Benchmark pack",
+        "license": "CC BY 4.0",
+    }
+
+
+def make_attempt(n: int, text_len: int) -> dict:
+    text = (SAMPLE_EN * (text_len // len(SAMPLE_EN) + 1))[:text_len]
+    return {
+        "id": n, "user_id": "bench-user", "item_id": f"bench-{n:06d}", "pack_id": "bench",
+        "lang": "en", "typed_text": text, "target_text": text, "duration_ms": 30000,
+        "wpm": random.uniform(20, 90), "cpm": random.uniform(100, 450), "cer": random.random() * 0.1,
+        "error_count": 3, "accuracy": 97.5, "error_heatmap": json.dumps({"e": 2, "<extra>": 1}),
+        "created_at": "2026-01-01 12:00:00",
+    }
+
+
+def time_per_call(fn, repeat: int) -> float:
+    return min(timeit.repeat(fn, number=repeat, repeat=3)) / repeat * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=2000)
+    ap.add_argument("--page", type=int, default=50, help="items / attempts per page")
+    ap.add_argument("--text-len", type=int, default=2000, help="typed/target text length for attempt rows")
+    args = ap.parse_args()
+
+    backend = "orjson" if serialization.orjson is not None else "stdlib json (orjson not installed)"
+    print(f"serialization.dumps backend: {backend}")
+
+    shapes = {
+        "/packs": [
+            {"id": f"pack-{i}", "name": f"Pack {i}", "languages": ["zh", "en"], "license": "CC BY 4.0",
+             "source": "Benchmark", "topics": ["travel"], "count": 200_000}
+            for i in range(200)
+        ],
+        "/packs/{id}/items": {
+            "pack_id": "bench", "offset": 0, "limit": args.page,
+            "items": [make_item(n) for n in range(args.page)],
+        },
+        "/users/{id}/attempts": {
+            "user_id": "bench-user", "pack_id": None, "total": 50_000,
+            "attempts": [make_attempt(n, 0) for n in range(args.page)],
+            "next_before_id": 1, "prev_after_id": 2,
+        },
+        "/users/{id}/attempts?include_text": {
+            "user_id": "bench-user", "pack_id": None, "total": 50_000,
+            "attempts": [make_attempt(n, args.text_len) for n in range(args.page)],
+            "next_before_id": 1, "prev_after_id": 2,
+        },
+        "/users/{id}/progress": {
+            "overall": {"total_attempts": 50_000, "avg_wpm": 51.2, "avg_cpm": 256.0, "avg_cer": 0.04,
+                        "avg_accuracy": 96.1, "total_time_ms": 10**9, "best_wpm": 110.2, "stddev_wpm": 8.1},
+            "per_pack": [
+                {"pack_id": f"pack-{i}", "attempts": 100, "avg_wpm": 50.0, "avg_cpm": 250.0,
+                 "avg_cer": 0.05, "avg_accuracy": 95.0, "stddev_wpm": 7.0}
+                for i in range(30)
+            ],
+            "streak": {"current_streak": 12, "longest_streak": 40, "last_practice_date": "2026-01-01"},
+        },
+    }
+
+    print(f"{'endpoint':<36}{'default µs':>12}{'dumps µs':>12}{'speedup':>9}")
+    for name, content in shapes.items():
+        default = time_per_call(lambda: JSONResponse(jsonable_encoder(content)), args.repeat)
+        fast = time_per_call(lambda: serialization.FastJSONResponse(content), args.repeat)
+        print(f"{name:<36}{default:>12.1f}{fast:>12.1f}{default / fast:>8.1f}x")
+
+    # Pack item pages served from disk: decode + encode vs splicing the raw lines
+    with tempfile.TemporaryDirectory() as tmp:
+        packs.PACKS_DIR = Path(tmp)
+        pack_dir = Path(tmp) / "bench"
+        pack_dir.mkdir()
+        (pack_dir / "metadata.json").write_text(json.dumps({"name": "bench"}), encoding="utf-8")
+        with (pack_dir / "items.jsonl").open("w", encoding="utf-8") as f:
+            for n in range(10_000):
+                f.write(json.dumps(make_item(n), ensure_ascii=False) + "\n")
+
+        def decoded():
+            items = list(packs.get_pack_items("bench", offset=5000, limit=args.page))
+            return serialization.dumps({"pack_id": "bench", "offset": 5000, "limit": args.page, "items": items})
+
+        def spliced():
+            head = serialization.dumps({"pack_id": "bench", "offset": 5000, "limit": args.page})
+            lines = packs.get_pack_item_lines("bench", offset=5000, limit=args.page)
+            return head[:-1] + b',"items":[' + b",".join(lines) + b"]}"
+
+        assert json.loads(decoded()) == json.loads(spliced())
+        d = time_per_call(decoded, args.repeat // 4 or 1)
+        s = time_per_call(spliced, args.repeat // 4 or 1)
+        print(f"{'items page from disk (decode/encode)':<36}{d:>12.1f}")
+        print(f"{'items page from disk (raw splice)':<36}{s:>12.1f}{'':>12}{d / s:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark attempt ingestion under the default SQLite settings vs the tuned profile.
+
+Seeds a scratch database with --rows attempts, then records --attempts more through
+server.database.record_attempt (while --readers threads page through history) once
+per profile, each in a fresh process so the profile is picked up from the environment.
+
+Usage:
+  python scripts/bench_sqlite.py --rows 1000000 --attempts 2000
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROFILES = {
+    # SQLite's out-of-the-box behaviour, as get_connection used to open it
+    "default": {
+        "TYPING_SQLITE_JOURNAL_MODE": "DELETE",
+        "TYPING_SQLITE_SYNCHRONOUS": "FULL",
+        "TYPING_SQLITE_CACHE_SIZE": "-2000",
+        "TYPING_SQLITE_MMAP_SIZE": "0",
+        "TYPING_SQLITE_TEMP_STORE": "DEFAULT",
+        "TYPING_SQLITE_CACHED_STATEMENTS": "128",
+    },
+    # Whatever server/database.py ships as its defaults
+    "tuned": {},
+}
+
+
+def seed(db_path: Path, rows: int, users: int) -> None:
+    os.environ["TYPING_DB_PATH"] = str(db_path)
+    sys.path.insert(0, str(ROOT))
+    from server import database
+
+    conn = database.get_connection()
+    conn.executemany(
+        "INSERT OR IGNORE INTO users (id, username) VALUES (?, ?)",
+        [(f"user-{u}", f"user-{u}") for u in range(users)],
+    )
+    batch = []
+    for n in range(rows):
+        u = n % users
+        batch.append((
+            f"user-{u}", f"item-{n % 500}", f"pack-{n % 7}", "en" if n % 3 else "zh",
+            "the quick brown fox", "the quick brown fox", 4000,
+            random.uniform(20, 90), random.uniform(100, 400), random.random() * 0.2,
+        ))
+        if len(batch) >= 50000:
+            _flush(conn, batch)
+    _flush(conn, batch)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+
+
+def _flush(conn, batch) -> None:
+    conn.executemany("""
+        INSERT INTO attempts (
+            user_id, item_id, pack_id, lang, typed_text, target_text,
+            duration_ms, wpm, cpm, cer
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, batch)
+    conn.commit()
+    batch.clear()
+
+
+def worker(attempts: int, readers: int, users: int) -> None:
+    sys.path.insert(0, str(ROOT))
+    from server import database
+
+    stop = threading.Event()
+    reads = [0]
+
+    def read_loop() -> None:
+        while not stop.is_set():
+            database.get_user_attempts(f"user-{random.randrange(users)}", limit=20)
+            reads[0] += 1
+
+    threads = [threading.Thread(target=read_loop, daemon=True) for _ in range(readers)]
+    for t in threads:
+        t.start()
+
+    metrics = {"wpm": 50.0, "cpm": 250.0, "cer": 0.0, "error_count": 0, "accuracy": 100.0, "error_heatmap": {}}
+    start = time.perf_counter()
+    for n in range(attempts):
+        database.record_attempt(
+            user_id=f"user-{n % users}", item_id="bench", lang="en",
+            typed_text="the quick brown fox", target_text="the quick brown fox",
+            duration_ms=4000, pack_id="bench", metrics=metrics,
+        )
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    for t in threads:
+        t.join()
+    print(json.dumps({
+        "attempts": attempts,
+        "seconds": elapsed,
+        "attempts_per_sec": attempts / elapsed,
+        "reads_during_run": reads[0],
+    }))
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=1_000_000, help="attempts to seed before measuring")
+    ap.add_argument("--attempts", type=int, default=2000, help="attempts to record per profile")
+    ap.add_argument("--readers", type=int, default=2, help="concurrent reader threads")
+    ap.add_argument("--users", type=int, default=1000)
+    ap.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.worker:
+        worker(args.attempts, args.readers, args.users)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        t0 = time.perf_counter()
+        seed(db_path, args.rows, args.users)
+        print(f"Seeded {args.rows} attempts in {time.perf_counter() - t0:.1f}s")
+
+        results = {}
+        for name, overrides in PROFILES.items():
+            env = {**os.environ, **overrides, "TYPING_DB_PATH": str(db_path)}
+            out = subprocess.run(
+                [sys.executable, __file__, "--worker",
+                 "--attempts", str(args.attempts), "--readers", str(args.readers), "--users", str(args.users)],
+                env=env, check=True, capture_output=True, text=True,
+            )
+            results[name] = json.loads(out.stdout.strip().splitlines()[-1])
+            r = results[name]
+            print(f"{name:>8}: {r['attempts_per_sec']:8.1f} attempts/s "
+                  f"({r['reads_during_run']} concurrent reads)")
+
+        speedup = results["tuned"]["attempts_per_sec"] / results["default"]["attempts_per_sec"]
+        print(f"Speedup: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Import the legacy data/attempts.jsonl log (all of its segments) into the SQLite attempts table.
+
+The import is resumable: progress is checkpointed per batch, so it can be
+interrupted and re-run, and lines imported before are never inserted twice.
+Attempts without stored metrics are scored on the way in.
+
+Usage:
+  python scripts/import_attempts.py [--path SEGMENT] [--batch-rows 5000] [--restart]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from server import storage  # noqa: E402
+from server.database import DB_PATH  # noqa: E402
+from server.legacy_import import IMPORT_BATCH_ROWS, import_legacy_attempts  # noqa: E402
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--path", type=Path, default=None, help="import only this segment (default: every segment)")
+    ap.add_argument("--batch-rows", type=int, default=IMPORT_BATCH_ROWS)
+    ap.add_argument("--restart", action="store_true", help="rescan from the start of the file (duplicates are still skipped)")
+    ap.add_argument("--quiet", action="store_true")
+    args = ap.parse_args()
+
+    start = time.perf_counter()
+
+    def progress(totals):
+        if not args.quiet:
+            print(f"  {totals['lines']} lines, {totals['imported']} imported (offset {totals['offset']})", file=sys.stderr)
+
+    totals = import_legacy_attempts(args.path, args.batch_rows, restart=args.restart, on_progress=progress)
+    print(
+        f"Imported {totals['imported']} attempts from {args.path or storage.ATTEMPTS_PATH} into {DB_PATH} "
+        f"({totals['duplicates']} duplicates, {totals['skipped']} skipped, {time.perf_counter() - start:.1f}s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Materialize external sources into local packs (packs/remote-<id>/).
+
+Only items that are new or changed since the previous sync are written, so
+re-running this is cheap. The server can do the same periodically when
+TYPING_SOURCE_SYNC_INTERVAL_S is set.
+
+Usage:
+  python scripts/sync_sources.py                 # every configured source
+  python scripts/sync_sources.py hsk-level1 --limit 500
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from server.external_sources import SourceNotAvailable, close_http_client, list_sources  # noqa: E402
+from server.source_sync import sync_source  # noqa: E402
+
+
+async def run(source_ids, limit) -> int:
+    failures = 0
+    try:
+        for source_id in source_ids:
+            try:
+                r = await sync_source(source_id, limit=limit)
+            except SourceNotAvailable as exc:
+                failures += 1
+                print(f"{source_id}: failed ({exc})", file=sys.stderr)
+                continue
+            print(f"{source_id}: +{r['added']} new, {r['changed']} changed, {r['total']} total -> packs/{r['pack_id']}")
+    finally:
+        await close_http_client()
+    return failures
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("source_ids", nargs="*", help="sources to sync (default: all)")
+    ap.add_argument("--limit", type=int, default=None, help="max items to take from each source")
+    args = ap.parse_args()
+    source_ids = args.source_ids or [s["id"] for s in list_sources()]
+    sys.exit(1 if asyncio.run(run(source_ids, args.limit)) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,11 @@ Achievement system for gamification and user motivation.
 Tracks milestones, badges, and accomplishments.
 """
 
-from typing import List, Dict, Any, Optional
-from .database import get_cursor
+import operator
+import re
+import sqlite3
+from typing import Callable, List, Dict, Any, Iterable, NamedTuple, Optional, Set
+from .database import get_cursor, setup_connection
 
 # Define default achievements
 DEFAULT_ACHIEVEMENTS = [
@@ -123,9 +126,49 @@ DEFAULT_ACHIEVEMENTS = [
 ]
 
 
+class CompiledAchievement(NamedTuple):
+    """An achievement whose criteria string has been parsed into a typed predicate."""
+    id: str
+    name: str
+    description: str
+    icon: str
+    tier: str
+    input: str
+    predicate: Callable[[float], bool]
+
+
+_CRITERIA_RE = re.compile(r"^\s*([a-z_]+)\s*(>=|<=|==|>|<)\s*(-?\d+(?:\.\d+)?)\s*$")
+# Inputs are running maxima and counts, so "accuracy == 100" has always meant the
+# threshold was reached rather than exact float equality
+_OPERATORS = {
+    ">=": operator.ge,
+    "<=": operator.le,
+    "==": operator.ge,
+    ">": operator.gt,
+    "<": operator.lt,
+}
+
+# Counter inputs a criteria string can refer to
+ACHIEVEMENT_INPUTS = {"attempts", "wpm", "accuracy", "streak", "languages", "chinese_attempts", "hsk_packs"}
+
+# Achievements compiled from the achievements table by init_achievements
+_compiled: List[CompiledAchievement] = []
+
+
+def compile_criteria(criteria: str) -> Optional[tuple]:
+    """Parse a criteria string like "wpm >= 50" into (input, predicate), or None if unsupported."""
+    match = _CRITERIA_RE.match(criteria)
+    if not match or match.group(1) not in ACHIEVEMENT_INPUTS:
+        return None
+    name, op, raw = match.groups()
+    compare = _OPERATORS[op]
+    threshold = float(raw)
+    return name, lambda value: value is not None and compare(value, threshold)
+
+
 def init_achievements():
-    """Initialize default achievements in the database."""
-    with get_cursor() as cursor:
+    """Initialize default achievements in the database and compile their criteria."""
+    with setup_connection(), get_cursor() as cursor:
         for achievement in DEFAULT_ACHIEVEMENTS:
             cursor.execute("""
                 INSERT OR IGNORE INTO achievements (id, name, description, icon, criteria, tier)
@@ -139,111 +182,114 @@ def init_achievements():
                 achievement["tier"]
             ))
 
+        cursor.execute("SELECT * FROM achievements")
+        compiled = []
+        for row in cursor.fetchall():
+            parsed = compile_criteria(row["criteria"])
+            if parsed is None:
+                continue
+            compiled.append(CompiledAchievement(
+                row["id"], row["name"], row["description"], row["icon"], row["tier"], *parsed
+            ))
+    _compiled[:] = compiled
+
+
+def changed_inputs(attempts: Iterable[Dict[str, Any]]) -> Set[str]:
+    """
+    Achievement inputs that new attempts can have moved. Each attempt needs lang and
+    pack_id, plus the scored metrics either inline or under "metrics".
+    """
+    changed = {"attempts", "streak", "languages"}
+    for a in attempts:
+        metrics = a.get("metrics") or a
+        if metrics.get("wpm") is not None:
+            changed.add("wpm")
+        if metrics.get("accuracy") is not None:
+            changed.add("accuracy")
+        if a.get("lang") == "zh":
+            changed.add("chinese_attempts")
+        if "hsk" in (a.get("pack_id") or "").lower():
+            changed.add("hsk_packs")
+    return changed
+
+
+def _read_inputs(cursor: sqlite3.Cursor, user_id: str, needed: Set[str]) -> Dict[str, float]:
+    values: Dict[str, float] = {}
+    if needed & {"attempts", "wpm", "accuracy", "chinese_attempts"}:
+        cursor.execute("""
+            SELECT attempts, zh_attempts, max_wpm, max_accuracy
+            FROM user_counters WHERE user_id = ?
+        """, (user_id,))
+        row = cursor.fetchone()
+        values["attempts"] = row["attempts"] if row else 0
+        values["chinese_attempts"] = row["zh_attempts"] if row else 0
+        values["wpm"] = row["max_wpm"] if row else None
+        values["accuracy"] = row["max_accuracy"] if row else None
+
+    if "languages" in needed:
+        cursor.execute("SELECT COUNT(*) FROM user_languages WHERE user_id = ?", (user_id,))
+        values["languages"] = cursor.fetchone()[0]
 
-def check_achievements(user_id: str) -> List[Dict[str, Any]]:
+    if "hsk_packs" in needed:
+        cursor.execute("""
+            SELECT COUNT(*) FROM user_pack_stats
+            WHERE user_id = ? AND pack_id LIKE '%hsk%'
+        """, (user_id,))
+        values["hsk_packs"] = cursor.fetchone()[0]
+
+    if "streak" in needed:
+        cursor.execute("SELECT current_streak FROM streaks WHERE user_id = ?", (user_id,))
+        row = cursor.fetchone()
+        values["streak"] = row["current_streak"] if row else 0
+
+    return values
+
+
+def check_achievements(user_id: str, attempts: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
     """
     Check if user has unlocked any new achievements.
     Returns list of newly unlocked achievements.
+
+    Pass the attempts just recorded to only evaluate achievements whose inputs they
+    could have changed; without them every unearned achievement is evaluated.
+    Inputs come from the counters maintained with each attempt, not from
+    re-aggregating the user's history.
     """
+    changed = changed_inputs(attempts) if attempts is not None else ACHIEVEMENT_INPUTS
     newly_unlocked = []
 
     with get_cursor() as cursor:
-        # Get user stats for achievement checking
         cursor.execute("""
-            SELECT
-                COUNT(*) as total_attempts,
-                MAX(wpm) as max_wpm,
-                MAX(accuracy) as max_accuracy,
-                COUNT(DISTINCT lang) as languages_count,
-                SUM(CASE WHEN lang = 'zh' THEN 1 ELSE 0 END) as chinese_attempts
-            FROM attempts
+            SELECT achievement_id FROM user_achievements
             WHERE user_id = ?
         """, (user_id,))
+        earned = {row["achievement_id"] for row in cursor.fetchall()}
 
-        stats = dict(cursor.fetchone())
+        candidates = [a for a in _compiled if a.id not in earned and a.input in changed]
+        if not candidates:
+            return newly_unlocked
 
-        # Get current streak
-        cursor.execute("""
-            SELECT current_streak FROM streaks WHERE user_id = ?
-        """, (user_id,))
-        streak_row = cursor.fetchone()
-        current_streak = streak_row["current_streak"] if streak_row else 0
-
-        # Get pack diversity
-        cursor.execute("""
-            SELECT COUNT(DISTINCT pack_id) as pack_count
-            FROM attempts
-            WHERE user_id = ? AND pack_id LIKE '%hsk%'
-        """, (user_id,))
-        hsk_row = cursor.fetchone()
-        hsk_packs = hsk_row["pack_count"] if hsk_row else 0
+        values = _read_inputs(cursor, user_id, {a.input for a in candidates})
 
-        # Get achievements user doesn't have yet
-        cursor.execute("""
-            SELECT a.* FROM achievements a
-            WHERE a.id NOT IN (
-                SELECT achievement_id FROM user_achievements
-                WHERE user_id = ?
-            )
-        """, (user_id,))
+        for achievement in candidates:
+            if not achievement.predicate(values[achievement.input]):
+                continue
 
-        unclaimed = cursor.fetchall()
-
-        # Check each unclaimed achievement
-        for achievement in unclaimed:
-            criteria = achievement["criteria"]
-            unlocked = False
-
-            # Parse and evaluate criteria (simple evaluation)
-            if "attempts >=" in criteria:
-                threshold = int(criteria.split(">=")[1].strip())
-                if stats["total_attempts"] >= threshold:
-                    unlocked = True
-
-            elif "wpm >=" in criteria:
-                threshold = int(criteria.split(">=")[1].strip())
-                if stats["max_wpm"] and stats["max_wpm"] >= threshold:
-                    unlocked = True
-
-            elif "accuracy ==" in criteria:
-                threshold = float(criteria.split("==")[1].strip())
-                if stats["max_accuracy"] and stats["max_accuracy"] >= threshold:
-                    unlocked = True
-
-            elif "streak >=" in criteria:
-                threshold = int(criteria.split(">=")[1].strip())
-                if current_streak >= threshold:
-                    unlocked = True
-
-            elif "languages >=" in criteria:
-                threshold = int(criteria.split(">=")[1].strip())
-                if stats["languages_count"] >= threshold:
-                    unlocked = True
-
-            elif "chinese_attempts >=" in criteria:
-                threshold = int(criteria.split(">=")[1].strip())
-                if stats["chinese_attempts"] >= threshold:
-                    unlocked = True
-
-            elif "hsk_packs >=" in criteria:
-                threshold = int(criteria.split(">=")[1].strip())
-                if hsk_packs >= threshold:
-                    unlocked = True
-
-            if unlocked:
-                # Award achievement
-                cursor.execute("""
-                    INSERT INTO user_achievements (user_id, achievement_id)
-                    VALUES (?, ?)
-                """, (user_id, achievement["id"]))
-
-                newly_unlocked.append({
-                    "id": achievement["id"],
-                    "name": achievement["name"],
-                    "description": achievement["description"],
-                    "icon": achievement["icon"],
-                    "tier": achievement["tier"]
-                })
+            # Award achievement; a concurrent request may have just awarded it
+            cursor.execute("""
+                INSERT OR IGNORE INTO user_achievements (user_id, achievement_id)
+                VALUES (?, ?)
+            """, (user_id, achievement.id))
+            if cursor.rowcount != 1:
+                continue
+
+            newly_unlocked.append({
+                "id": achievement.id,
+                "name": achievement.name,
+                "description": achievement.description,
+                "icon": achievement.icon,
+                "tier": achievement.tier
+            })
 
     return newly_unlocked
 
@@ -0,0 +1,365 @@
+"""
+Compiled binary pack format (``items.bin``), built from ``items.jsonl`` by the ETL.
+
+JSONL stays the interchange format; ``items.bin`` is a derived artifact that
+records the size and mtime of the items.jsonl it was compiled from, and readers
+ignore it once those no longer match.
+
+Layout (little-endian, every section 8-byte aligned):
+
+  header     magic, version, item/string/tag counts, source items.jsonl
+             size + mtime_ns, section offsets
+  blobs      per item: compact JSON object of the fields not stored below
+  records    per item, fixed width: blob offset/length, string ids of
+             type/lang/source/license, start/count into the tag-id list
+  tag ids    u32 string ids of every item's tags, in item order
+  strings    u32 end offsets, then the UTF-8 bytes of every distinct string
+  bitmaps    u32 string id per distinct tag, then one item bitmap per tag
+
+Items are read straight from the mmap by index; the JSON line for an item is
+spliced from its blob and pre-encoded string fragments without decoding.
+"""
+
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import threading
+from bisect import bisect_right
+from array import array
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+MAGIC = b"TPAK"
+VERSION = 2
+NONE = 0xFFFFFFFF
+
+# Repeated string fields moved into the string table, in record order
+STRING_FIELDS = ("type", "lang", "source", "license")
+
+_HEADER = struct.Struct("<4sHHIIIQqQQQQQ")
+_RECORD = struct.Struct("<QIIIIIII")
+# Bitmap words (of 64 items) per entry of a tag's rank directory
+RANK_WORDS = 64
+
+
+def finite_json(value: Any) -> Any:
+    """
+    ``value`` with NaN and +/-Infinity replaced by None. json.loads accepts those
+    constants but they are not valid JSON, so items carrying them are served with
+    nulls in their place.
+    """
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {k: finite_json(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [finite_json(v) for v in value]
+    return value
+
+
+def _u32_bytes(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _pad(f) -> None:
+    f.write(b"\0" * (-f.tell() % 8))
+
+
+def write_binary_pack(jsonl_path: Path, bin_path: Path) -> int:
+    """
+    Compile ``jsonl_path`` into ``bin_path`` (atomically, via a temp file).
+    Lines that are not JSON objects are skipped and NaN/Infinity become null,
+    exactly as the JSONL index in server/packs.py treats them. Returns the
+    number of items.
+    """
+    st = jsonl_path.stat()
+    strings: Dict[str, int] = {}
+
+    def sid(value: str) -> int:
+        n = strings.get(value)
+        if n is None:
+            n = strings[value] = len(strings)
+        return n
+
+    records = bytearray()
+    tag_ids = array("I")
+    tag_items: Dict[int, List[int]] = {}
+    count = 0
+    # A unique temp name, so concurrent builds of the same pack never share a file
+    out = tempfile.NamedTemporaryFile(dir=bin_path.parent, prefix=bin_path.name + ".", suffix=".tmp", delete=False)
+    try:
+        with jsonl_path.open("rb") as src, out:
+            out.write(b"\0" * _HEADER.size)
+            _pad(out)
+            blobs_off = out.tell()
+            for line in src:
+                try:
+                    obj = json.loads(line)
+                except ValueError:
+                    continue
+                if not isinstance(obj, dict):
+                    continue
+                obj = finite_json(obj)
+
+                fields = []
+                for name in STRING_FIELDS:
+                    value = obj.get(name)
+                    if isinstance(value, str):
+                        fields.append(sid(value))
+                        del obj[name]
+                    else:
+                        fields.append(NONE)
+
+                tags = obj.get("tags")
+                tags_start, tags_count = len(tag_ids), NONE
+                if isinstance(tags, list):
+                    names = [str(t) for t in tags]
+                    if all(isinstance(t, str) for t in tags):
+                        tag_ids.extend(sid(t) for t in names)
+                        tags_count = len(names)
+                        del obj["tags"]
+                    for t in dict.fromkeys(names):
+                        tag_items.setdefault(sid(t), []).append(count)
+
+                blob = json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                records += _RECORD.pack(out.tell() - blobs_off, len(blob), *fields, tags_start, tags_count)
+                out.write(blob)
+                count += 1
+
+            _pad(out)
+            records_off = out.tell()
+            out.write(records)
+            _pad(out)
+            tag_ids_off = out.tell()
+            out.write(_u32_bytes(tag_ids))
+            _pad(out)
+
+            strings_off = out.tell()
+            encoded = [s.encode("utf-8") for s in strings]
+            ends = array("I")
+            end = 0
+            for b in encoded:
+                end += len(b)
+                ends.append(end)
+            out.write(_u32_bytes(ends))
+            out.write(b"".join(encoded))
+            _pad(out)
+
+            bitmaps_off = out.tell()
+            tags_sorted = sorted(tag_items)
+            out.write(_u32_bytes(array("I", tags_sorted)))
+            _pad(out)
+            bitmap_len = ((count + 63) // 64) * 8
+            for tag in tags_sorted:
+                bitmap = bytearray(bitmap_len)
+                for n in tag_items[tag]:
+                    bitmap[n >> 3] |= 1 << (n & 7)
+                out.write(bitmap)
+
+            out.seek(0)
+            out.write(_HEADER.pack(
+                MAGIC, VERSION, 0, count, len(strings), len(tags_sorted), st.st_size, st.st_mtime_ns,
+                blobs_off, records_off, tag_ids_off, strings_off, bitmaps_off,
+            ))
+        os.chmod(out.name, 0o644)
+        os.replace(out.name, bin_path)
+    except BaseException:
+        try:
+            os.unlink(out.name)
+        except OSError:
+            pass
+        raise
+    return count
+
+
+def read_source_sig(bin_path: Path) -> Optional[tuple]:
+    """(size, mtime_ns) of the items.jsonl a compiled pack was built from, or None."""
+    try:
+        with bin_path.open("rb") as f:
+            header = f.read(_HEADER.size)
+    except OSError:
+        return None
+    if len(header) < _HEADER.size:
+        return None
+    fields = _HEADER.unpack(header)
+    if fields[0] != MAGIC or fields[1] != VERSION:
+        return None
+    return (fields[6], fields[7])
+
+
+class BinaryPack:
+    """
+    Read-only, mmap-backed view of an items.bin file. Readers that may overlap
+    a close() bracket their use with acquire()/release(); the mapping is
+    released once it is closed and the last reader is done.
+    """
+
+    def __init__(self, path: Path):
+        self._lock = threading.Lock()
+        self._readers = 0
+        self._retired = False
+        with path.open("rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, _flags, self.count, n_strings, n_tags, size, mtime_ns,
+         self._blobs, self._records, tag_ids_off, strings_off, bitmaps_off) = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} compiled pack")
+        self.source_sig = (size, mtime_ns)
+
+        view = memoryview(self._mm)
+        n_tag_ids = (strings_off - tag_ids_off) // 4
+        if sys.byteorder == "little":
+            # Can be as long as the item count times tags per item; not worth copying
+            self._tag_ids = view[tag_ids_off:tag_ids_off + 4 * n_tag_ids].cast("I")
+        else:
+            self._tag_ids = self._u32(view, tag_ids_off, n_tag_ids)
+        ends = self._u32(view, strings_off, n_strings)
+        base = strings_off + 4 * n_strings
+        self._strings: List[str] = []
+        start = 0
+        for end in ends:
+            self._strings.append(str(self._mm[base + start:base + end], "utf-8"))
+            start = end
+        self._fragments = [json.dumps(s, ensure_ascii=False).encode("utf-8") for s in self._strings]
+
+        bitmap_len = ((self.count + 63) // 64) * 8
+        tags = self._u32(view, bitmaps_off, n_tags)
+        first = bitmaps_off + ((4 * n_tags + 7) // 8) * 8
+        self._bitmaps: Dict[str, memoryview] = {}
+        self._ranks: Dict[str, List[int]] = {}
+        for n, tag in enumerate(tags):
+            start = first + n * bitmap_len
+            self._bitmaps[self._strings[tag]] = view[start:start + bitmap_len]
+
+    def acquire(self) -> None:
+        with self._lock:
+            if self._retired:
+                raise ValueError("compiled pack is closed")
+            self._readers += 1
+
+    def release(self) -> None:
+        with self._lock:
+            self._readers -= 1
+            if not self._retired or self._readers:
+                return
+        self._unmap()
+
+    def close(self) -> None:
+        """Unmap the file now, or when the last reader releases it."""
+        with self._lock:
+            if self._retired:
+                return
+            self._retired = True
+            if self._readers:
+                return
+        self._unmap()
+
+    def _unmap(self) -> None:
+        # Views into the map must go before it can be closed
+        if isinstance(self._tag_ids, memoryview):
+            self._tag_ids.release()
+        for bitmap in self._bitmaps.values():
+            bitmap.release()
+        self._bitmaps.clear()
+        self._mm.close()
+
+    @staticmethod
+    def _u32(view: memoryview, offset: int, count: int) -> array:
+        values = array("I")
+        values.frombytes(view[offset:offset + 4 * count])
+        if sys.byteorder != "little":
+            values.byteswap()
+        return values
+
+    def _record(self, i: int) -> tuple:
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        return _RECORD.unpack_from(self._mm, self._records + i * _RECORD.size)
+
+    def line(self, i: int) -> bytes:
+        """JSON bytes of item ``i``, spliced from its blob and string fragments."""
+        blob_off, blob_len, *fields, tags_start, tags_count = self._record(i)
+        start = self._blobs + blob_off
+        inner = self._mm[start + 1:start + blob_len - 1]
+        parts = [inner] if inner else []
+        frags = self._fragments
+        for name, n in zip(STRING_FIELDS, fields):
+            if n != NONE:
+                parts.append(b'"' + name.encode() + b'":' + frags[n])
+        if tags_count != NONE:
+            ids = self._tag_ids[tags_start:tags_start + tags_count]
+            parts.append(b'"tags":[' + b",".join(frags[n] for n in ids) + b"]")
+        return b"{" + b",".join(parts) + b"}"
+
+    def item(self, i: int) -> Dict[str, Any]:
+        blob_off, blob_len, *fields, tags_start, tags_count = self._record(i)
+        start = self._blobs + blob_off
+        obj = json.loads(self._mm[start:start + blob_len])
+        strings = self._strings
+        for name, n in zip(STRING_FIELDS, fields):
+            if n != NONE:
+                obj[name] = strings[n]
+        if tags_count != NONE:
+            obj["tags"] = [strings[n] for n in self._tag_ids[tags_start:tags_start + tags_count]]
+        return obj
+
+    def _words(self, tag: str):
+        bitmap = self._bitmaps.get(tag)
+        if bitmap is None:
+            return None
+        if sys.byteorder == "little":
+            return bitmap.cast("Q")
+        return [int.from_bytes(bitmap[i:i + 8], "little") for i in range(0, len(bitmap), 8)]
+
+    def _rank(self, tag: str, words) -> List[int]:
+        """Tagged items before each block of RANK_WORDS bitmap words, built on first use."""
+        rank = self._ranks.get(tag)
+        if rank is None:
+            rank = [0]
+            total = 0
+            for start in range(0, len(words), RANK_WORDS):
+                for word in words[start:start + RANK_WORDS]:
+                    if word:
+                        total += bin(word).count("1")
+                rank.append(total)
+            self._ranks[tag] = rank
+        return rank
+
+    def tag_indices(self, tag: str, offset: int, limit: int) -> List[int]:
+        """Indices of items carrying ``tag``, skipping the first ``offset`` of them."""
+        words = self._words(tag)
+        out: List[int] = []
+        if words is None or limit <= 0:
+            return out
+        rank = self._rank(tag, words)
+        # Jump to the block holding the offset-th tagged item
+        block = bisect_right(rank, offset) - 1
+        if block >= len(rank) - 1:
+            return out
+        skip = offset - rank[block]
+        for w in range(block * RANK_WORDS, len(words)):
+            word = words[w]
+            if not word:
+                continue
+            if skip:
+                bits = bin(word).count("1")
+                if skip >= bits:
+                    skip -= bits
+                    continue
+            while word:
+                low = word & -word
+                word ^= low
+                if skip:
+                    skip -= 1
+                    continue
+                out.append(w * 64 + low.bit_length() - 1)
+                if len(out) >= limit:
+                    return out
+        return out
@@ -3,30 +3,314 @@ Database module using SQLite for persistent storage.
 Replaces JSONL-based storage for better scalability and querying.
 """
 
+import asyncio
 import sqlite3
 from pathlib import Path
-from typing import Optional, Dict, List, Any
+from typing import Optional, Dict, List, Any, Callable, Iterator, TypeVar
 from datetime import datetime
 import json
+import math
+import os
+import queue
+import time
+from concurrent.futures import Future
 from contextlib import contextmanager
 import threading
 
+from .instrumentation import ATTEMPT_STAGE_LATENCY, SQL_LATENCY, sql_op
+
 # Thread-local storage for database connections
 _thread_local = threading.local()
 
-DB_PATH = Path(__file__).parent.parent / "data" / "typing.db"
+DB_PATH = Path(os.environ.get("TYPING_DB_PATH", Path(__file__).parent.parent / "data" / "typing.db"))
+
+# Connection tuning profile. Defaults favour write throughput: WAL lets readers
+# proceed during writes, and synchronous=NORMAL only fsyncs at checkpoints.
+SQLITE_JOURNAL_MODE = os.environ.get("TYPING_SQLITE_JOURNAL_MODE", "WAL").upper()
+SQLITE_SYNCHRONOUS = os.environ.get("TYPING_SQLITE_SYNCHRONOUS", "NORMAL").upper()
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("TYPING_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE = int(os.environ.get("TYPING_SQLITE_CACHE_SIZE", "-65536"))  # negative = KiB
+SQLITE_MMAP_SIZE = int(os.environ.get("TYPING_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_TEMP_STORE = os.environ.get("TYPING_SQLITE_TEMP_STORE", "MEMORY").upper()
+SQLITE_CACHED_STATEMENTS = int(os.environ.get("TYPING_SQLITE_CACHED_STATEMENTS", "512"))
+SQLITE_CHECKPOINT_INTERVAL_S = float(os.environ.get("TYPING_SQLITE_CHECKPOINT_INTERVAL_S", "60"))
+
+# Connection pool used by the async API: one writer connection plus this many
+# read-only connections. In the API process every write (including WAL
+# checkpoints) goes through the pool's writer; schema setup at import uses a
+# connection of its own that is closed before the pool opens.
+DB_POOL_READERS = int(os.environ.get("TYPING_DB_POOL_READERS", "4"))
+
+# Group commit: the attempt writer coalesces queued writes into one transaction
+# every WRITE_BATCH_MS milliseconds or WRITE_BATCH_MAX attempts, whichever comes first.
+WRITE_BATCH_MS = float(os.environ.get("TYPING_WRITE_BATCH_MS", "5"))
+WRITE_BATCH_MAX = int(os.environ.get("TYPING_WRITE_BATCH_MAX", "256"))
+
+_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+_SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+_TEMP_STORES = {"DEFAULT", "FILE", "MEMORY"}
+
+
+def _apply_pragmas(conn: sqlite3.Connection, readonly: bool = False) -> None:
+    """Apply the connection tuning profile; unknown mode names fall back to SQLite defaults."""
+    if not readonly:
+        if SQLITE_JOURNAL_MODE in _JOURNAL_MODES:
+            conn.execute(f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}")
+        if SQLITE_SYNCHRONOUS in _SYNCHRONOUS_MODES:
+            conn.execute(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}")
+    if SQLITE_TEMP_STORE in _TEMP_STORES:
+        conn.execute(f"PRAGMA temp_store = {SQLITE_TEMP_STORE}")
+    conn.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS:d}")
+    conn.execute(f"PRAGMA cache_size = {SQLITE_CACHE_SIZE:d}")
+    conn.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE:d}")
+
+
+class _TimedCursor(sqlite3.Cursor):
+    """Cursor that records statement counts and execution times."""
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            SQL_LATENCY.observe(time.perf_counter() - start, sql_op(sql))
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            SQL_LATENCY.observe(time.perf_counter() - start, sql_op(sql))
+
+
+class _TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=_TimedCursor):
+        return super().cursor(factory)
+
+    # Connection.execute() would otherwise bypass cursor()
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def _open_connection(readonly: bool = False) -> sqlite3.Connection:
+    DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(
+        f"{DB_PATH.resolve().as_uri()}?mode=ro" if readonly else str(DB_PATH),
+        uri=readonly,
+        check_same_thread=False,
+        timeout=SQLITE_BUSY_TIMEOUT_MS / 1000.0,
+        cached_statements=SQLITE_CACHED_STATEMENTS,
+        factory=_TimedConnection,
+    )
+    conn.row_factory = sqlite3.Row  # Return rows as dictionaries
+    _apply_pragmas(conn, readonly=readonly)
+    return conn
 
 
 def get_connection() -> sqlite3.Connection:
-    """Get or create a thread-local database connection."""
+    """
+    Get the connection for the current thread: the pooled connection bound by
+    pooled()/run_read()/run_write() if there is one, else a thread-local connection.
+    """
+    bound = getattr(_thread_local, "bound", None)
+    if bound is not None:
+        return bound
     if not hasattr(_thread_local, "connection"):
-        DB_PATH.parent.mkdir(parents=True, exist_ok=True)
-        conn = sqlite3.connect(str(DB_PATH), check_same_thread=False)
-        conn.row_factory = sqlite3.Row  # Return rows as dictionaries
-        _thread_local.connection = conn
+        _thread_local.connection = _open_connection()
     return _thread_local.connection
 
 
+class ConnectionPool:
+    """
+    A fixed set of SQLite connections: one writer and ``readers`` read-only
+    connections. Callers block until a connection of the right kind is free;
+    wait times and utilisation are tracked for sizing.
+    """
+
+    def __init__(self, readers: int):
+        self._queues = {"write": queue.Queue(), "read": queue.Queue()}
+        self._queues["write"].put(_open_connection())
+        for _ in range(readers):
+            self._queues["read"].put(_open_connection(readonly=True))
+        self._size = {"write": 1, "read": readers}
+        self._lock = threading.Lock()
+        self._stats = {
+            kind: {"in_use": 0, "waiting": 0, "acquired": 0, "wait_s_total": 0.0, "wait_s_max": 0.0}
+            for kind in self._queues
+        }
+
+    @contextmanager
+    def acquire(self, write: bool = False) -> Iterator[sqlite3.Connection]:
+        kind = "write" if write or not self._size["read"] else "read"
+        stats = self._stats[kind]
+        with self._lock:
+            stats["waiting"] += 1
+        start = time.perf_counter()
+        conn = self._queues[kind].get()
+        waited = time.perf_counter() - start
+        with self._lock:
+            stats["waiting"] -= 1
+            stats["in_use"] += 1
+            stats["acquired"] += 1
+            stats["wait_s_total"] += waited
+            stats["wait_s_max"] = max(stats["wait_s_max"], waited)
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                stats["in_use"] -= 1
+            self._queues[kind].put(conn)
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                kind: {
+                    "size": self._size[kind],
+                    **stats,
+                    "wait_s_avg": stats["wait_s_total"] / stats["acquired"] if stats["acquired"] else 0.0,
+                }
+                for kind, stats in self._stats.items()
+            }
+
+    def close(self) -> None:
+        """Close every connection; waits for connections currently checked out."""
+        for kind, q in self._queues.items():
+            for _ in range(self._size[kind]):
+                q.get().close()
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide connection pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(DB_POOL_READERS)
+        return _pool
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+
+def pool_metrics() -> Dict[str, Any]:
+    """Connection pool wait-time and utilisation counters (empty before first use)."""
+    return _pool.metrics() if _pool is not None else {}
+
+
+@contextmanager
+def pooled(write: bool = False) -> Iterator[sqlite3.Connection]:
+    """Check out a pooled connection and make it this thread's connection for the block."""
+    if getattr(_thread_local, "bound", None) is not None:
+        # Already inside a pooled block (e.g. a write helper calling a read helper)
+        yield _thread_local.bound
+        return
+    with get_pool().acquire(write=write) as conn:
+        _thread_local.bound = conn
+        try:
+            yield conn
+        finally:
+            _thread_local.bound = None
+
+
+T = TypeVar("T")
+
+
+def _call_pooled(write: bool, fn: Callable[..., T], args: tuple, kwargs: Dict[str, Any]) -> T:
+    with pooled(write=write):
+        return fn(*args, **kwargs)
+
+
+async def run_read(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Await a read-only database function on a pooled read-only connection."""
+    return await asyncio.to_thread(_call_pooled, False, fn, args, kwargs)
+
+
+async def run_write(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Await a database function that writes, on the pool's single writer connection."""
+    return await asyncio.to_thread(_call_pooled, True, fn, args, kwargs)
+
+
+def checkpoint_wal(mode: str = "PASSIVE") -> Optional[Dict[str, int]]:
+    """Run a WAL checkpoint. Returns SQLite's (busy, log, checkpointed) counters, or None outside WAL mode."""
+    if SQLITE_JOURNAL_MODE != "WAL":
+        return None
+    if mode.upper() not in {"PASSIVE", "FULL", "RESTART", "TRUNCATE"}:
+        raise ValueError(f"Unknown checkpoint mode: {mode}")
+    # On the pool's writer, so the checkpointer never adds a write connection of its own
+    with pooled(write=True) as conn:
+        row = conn.execute(f"PRAGMA wal_checkpoint({mode.upper()})").fetchone()
+    return {"busy": row[0], "log": row[1], "checkpointed": row[2]}
+
+
+_checkpoint_stop = threading.Event()
+_checkpoint_thread: Optional[threading.Thread] = None
+
+
+def _checkpoint_loop(interval: float) -> None:
+    while not _checkpoint_stop.wait(interval):
+        try:
+            checkpoint_wal()
+        except sqlite3.Error:
+            # A busy database just means we try again next interval
+            pass
+
+
+def start_checkpointer(interval: Optional[float] = None) -> None:
+    """Start the background thread that periodically checkpoints the WAL."""
+    global _checkpoint_thread
+    interval = SQLITE_CHECKPOINT_INTERVAL_S if interval is None else interval
+    if _checkpoint_thread is not None or SQLITE_JOURNAL_MODE != "WAL" or interval <= 0:
+        return
+    _checkpoint_stop.clear()
+    _checkpoint_thread = threading.Thread(
+        target=_checkpoint_loop, args=(interval,), name="sqlite-checkpoint", daemon=True
+    )
+    _checkpoint_thread.start()
+
+
+def stop_checkpointer() -> None:
+    """Stop the checkpoint thread and run a final checkpoint."""
+    global _checkpoint_thread
+    if _checkpoint_thread is None:
+        return
+    _checkpoint_stop.set()
+    _checkpoint_thread.join()
+    _checkpoint_thread = None
+    try:
+        checkpoint_wal("TRUNCATE")
+    except sqlite3.Error:
+        pass
+
+
+@contextmanager
+def setup_connection() -> Iterator[sqlite3.Connection]:
+    """
+    Bind a short-lived write connection to this thread for schema setup and close
+    it afterwards, so setup at import time leaves no writer open next to the pool's.
+    """
+    if getattr(_thread_local, "bound", None) is not None:
+        yield _thread_local.bound
+        return
+    conn = _open_connection()
+    _thread_local.bound = conn
+    try:
+        yield conn
+    finally:
+        _thread_local.bound = None
+        conn.close()
+
+
 @contextmanager
 def get_cursor():
     """Context manager for database cursor with automatic commit/rollback."""
@@ -44,7 +328,7 @@ def get_cursor():
 
 def init_database():
     """Initialize database schema."""
-    with get_cursor() as cursor:
+    with setup_connection(), get_cursor() as cursor:
         # Users table
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS users (
@@ -128,8 +412,93 @@ def init_database():
             )
         """)
 
+        # Per-user, per-pack rollup of attempt metrics, maintained by record_attempt(s)
+        # and the attempt writer so progress queries don't scan attempts.
+        # pack_id '' holds attempts recorded without a pack. *_n count non-NULL values
+        # (matching AVG semantics) and *_sq are sums of squares for variance.
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_pack_stats'")
+        needs_backfill = cursor.fetchone() is None
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS user_pack_stats (
+                user_id TEXT NOT NULL,
+                pack_id TEXT NOT NULL DEFAULT '',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                duration_sum INTEGER NOT NULL DEFAULT 0,
+                wpm_n INTEGER NOT NULL DEFAULT 0,
+                wpm_sum REAL NOT NULL DEFAULT 0,
+                wpm_sq REAL NOT NULL DEFAULT 0,
+                wpm_max REAL,
+                cpm_n INTEGER NOT NULL DEFAULT 0,
+                cpm_sum REAL NOT NULL DEFAULT 0,
+                cpm_sq REAL NOT NULL DEFAULT 0,
+                cer_n INTEGER NOT NULL DEFAULT 0,
+                cer_sum REAL NOT NULL DEFAULT 0,
+                cer_sq REAL NOT NULL DEFAULT 0,
+                accuracy_n INTEGER NOT NULL DEFAULT 0,
+                accuracy_sum REAL NOT NULL DEFAULT 0,
+                accuracy_sq REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, pack_id),
+                FOREIGN KEY (user_id) REFERENCES users(id)
+            )
+        """)
+        if needs_backfill:
+            _backfill_user_pack_stats(cursor)
+
+        # Per-user counters feeding the achievement engine, maintained alongside
+        # user_pack_stats. user_languages lists every language a user practiced.
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_counters'")
+        needs_backfill = cursor.fetchone() is None
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS user_counters (
+                user_id TEXT PRIMARY KEY,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                zh_attempts INTEGER NOT NULL DEFAULT 0,
+                max_wpm REAL,
+                max_accuracy REAL,
+                FOREIGN KEY (user_id) REFERENCES users(id)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS user_languages (
+                user_id TEXT NOT NULL,
+                lang TEXT NOT NULL,
+                PRIMARY KEY (user_id, lang),
+                FOREIGN KEY (user_id) REFERENCES users(id)
+            )
+        """)
+        if needs_backfill:
+            _backfill_user_counters(cursor)
+
+        # Legacy attempts.jsonl import: resume offsets, and content keys of imported lines.
+        # file_id identifies the file an offset belongs to (a rotated path is a new file).
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS import_checkpoints (
+                source TEXT PRIMARY KEY,
+                file_id TEXT,
+                byte_offset INTEGER NOT NULL DEFAULT 0,
+                lines INTEGER NOT NULL DEFAULT 0,
+                imported INTEGER NOT NULL DEFAULT 0,
+                duplicates INTEGER NOT NULL DEFAULT 0,
+                skipped INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("PRAGMA table_info(import_checkpoints)")
+        if "file_id" not in {row["name"] for row in cursor.fetchall()}:
+            cursor.execute("ALTER TABLE import_checkpoints ADD COLUMN file_id TEXT")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS imported_attempt_keys (
+                key TEXT PRIMARY KEY,
+                attempt_id INTEGER NOT NULL
+            ) WITHOUT ROWID
+        """)
+
         # Create indices for common queries
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_attempts_user ON attempts(user_id)")
+        # History pages seek on (user_id, [pack_id,] created_at, id); the rowid id is
+        # implicitly the last column of every index. These supersede idx_attempts_user.
+        cursor.execute("DROP INDEX IF EXISTS idx_attempts_user")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_attempts_user_created ON attempts(user_id, created_at, id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_attempts_user_pack_created ON attempts(user_id, pack_id, created_at)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_attempts_pack ON attempts(pack_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_attempts_created ON attempts(created_at)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_achievements_user ON user_achievements(user_id)")
@@ -147,6 +516,273 @@ def init_database():
         """)
 
 
+_INSERT_ATTEMPT_SQL = """
+    INSERT INTO attempts (
+        user_id, item_id, pack_id, lang, typed_text, target_text,
+        duration_ms, wpm, cpm, cer, error_count, accuracy, error_heatmap
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def _attempt_row(
+    user_id: str,
+    item_id: str,
+    lang: str,
+    typed_text: str,
+    target_text: str,
+    duration_ms: int,
+    pack_id: Optional[str] = None,
+    metrics: Optional[Dict[str, Any]] = None
+) -> tuple:
+    wpm = metrics.get("wpm") if metrics else None
+    cpm = metrics.get("cpm") if metrics else None
+    cer = metrics.get("cer") if metrics else None
+    error_count = metrics.get("error_count") if metrics else None
+    accuracy = metrics.get("accuracy") if metrics else None
+    error_heatmap = json.dumps(metrics.get("error_heatmap", {})) if metrics else None
+    return (
+        user_id, item_id, pack_id, lang, typed_text, target_text,
+        duration_ms, wpm, cpm, cer, error_count, accuracy, error_heatmap
+    )
+
+
+_ROLLUP_METRICS = ("wpm", "cpm", "cer", "accuracy")
+
+_ROLLUP_UPSERT_SQL = """
+    INSERT INTO user_pack_stats (
+        user_id, pack_id, attempts, duration_sum,
+        wpm_n, wpm_sum, wpm_sq, wpm_max,
+        cpm_n, cpm_sum, cpm_sq,
+        cer_n, cer_sum, cer_sq,
+        accuracy_n, accuracy_sum, accuracy_sq
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (user_id, pack_id) DO UPDATE SET
+        attempts = attempts + excluded.attempts,
+        duration_sum = duration_sum + excluded.duration_sum,
+        wpm_n = wpm_n + excluded.wpm_n,
+        wpm_sum = wpm_sum + excluded.wpm_sum,
+        wpm_sq = wpm_sq + excluded.wpm_sq,
+        wpm_max = MAX(COALESCE(wpm_max, excluded.wpm_max), COALESCE(excluded.wpm_max, wpm_max)),
+        cpm_n = cpm_n + excluded.cpm_n,
+        cpm_sum = cpm_sum + excluded.cpm_sum,
+        cpm_sq = cpm_sq + excluded.cpm_sq,
+        cer_n = cer_n + excluded.cer_n,
+        cer_sum = cer_sum + excluded.cer_sum,
+        cer_sq = cer_sq + excluded.cer_sq,
+        accuracy_n = accuracy_n + excluded.accuracy_n,
+        accuracy_sum = accuracy_sum + excluded.accuracy_sum,
+        accuracy_sq = accuracy_sq + excluded.accuracy_sq
+"""
+
+
+_COUNTERS_UPSERT_SQL = """
+    INSERT INTO user_counters (user_id, attempts, zh_attempts, max_wpm, max_accuracy)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (user_id) DO UPDATE SET
+        attempts = attempts + excluded.attempts,
+        zh_attempts = zh_attempts + excluded.zh_attempts,
+        max_wpm = MAX(COALESCE(max_wpm, excluded.max_wpm), COALESCE(excluded.max_wpm, max_wpm)),
+        max_accuracy = MAX(COALESCE(max_accuracy, excluded.max_accuracy), COALESCE(excluded.max_accuracy, max_accuracy))
+"""
+
+
+def _max(current: Optional[float], value: Optional[float]) -> Optional[float]:
+    if value is None:
+        return current
+    return value if current is None or value > current else current
+
+
+def _rollup_attempts(cursor: sqlite3.Cursor, rows: List[tuple]) -> None:
+    """Fold attempt rows (as built by _attempt_row) into user_pack_stats and user_counters."""
+    counters: Dict[str, List[Any]] = {}
+    languages = set()
+    for row in rows:
+        c = counters.setdefault(row[0], [0, 0, None, None])
+        c[0] += 1
+        c[1] += 1 if row[3] == "zh" else 0
+        c[2] = _max(c[2], row[7])
+        c[3] = _max(c[3], row[11])
+        languages.add((row[0], row[3]))
+    cursor.executemany(_COUNTERS_UPSERT_SQL, [(user_id, *c) for user_id, c in counters.items()])
+    cursor.executemany(
+        "INSERT OR IGNORE INTO user_languages (user_id, lang) VALUES (?, ?)", sorted(languages)
+    )
+
+    groups: Dict[tuple, Dict[str, Any]] = {}
+    for row in rows:
+        user_id, pack_id, duration_ms = row[0], row[2] or "", row[6]
+        values = {"wpm": row[7], "cpm": row[8], "cer": row[9], "accuracy": row[11]}
+        g = groups.get((user_id, pack_id))
+        if g is None:
+            g = groups[(user_id, pack_id)] = {"attempts": 0, "duration": 0, "wpm_max": None}
+            for name in _ROLLUP_METRICS:
+                g[name] = [0, 0.0, 0.0]
+        g["attempts"] += 1
+        g["duration"] += int(duration_ms or 0)
+        for name, v in values.items():
+            if v is not None:
+                acc = g[name]
+                acc[0] += 1
+                acc[1] += v
+                acc[2] += v * v
+        g["wpm_max"] = _max(g["wpm_max"], values["wpm"])
+
+    cursor.executemany(_ROLLUP_UPSERT_SQL, [
+        (
+            user_id, pack_id, g["attempts"], g["duration"],
+            *g["wpm"], g["wpm_max"], *g["cpm"], *g["cer"], *g["accuracy"],
+        )
+        for (user_id, pack_id), g in groups.items()
+    ])
+
+
+def _backfill_user_pack_stats(cursor: sqlite3.Cursor) -> None:
+    cursor.execute("DELETE FROM user_pack_stats")
+    cursor.execute("""
+        INSERT INTO user_pack_stats (
+            user_id, pack_id, attempts, duration_sum,
+            wpm_n, wpm_sum, wpm_sq, wpm_max,
+            cpm_n, cpm_sum, cpm_sq,
+            cer_n, cer_sum, cer_sq,
+            accuracy_n, accuracy_sum, accuracy_sq
+        )
+        SELECT
+            user_id, COALESCE(pack_id, ''), COUNT(*), COALESCE(SUM(duration_ms), 0),
+            COUNT(wpm), COALESCE(SUM(wpm), 0), COALESCE(SUM(wpm * wpm), 0), MAX(wpm),
+            COUNT(cpm), COALESCE(SUM(cpm), 0), COALESCE(SUM(cpm * cpm), 0),
+            COUNT(cer), COALESCE(SUM(cer), 0), COALESCE(SUM(cer * cer), 0),
+            COUNT(accuracy), COALESCE(SUM(accuracy), 0), COALESCE(SUM(accuracy * accuracy), 0)
+        FROM attempts
+        GROUP BY user_id, COALESCE(pack_id, '')
+    """)
+
+
+def _backfill_user_counters(cursor: sqlite3.Cursor) -> None:
+    cursor.execute("DELETE FROM user_counters")
+    cursor.execute("DELETE FROM user_languages")
+    cursor.execute("""
+        INSERT INTO user_counters (user_id, attempts, zh_attempts, max_wpm, max_accuracy)
+        SELECT user_id, COUNT(*), SUM(CASE WHEN lang = 'zh' THEN 1 ELSE 0 END), MAX(wpm), MAX(accuracy)
+        FROM attempts
+        GROUP BY user_id
+    """)
+    cursor.execute("""
+        INSERT INTO user_languages (user_id, lang)
+        SELECT DISTINCT user_id, lang FROM attempts
+    """)
+
+
+def backfill_rollups() -> int:
+    """
+    Rebuild user_pack_stats and the achievement counters from the attempts table.
+    Returns the number of user_pack_stats rows.
+    """
+    with get_cursor() as cursor:
+        _backfill_user_pack_stats(cursor)
+        _backfill_user_counters(cursor)
+        cursor.execute("SELECT COUNT(*) FROM user_pack_stats")
+        return cursor.fetchone()[0]
+
+
+_IMPORT_ATTEMPT_SQL = """
+    INSERT INTO attempts (
+        user_id, item_id, pack_id, lang, typed_text, target_text,
+        duration_ms, wpm, cpm, cer, error_count, accuracy, error_heatmap, created_at
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))
+"""
+
+_CHECKPOINT_UPSERT_SQL = """
+    INSERT INTO import_checkpoints (source, file_id, byte_offset, lines, imported, duplicates, skipped, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT (source) DO UPDATE SET
+        file_id = excluded.file_id,
+        byte_offset = excluded.byte_offset,
+        lines = lines + excluded.lines,
+        imported = imported + excluded.imported,
+        duplicates = duplicates + excluded.duplicates,
+        skipped = skipped + excluded.skipped,
+        updated_at = CURRENT_TIMESTAMP
+"""
+
+
+def get_import_checkpoint(source: str) -> Optional[Dict[str, Any]]:
+    with get_cursor() as cursor:
+        cursor.execute("SELECT * FROM import_checkpoints WHERE source = ?", (source,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+
+def reset_import_checkpoint(source: str) -> None:
+    """Forget the resume offset (imported keys stay, so a re-scan still skips duplicates)."""
+    with get_cursor() as cursor:
+        cursor.execute("UPDATE import_checkpoints SET byte_offset = 0 WHERE source = ?", (source,))
+
+
+def import_attempt_batch(
+    source: str,
+    attempts: List[Dict[str, Any]],
+    byte_offset: int,
+    lines: int,
+    skipped: int = 0,
+    file_id: Optional[str] = None,
+) -> Dict[str, int]:
+    """
+    Insert a batch of historical attempts and advance the import checkpoint of
+    ``source`` to ``byte_offset`` in the same transaction, so an interrupted import
+    resumes exactly after the last committed batch. ``file_id`` is stored with the
+    offset so a different file later found at the same path is not resumed mid-way.
+
+    Each attempt takes record_attempt's fields plus ``key`` (a content key used to
+    skip lines imported before, e.g. after a checkpoint reset) and an optional
+    ``created_at``. Rollups are updated; streaks and achievements are not, since
+    they describe live practice.
+    """
+    with get_cursor() as cursor:
+        fresh: Dict[str, Dict[str, Any]] = {}
+        for a in attempts:
+            fresh.setdefault(a["key"], a)
+        keys = list(fresh)
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            cursor.execute(
+                f"SELECT key FROM imported_attempt_keys WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            )
+            for row in cursor.fetchall():
+                del fresh[row["key"]]
+
+        batch = list(fresh.values())
+        if batch:
+            users = list(dict.fromkeys(a["user_id"] for a in batch))
+            cursor.executemany("INSERT OR IGNORE INTO users (id, username) VALUES (?, ?)", [(u, u) for u in users])
+            # The username may already belong to another account; keep the id importable anyway
+            cursor.executemany(
+                "INSERT OR IGNORE INTO users (id, username) VALUES (?, ?)", [(u, f"{u}#legacy") for u in users]
+            )
+
+            rows = [
+                _attempt_row(
+                    a["user_id"], a["item_id"], a["lang"], a["typed_text"], a["target_text"],
+                    a["duration_ms"], a.get("pack_id"), a.get("metrics"),
+                ) + (a.get("created_at"),)
+                for a in batch
+            ]
+            cursor.executemany(_IMPORT_ATTEMPT_SQL, rows)
+            _rollup_attempts(cursor, rows)
+
+            # The transaction holds the write lock, so the AUTOINCREMENT ids are contiguous
+            cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'attempts'")
+            last_id = cursor.fetchone()["seq"]
+            first_id = last_id - len(rows) + 1
+            cursor.executemany(
+                "INSERT INTO imported_attempt_keys (key, attempt_id) VALUES (?, ?)",
+                [(a["key"], first_id + n) for n, a in enumerate(batch)],
+            )
+
+        duplicates = len(attempts) - len(batch)
+        cursor.execute(_CHECKPOINT_UPSERT_SQL, (source, file_id, byte_offset, lines, len(batch), duplicates, skipped))
+        return {"imported": len(batch), "duplicates": duplicates}
+
+
 def record_attempt(
     user_id: str,
     item_id: str,
@@ -158,23 +794,11 @@ def record_attempt(
     metrics: Optional[Dict[str, Any]] = None
 ) -> int:
     """Record a typing attempt and return the attempt ID."""
+    row = _attempt_row(user_id, item_id, lang, typed_text, target_text, duration_ms, pack_id, metrics)
     with get_cursor() as cursor:
-        wpm = metrics.get("wpm") if metrics else None
-        cpm = metrics.get("cpm") if metrics else None
-        cer = metrics.get("cer") if metrics else None
-        error_count = metrics.get("error_count") if metrics else None
-        accuracy = metrics.get("accuracy") if metrics else None
-        error_heatmap = json.dumps(metrics.get("error_heatmap", {})) if metrics else None
-
-        cursor.execute("""
-            INSERT INTO attempts (
-                user_id, item_id, pack_id, lang, typed_text, target_text,
-                duration_ms, wpm, cpm, cer, error_count, accuracy, error_heatmap
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            user_id, item_id, pack_id, lang, typed_text, target_text,
-            duration_ms, wpm, cpm, cer, error_count, accuracy, error_heatmap
-        ))
+        cursor.execute(_INSERT_ATTEMPT_SQL, row)
+        attempt_id = cursor.lastrowid
+        _rollup_attempts(cursor, [row])
 
         # Update user last_active
         cursor.execute("""
@@ -182,134 +806,386 @@ def record_attempt(
             WHERE id = ?
         """, (user_id,))
 
-        return cursor.lastrowid
+        return attempt_id
+
+
+def record_attempts(attempts: List[Dict[str, Any]]) -> List[int]:
+    """
+    Record many typing attempts in a single transaction and return their IDs in order.
+    Each attempt dict takes the same fields as record_attempt's arguments.
+    """
+    if not attempts:
+        return []
+
+    rows = []
+    users = []
+    for a in attempts:
+        rows.append(_attempt_row(
+            a["user_id"], a["item_id"], a["lang"], a["typed_text"], a["target_text"],
+            a["duration_ms"], a.get("pack_id"), a.get("metrics")
+        ))
+        if a["user_id"] not in users:
+            users.append(a["user_id"])
+
+    with get_cursor() as cursor:
+        cursor.executemany(_INSERT_ATTEMPT_SQL, rows)
+        _rollup_attempts(cursor, rows)
+
+        # The transaction holds the write lock, so the AUTOINCREMENT ids are contiguous
+        cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'attempts'")
+        last_id = cursor.fetchone()["seq"]
+
+        cursor.executemany("""
+            UPDATE users SET last_active = CURRENT_TIMESTAMP
+            WHERE id = ?
+        """, [(u,) for u in users])
+
+        return list(range(last_id - len(rows) + 1, last_id + 1))
+
+
+_write_queue: "queue.Queue" = queue.Queue()
+_writer_thread: Optional[threading.Thread] = None
+_writer_lock = threading.Lock()
+_STOP = object()
+
+
+def _write_attempts(pending: List[Dict[str, Any]]) -> None:
+    """Write queued attempts, their streak updates and last_active in one transaction."""
+    try:
+        start = time.perf_counter()
+        with get_cursor() as cursor:
+            attempt_ids = []
+            for w in pending:
+                cursor.execute(_INSERT_ATTEMPT_SQL, w["row"])
+                attempt_ids.append(cursor.lastrowid)
+            _rollup_attempts(cursor, [w["row"] for w in pending])
+            recorded = time.perf_counter()
+            ATTEMPT_STAGE_LATENCY.observe(recorded - start, "record_attempt")
+
+            users = list(dict.fromkeys(w["row"][0] for w in pending))
+            cursor.executemany("""
+                UPDATE users SET last_active = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, [(u,) for u in users])
+
+            # One streak update per user and day, shared by all of that user's attempts
+            streaks: Dict[tuple, Dict[str, int]] = {}
+            for w in pending:
+                key = (w["row"][0], w["practice_date"])
+                if key not in streaks:
+                    streaks[key] = _update_streak(cursor, *key)
+            streaked = time.perf_counter()
+            ATTEMPT_STAGE_LATENCY.observe(streaked - recorded, "update_streak")
+        ATTEMPT_STAGE_LATENCY.observe(time.perf_counter() - streaked, "commit")
+    except Exception as exc:
+        if len(pending) > 1:
+            # Retry one by one so a single bad attempt doesn't fail the whole group
+            for w in pending:
+                _write_attempts([w])
+        elif not pending[0]["future"].done():
+            pending[0]["future"].set_exception(exc)
+        return
+
+    for w, attempt_id in zip(pending, attempt_ids):
+        if w["future"].done():
+            continue
+        w["future"].set_result({
+            "attempt_id": attempt_id,
+            "streak": dict(streaks[(w["row"][0], w["practice_date"])]),
+        })
+
+
+def _claim(item: Dict[str, Any], pending: List[Dict[str, Any]]) -> None:
+    """
+    Add a queued attempt to the group unless its caller already gave up on it
+    (e.g. the client disconnected); once claimed, the future can no longer be
+    cancelled, so resolving it later cannot fail.
+    """
+    if item["future"].set_running_or_notify_cancel():
+        pending.append(item)
+
+
+def _writer_loop() -> None:
+    while True:
+        first = _write_queue.get()
+        if first is _STOP:
+            return
+        pending: List[Dict[str, Any]] = []
+        _claim(first, pending)
+        stopping = False
+        deadline = time.monotonic() + WRITE_BATCH_MS / 1000.0
+        while len(pending) < WRITE_BATCH_MAX:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = _write_queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                stopping = True
+                break
+            _claim(item, pending)
+        if pending:
+            try:
+                with pooled(write=True):
+                    _write_attempts(pending)
+            except BaseException as exc:
+                # Never let one group take the writer down: fail its callers and carry on
+                for w in pending:
+                    if not w["future"].done():
+                        w["future"].set_exception(exc)
+                if not isinstance(exc, Exception):
+                    raise
+        if stopping:
+            return
+
+
+def start_writer() -> None:
+    """Start the group-commit writer thread (also started lazily by submit_attempt)."""
+    global _writer_thread
+    with _writer_lock:
+        if _writer_thread is None:
+            _writer_thread = threading.Thread(target=_writer_loop, name="attempt-writer", daemon=True)
+            _writer_thread.start()
+
+
+def stop_writer() -> None:
+    """Flush everything queued so far and stop the writer thread."""
+    global _writer_thread
+    with _writer_lock:
+        if _writer_thread is None:
+            return
+        _write_queue.put(_STOP)
+        _writer_thread.join()
+        _writer_thread = None
+
+
+def submit_attempt(
+    user_id: str,
+    item_id: str,
+    lang: str,
+    typed_text: str,
+    target_text: str,
+    duration_ms: int,
+    pack_id: Optional[str] = None,
+    metrics: Optional[Dict[str, Any]] = None,
+    practice_date: Optional[str] = None
+) -> "Future[Dict[str, Any]]":
+    """
+    Queue an attempt for the group-commit writer. The attempt row, the user's
+    last_active and their streak for ``practice_date`` (default: today) are written
+    together; the returned future resolves to {"attempt_id", "streak"} once committed.
+    Cancelling the future before the writer picks the attempt up drops it.
+    """
+    start_writer()
+    future: "Future[Dict[str, Any]]" = Future()
+    _write_queue.put({
+        "row": _attempt_row(user_id, item_id, lang, typed_text, target_text, duration_ms, pack_id, metrics),
+        "practice_date": practice_date or datetime.now().date().isoformat(),
+        "future": future,
+    })
+    return future
+
+
+# Columns returned by get_user_attempts unless the full texts are requested
+_ATTEMPT_SUMMARY_COLUMNS = (
+    "id, user_id, item_id, pack_id, lang, duration_ms, wpm, cpm, cer, "
+    "error_count, accuracy, error_heatmap, created_at"
+)
 
 
 def get_user_attempts(
     user_id: str,
     pack_id: Optional[str] = None,
     limit: int = 100,
-    offset: int = 0
+    offset: int = 0,
+    before_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    include_text: bool = False
 ) -> List[Dict[str, Any]]:
-    """Get typing attempts for a user, optionally filtered by pack."""
+    """
+    Get typing attempts for a user, newest first, optionally filtered by pack.
+
+    Pass the id of the last row of a page as ``before_id`` to get the next (older)
+    page, or the id of the first row as ``after_id`` to get the previous (newer)
+    one. Both seek through the (user_id, [pack_id,] created_at, id) indexes instead
+    of skipping rows; ``offset`` is ignored with a cursor. typed_text/target_text
+    are only returned when ``include_text`` is set.
+    """
+    columns = "*" if include_text else _ATTEMPT_SUMMARY_COLUMNS
+    where = ["user_id = ?"]
+    params: List[Any] = [user_id]
+    if pack_id:
+        where.append("pack_id = ?")
+        params.append(pack_id)
+
+    with get_cursor() as cursor:
+        order = "DESC"
+        cursor_id = before_id if before_id is not None else after_id
+        if cursor_id is not None:
+            cursor.execute("SELECT created_at FROM attempts WHERE id = ? AND user_id = ?", (cursor_id, user_id))
+            row = cursor.fetchone()
+            if row is None:
+                return []
+            if before_id is not None:
+                where.append("(created_at, id) < (?, ?)")
+            else:
+                where.append("(created_at, id) > (?, ?)")
+                order = "ASC"
+            params.extend([row["created_at"], cursor_id])
+            offset = 0
+
+        cursor.execute(f"""
+            SELECT {columns} FROM attempts
+            WHERE {" AND ".join(where)}
+            ORDER BY created_at {order}, id {order}
+            LIMIT ? OFFSET ?
+        """, (*params, limit, offset))
+
+        rows = [dict(row) for row in cursor.fetchall()]
+        if order == "ASC":
+            rows.reverse()
+        return rows
+
+
+def count_user_attempts(user_id: str, pack_id: Optional[str] = None) -> int:
+    """Total attempts for a user (or one of their packs), read from the rollups."""
     with get_cursor() as cursor:
         if pack_id:
             cursor.execute("""
-                SELECT * FROM attempts
+                SELECT attempts FROM user_pack_stats
                 WHERE user_id = ? AND pack_id = ?
-                ORDER BY created_at DESC
-                LIMIT ? OFFSET ?
-            """, (user_id, pack_id, limit, offset))
+            """, (user_id, pack_id))
         else:
             cursor.execute("""
-                SELECT * FROM attempts
+                SELECT attempts FROM user_counters
                 WHERE user_id = ?
-                ORDER BY created_at DESC
-                LIMIT ? OFFSET ?
-            """, (user_id, limit, offset))
+            """, (user_id,))
+        row = cursor.fetchone()
+        return row["attempts"] if row else 0
 
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
+
+def _stddev(n: int, total: float, sq: float) -> Optional[float]:
+    if not n:
+        return None
+    mean = total / n
+    return math.sqrt(max(0.0, sq / n - mean * mean))
 
 
 def get_user_stats(user_id: str) -> Dict[str, Any]:
-    """Get aggregated statistics for a user."""
+    """Get aggregated statistics for a user from the user_pack_stats rollup."""
     with get_cursor() as cursor:
-        # Overall stats
         cursor.execute("""
-            SELECT
-                COUNT(*) as total_attempts,
-                AVG(wpm) as avg_wpm,
-                AVG(cpm) as avg_cpm,
-                AVG(cer) as avg_cer,
-                AVG(accuracy) as avg_accuracy,
-                SUM(duration_ms) as total_time_ms,
-                MAX(wpm) as best_wpm
-            FROM attempts
+            SELECT * FROM user_pack_stats
             WHERE user_id = ?
+            ORDER BY pack_id
         """, (user_id,))
+        rows = [dict(row) for row in cursor.fetchall()]
 
-        overall = dict(cursor.fetchone())
-
-        # Per-pack stats
-        cursor.execute("""
-            SELECT
-                pack_id,
-                COUNT(*) as attempts,
-                AVG(wpm) as avg_wpm,
-                AVG(cpm) as avg_cpm,
-                AVG(cer) as avg_cer,
-                AVG(accuracy) as avg_accuracy
-            FROM attempts
-            WHERE user_id = ? AND pack_id IS NOT NULL
-            GROUP BY pack_id
-        """, (user_id,))
+    def avg(n: int, total: float) -> Optional[float]:
+        return total / n if n else None
 
-        per_pack = [dict(row) for row in cursor.fetchall()]
+    # Overall stats
+    sums = {
+        key: sum(r[key] for r in rows)
+        for key in ("attempts", "duration_sum", "wpm_n", "wpm_sum", "wpm_sq",
+                    "cpm_n", "cpm_sum", "cer_n", "cer_sum", "accuracy_n", "accuracy_sum")
+    }
+    wpm_maxes = [r["wpm_max"] for r in rows if r["wpm_max"] is not None]
+    overall = {
+        "total_attempts": sums["attempts"],
+        "avg_wpm": avg(sums["wpm_n"], sums["wpm_sum"]),
+        "avg_cpm": avg(sums["cpm_n"], sums["cpm_sum"]),
+        "avg_cer": avg(sums["cer_n"], sums["cer_sum"]),
+        "avg_accuracy": avg(sums["accuracy_n"], sums["accuracy_sum"]),
+        "total_time_ms": sums["duration_sum"] if rows else None,
+        "best_wpm": max(wpm_maxes) if wpm_maxes else None,
+        "stddev_wpm": _stddev(sums["wpm_n"], sums["wpm_sum"], sums["wpm_sq"]),
+    }
 
-        return {
-            "overall": overall,
-            "per_pack": per_pack
+    # Per-pack stats
+    per_pack = [
+        {
+            "pack_id": r["pack_id"],
+            "attempts": r["attempts"],
+            "avg_wpm": avg(r["wpm_n"], r["wpm_sum"]),
+            "avg_cpm": avg(r["cpm_n"], r["cpm_sum"]),
+            "avg_cer": avg(r["cer_n"], r["cer_sum"]),
+            "avg_accuracy": avg(r["accuracy_n"], r["accuracy_sum"]),
+            "stddev_wpm": _stddev(r["wpm_n"], r["wpm_sum"], r["wpm_sq"]),
         }
+        for r in rows
+        if r["pack_id"] != ""
+    ]
 
+    return {
+        "overall": overall,
+        "per_pack": per_pack
+    }
 
-def update_streak(user_id: str, practice_date: str) -> Dict[str, int]:
-    """Update user's practice streak based on practice date."""
-    with get_cursor() as cursor:
-        # Get current streak data
+
+def _update_streak(cursor: sqlite3.Cursor, user_id: str, practice_date: str) -> Dict[str, int]:
+    # Get current streak data
+    cursor.execute("""
+        SELECT current_streak, longest_streak, last_practice_date
+        FROM streaks
+        WHERE user_id = ?
+    """, (user_id,))
+
+    row = cursor.fetchone()
+    if not row:
+        # Initialize streak for new user
         cursor.execute("""
-            SELECT current_streak, longest_streak, last_practice_date
-            FROM streaks
-            WHERE user_id = ?
-        """, (user_id,))
+            INSERT INTO streaks (user_id, current_streak, longest_streak, last_practice_date)
+            VALUES (?, 1, 1, ?)
+        """, (user_id, practice_date))
+        return {"current_streak": 1, "longest_streak": 1}
 
-        row = cursor.fetchone()
-        if not row:
-            # Initialize streak for new user
-            cursor.execute("""
-                INSERT INTO streaks (user_id, current_streak, longest_streak, last_practice_date)
-                VALUES (?, 1, 1, ?)
-            """, (user_id, practice_date))
-            return {"current_streak": 1, "longest_streak": 1}
-
-        current_streak = row["current_streak"]
-        longest_streak = row["longest_streak"]
-        last_date = row["last_practice_date"]
-
-        # Parse dates
-        from datetime import datetime, timedelta
-        practice_dt = datetime.strptime(practice_date, "%Y-%m-%d").date()
-
-        if last_date:
-            last_dt = datetime.strptime(last_date, "%Y-%m-%d").date()
-            days_diff = (practice_dt - last_dt).days
-
-            if days_diff == 0:
-                # Same day, no change
-                pass
-            elif days_diff == 1:
-                # Consecutive day, increment streak
-                current_streak += 1
-                longest_streak = max(longest_streak, current_streak)
-            else:
-                # Streak broken, reset
-                current_streak = 1
+    current_streak = row["current_streak"]
+    longest_streak = row["longest_streak"]
+    last_date = row["last_practice_date"]
+
+    # Parse dates
+    from datetime import datetime, timedelta
+    practice_dt = datetime.strptime(practice_date, "%Y-%m-%d").date()
+
+    if last_date:
+        last_dt = datetime.strptime(last_date, "%Y-%m-%d").date()
+        days_diff = (practice_dt - last_dt).days
+
+        if days_diff == 0:
+            # Same day, no change
+            pass
+        elif days_diff == 1:
+            # Consecutive day, increment streak
+            current_streak += 1
+            longest_streak = max(longest_streak, current_streak)
         else:
-            # First practice
+            # Streak broken, reset
             current_streak = 1
-            longest_streak = 1
+    else:
+        # First practice
+        current_streak = 1
+        longest_streak = 1
 
-        # Update database
-        cursor.execute("""
-            UPDATE streaks
-            SET current_streak = ?, longest_streak = ?, last_practice_date = ?
-            WHERE user_id = ?
-        """, (current_streak, longest_streak, practice_date, user_id))
+    # Update database
+    cursor.execute("""
+        UPDATE streaks
+        SET current_streak = ?, longest_streak = ?, last_practice_date = ?
+        WHERE user_id = ?
+    """, (current_streak, longest_streak, practice_date, user_id))
 
-        return {
-            "current_streak": current_streak,
-            "longest_streak": longest_streak
-        }
+    return {
+        "current_streak": current_streak,
+        "longest_streak": longest_streak
+    }
+
+
+def update_streak(user_id: str, practice_date: str) -> Dict[str, int]:
+    """Update user's practice streak based on practice date."""
+    with get_cursor() as cursor:
+        return _update_streak(cursor, user_id, practice_date)
 
 
 def get_streak(user_id: str) -> Dict[str, int]:
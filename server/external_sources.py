@@ -1,18 +1,41 @@
-"""Helpers for fetching open vocabulary sources on-demand."""
+"""Helpers for fetching open vocabulary sources on-demand.
+
+Upstream bodies are fetched through one app-lifetime pooled ``httpx.AsyncClient``
+and cached on disk under ``data/source_cache/`` keyed by URL. A cached body is
+served as-is for ``SOURCE_CACHE_TTL_S`` seconds, then revalidated with
+If-None-Match / If-Modified-Since; concurrent requests for the same URL share a
+single in-flight fetch. Bodies are streamed to disk and parsed incrementally from
+there, so neither step holds a whole upstream payload in memory.
+"""
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
+import os
+import tempfile
+import time
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
 
 try:
     import httpx
 except ImportError:  # pragma: no cover - optional dependency
     httpx = None  # type: ignore
 
+from .instrumentation import SOURCE_CACHE_REQUESTS
+from .json_stream import iter_array
+
 
 DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+SOURCE_CACHE_DIR = Path(os.environ.get("TYPING_SOURCE_CACHE_DIR", str(DATA_DIR / "source_cache")))
+# Seconds a cached upstream body is served without revalidation
+SOURCE_CACHE_TTL_S = float(os.environ.get("TYPING_SOURCE_CACHE_TTL_S", "3600"))
+HTTP_TIMEOUT_S = float(os.environ.get("TYPING_HTTP_TIMEOUT_S", "15"))
+HTTP_MAX_CONNECTIONS = int(os.environ.get("TYPING_HTTP_MAX_CONNECTIONS", "20"))
+# Read size when streaming bodies to and from the cache
+STREAM_CHUNK_BYTES = 64 * 1024
 
 
 class SourceNotAvailable(Exception):
@@ -74,100 +97,261 @@ def list_sources() -> List[RemoteSource]:
     return sorted(sources.values(), key=lambda s: s["id"])
 
 
-async def fetch_source_items(source_id: str, limit: int = 100) -> Dict[str, Any]:
-    sources = {**DEFAULT_SOURCES, **_load_custom_sources()}
-    if source_id not in sources:
-        raise SourceNotAvailable(f"Unknown source: {source_id}")
+# ---------------------------------------------------------------------------
+# Pooled client, disk cache and single-flight fetches
+
+_client: Optional["httpx.AsyncClient"] = None
+_inflight: Dict[str, "asyncio.Task[Path]"] = {}
+
+
+def get_http_client() -> "httpx.AsyncClient":
+    """The shared keep-alive client, created on first use."""
+    global _client
     if httpx is None:
         raise SourceNotAvailable("httpx dependency not installed. Run `pip install httpx`. ")
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=HTTP_TIMEOUT_S,
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+            ),
+        )
+    return _client
 
-    config = sources[source_id]
+
+async def close_http_client() -> None:
+    global _client
+    client, _client = _client, None
+    if client is not None:
+        await client.aclose()
+
+
+def _cache_paths(url: str) -> Tuple[Path, Path]:
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return SOURCE_CACHE_DIR / f"{key}.body", SOURCE_CACHE_DIR / f"{key}.meta.json"
+
+
+def _read_cache_meta(url: str) -> Optional[Dict[str, Any]]:
+    """Metadata of the cached body for ``url``, or None if there is no intact copy."""
+    body_path, meta_path = _cache_paths(url)
     try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.get(config["url"], timeout=15.0)
-            response.raise_for_status()
-    except Exception as exc:  # pragma: no cover - network dependent
-        raise SourceNotAvailable(str(exc)) from exc
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        size = body_path.stat().st_size
+    except (OSError, ValueError):
+        return None
+    if meta.get("url") != url or meta.get("size") != size:
+        return None
+    return meta
 
-    if config["format"] == "json":
-        payload = response.json()
-        if config.get("list_path"):
-            for key in config["list_path"]:
-                payload = payload[key]
-        items_raw = payload[:limit]
-        items = []
-        for entry in items_raw:
-            text = entry.get(config.get("text_field", "word"), "").strip()
-            if not text:
-                continue
-            translation_field = config.get("translation_field")
-            translation_value = entry.get(translation_field, "") if translation_field else ""
-            if isinstance(translation_value, list):
-                translation_text = ", ".join(translation_value[:3])
-            else:
-                translation_text = str(translation_value)
-            romanization = entry.get(config.get("pinyin_field"))
-            items.append(
-                {
-                    "id": f"{source_id}-{len(items)+1:04d}",
-                    "type": "word",
-                    "lang": config.get("source_lang", "en"),
-                    "text": text,
-                    "romanization": romanization,
-                    "translation": {config.get("target_lang", "zh"): translation_text},
-                    "tags": config.get("topics", []),
-                    "license": config.get("license"),
-                    "source": config.get("name"),
-                }
-            )
-        pack = {
-            "id": f"remote-{source_id}",
-            "name": config.get("name", source_id),
-            "languages": [config.get("source_lang", "en"), config.get("target_lang", "zh")],
-            "license": config.get("license"),
-            "source": config.get("url"),
-            "topics": config.get("topics", []),
-            "notes": config.get("description"),
-            "count": len(items),
+
+def _open_tmp(path: Path) -> IO[bytes]:
+    """A uniquely named temp file next to ``path``, so workers never write into the same one."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return tempfile.NamedTemporaryFile(dir=path.parent, prefix=path.name + ".", suffix=".tmp", delete=False)
+
+
+def _discard(f: IO[bytes]) -> None:
+    f.close()
+    try:
+        os.unlink(f.name)
+    except OSError:
+        pass
+
+
+def _write_cache_meta(url: str, meta: Dict[str, Any]) -> None:
+    _, meta_path = _cache_paths(url)
+    with _open_tmp(meta_path) as f:
+        f.write(json.dumps(meta).encode("utf-8"))
+    os.replace(f.name, meta_path)
+
+
+async def _download(url: str, headers: Dict[str, str], meta: Optional[Dict[str, Any]]) -> Path:
+    """
+    GET ``url`` and stream the body chunk by chunk into the cache, so memory use
+    does not depend on the upstream size. A 304 only refreshes the metadata.
+    File writes run in worker threads to keep disk I/O off the event loop.
+    """
+    body_path, _ = _cache_paths(url)
+    async with get_http_client().stream("GET", url, headers=headers) as response:
+        if response.status_code == 304 and meta is not None:
+            SOURCE_CACHE_REQUESTS.inc("revalidated")
+            meta["fetched_at"] = time.time()
+            await asyncio.to_thread(_write_cache_meta, url, meta)
+            return body_path
+        response.raise_for_status()
+        f = await asyncio.to_thread(_open_tmp, body_path)
+        size = 0
+        try:
+            async for chunk in response.aiter_bytes(STREAM_CHUNK_BYTES):
+                await asyncio.to_thread(f.write, chunk)
+                size += len(chunk)
+            await asyncio.to_thread(f.close)
+            await asyncio.to_thread(os.replace, f.name, body_path)
+        except BaseException:
+            _discard(f)
+            raise
+        SOURCE_CACHE_REQUESTS.inc("downloaded")
+        meta = {
+            "url": url,
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+            "fetched_at": time.time(),
+            "size": size,
         }
-        return {"pack": pack, "items": items}
+    await asyncio.to_thread(_write_cache_meta, url, meta)
+    return body_path
+
+
+async def _fetch(url: str) -> Path:
+    meta = await asyncio.to_thread(_read_cache_meta, url)
+    body_path, _ = _cache_paths(url)
+    if meta is not None and time.time() - meta["fetched_at"] < SOURCE_CACHE_TTL_S:
+        SOURCE_CACHE_REQUESTS.inc("fresh")
+        return body_path
 
+    headers = {}
+    if meta is not None:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+    try:
+        return await _download(url, headers, meta)
+    except SourceNotAvailable:
+        raise
+    except Exception as exc:
+        if meta is not None:
+            # Upstream is down; a stale copy beats no copy
+            SOURCE_CACHE_REQUESTS.inc("stale")
+            return body_path
+        raise SourceNotAvailable(str(exc)) from exc
+
+
+async def fetch_url(url: str) -> Path:
+    """
+    Path of the cached upstream body for ``url``, fetching or revalidating it as
+    needed. Callers arriving while a fetch of the same URL is in flight await that
+    fetch instead of starting their own.
+    """
+    task = _inflight.get(url)
+    if task is None:
+        task = asyncio.ensure_future(_fetch(url))
+        _inflight[url] = task
+        task.add_done_callback(lambda _t: _inflight.pop(url, None))
+    # Shielded so one cancelled caller does not abort the fetch for the others
+    return await asyncio.shield(task)
+
+
+def _read_chunks(path: Path) -> Iterator[str]:
+    with path.open("r", encoding="utf-8") as f:
+        while True:
+            chunk = f.read(STREAM_CHUNK_BYTES)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _json_item(config: RemoteSource, entry: Any) -> Optional[Dict[str, Any]]:
+    if not isinstance(entry, dict):
+        return None
+    text = str(entry.get(config.get("text_field", "word")) or "").strip()
+    if not text:
+        return None
+    translation_field = config.get("translation_field")
+    translation_value = entry.get(translation_field, "") if translation_field else ""
+    if isinstance(translation_value, list):
+        translation_text = ", ".join(translation_value[:3])
+    else:
+        translation_text = str(translation_value)
+    return {
+        "type": "word",
+        "lang": config.get("source_lang", "en"),
+        "text": text,
+        "romanization": entry.get(config.get("pinyin_field")),
+        "translation": {config.get("target_lang", "zh"): translation_text},
+        "tags": config.get("topics", []),
+        "license": config.get("license"),
+        "source": config.get("name"),
+    }
+
+
+def _tatoeba_item(config: RemoteSource, entry: Any) -> Optional[Dict[str, Any]]:
+    if not isinstance(entry, dict):
+        return None
+    text = str(entry.get("text") or "").strip()
+    target_text = ""
+    for t in entry.get("translations") or []:
+        if isinstance(t, dict) and t.get("language") == config.get("target_lang", "zh"):
+            target_text = t.get("text", "")
+            break
+    if not text or not target_text:
+        return None
+    return {
+        "type": "sentence",
+        "lang": config.get("source_lang", "en"),
+        "text": text,
+        "translation": {config.get("target_lang", "zh"): target_text},
+        "tags": config.get("topics", []),
+        "source": "Tatoeba API",
+        "license": config.get("license"),
+    }
+
+
+def _parse_items(source_id: str, config: RemoteSource, body_path: Path, limit: Optional[int]) -> List[Dict[str, Any]]:
+    """
+    Stream entries out of the cached body and normalize them, stopping as soon as
+    ``limit`` usable items have been produced (all of them when ``limit`` is None).
+    """
     if config["format"].lower() == "tatoeba":
-        data = response.json()
-        results = data.get("results", [])[:limit]
-        items = []
-        for entry in results:
-            text = entry.get("text", "").strip()
-            translations = entry.get("translations", [])
-            target_text = ""
-            for t in translations:
-                if t.get("language") == config.get("target_lang", "zh"):
-                    target_text = t.get("text", "")
-                    break
-            if not text or not target_text:
+        path, normalize = ["results"], _tatoeba_item
+    else:
+        path, normalize = config.get("list_path") or [], _json_item
+
+    items: List[Dict[str, Any]] = []
+    if limit is not None and limit <= 0:
+        return items
+    try:
+        for entry in iter_array(_read_chunks(body_path), path):
+            item = normalize(config, entry)
+            if item is None:
                 continue
-            items.append(
-                {
-                    "id": f"{source_id}-{len(items)+1:04d}",
-                    "type": "sentence",
-                    "lang": config.get("source_lang", "en"),
-                    "text": text,
-                    "translation": {config.get("target_lang", "zh"): target_text},
-                    "tags": config.get("topics", []),
-                    "source": "Tatoeba API",
-                    "license": config.get("license"),
-                }
-            )
-        pack = {
-            "id": f"remote-{source_id}",
-            "name": config.get("name", source_id),
-            "languages": [config.get("source_lang", "en"), config.get("target_lang", "zh")],
-            "license": config.get("license"),
-            "source": config.get("url"),
-            "topics": config.get("topics", []),
-            "notes": config.get("description"),
-            "count": len(items),
-        }
-        return {"pack": pack, "items": items}
+            items.append({"id": f"{source_id}-{len(items)+1:04d}", **item})
+            if limit is not None and len(items) >= limit:
+                break
+    except KeyError as exc:
+        if normalize is _tatoeba_item:
+            # A Tatoeba response without results simply has nothing to offer
+            return items
+        raise SourceNotAvailable(f"list_path key {exc} not found in {source_id}") from exc
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise SourceNotAvailable(f"Invalid JSON from {source_id}: {exc}") from exc
+    return items
+
+
+def _pack_for(source_id: str, config: RemoteSource, count: int) -> Dict[str, Any]:
+    return {
+        "id": f"remote-{source_id}",
+        "name": config.get("name", source_id),
+        "languages": [config.get("source_lang", "en"), config.get("target_lang", "zh")],
+        "license": config.get("license"),
+        "source": config.get("url"),
+        "topics": config.get("topics", []),
+        "notes": config.get("description"),
+        "count": count,
+    }
+
+
+async def fetch_source_items(source_id: str, limit: Optional[int] = 100) -> Dict[str, Any]:
+    sources = {**DEFAULT_SOURCES, **_load_custom_sources()}
+    if source_id not in sources:
+        raise SourceNotAvailable(f"Unknown source: {source_id}")
+    if httpx is None:
+        raise SourceNotAvailable("httpx dependency not installed. Run `pip install httpx`. ")
 
-    raise SourceNotAvailable(f"Unsupported format for {source_id}")
+    config = sources[source_id]
+    if config["format"].lower() not in ("json", "tatoeba"):
+        raise SourceNotAvailable(f"Unsupported format for {source_id}")
+    body_path = await fetch_url(config["url"])
+    items = await asyncio.to_thread(_parse_items, source_id, config, body_path, limit)
+    return {"pack": _pack_for(source_id, config, len(items)), "items": items}
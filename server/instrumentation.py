@@ -0,0 +1,195 @@
+"""
+In-process metrics exposed in the Prometheus text format (``GET /metrics``).
+
+A small dependency-free registry: counters and histograms with labels, plus
+collector callbacks that turn existing stats (response cache, connection pool)
+into gauges at scrape time. Every uvicorn worker keeps its own registry, so with
+several workers each scrape reports the worker that served it.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Upper bounds (seconds) of the latency buckets; +Inf is implied
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in values:
+            lines.append(f"{self.name}{_labels(dict(zip(self.labelnames, key)))} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labelvalues -> [per-bucket counts (non-cumulative, last is +Inf), sum]
+        self._series: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, *labelvalues: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, list(counts), total) for key, (counts, total) in self._series.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, counts, total in series:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels({**labels, 'le': _number(bound)})} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(labels)} {cumulative}")
+        return lines
+
+
+_metrics: List = []
+# name -> (type, help, callback returning (labels, value) samples)
+_collectors: Dict[str, Tuple[str, str, Callable[[], Iterable[Tuple[Dict[str, str], float]]]]] = {}
+
+
+def counter(name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+    metric = Counter(name, help, labelnames)
+    _metrics.append(metric)
+    return metric
+
+
+def histogram(name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+    metric = Histogram(name, help, labelnames, buckets)
+    _metrics.append(metric)
+    return metric
+
+
+def register_collector(
+    name: str, kind: str, help: str, collect: Callable[[], Iterable[Tuple[Dict[str, str], float]]]
+) -> None:
+    """Report ``collect()``'s (labels, value) samples as metric ``name`` at every scrape."""
+    _collectors[name] = (kind, help, collect)
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for name, (kind, help, collect) in _collectors.items():
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in collect():
+            lines.append(f"{name}{_labels(labels)} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# ---------------------------------------------------------------------------
+# Metrics shared across modules
+
+REQUEST_LATENCY = histogram(
+    "typing_http_request_duration_seconds",
+    "HTTP request latency by route template, method and status code.",
+    ("method", "route", "status"),
+)
+ATTEMPT_STAGE_LATENCY = histogram(
+    "typing_attempt_stage_duration_seconds",
+    "Time spent in each stage of the attempt pipeline.",
+    ("stage",),
+)
+SQL_LATENCY = histogram(
+    "typing_sql_query_duration_seconds",
+    "SQLite statement execution time by statement kind (excludes fetching rows after the first).",
+    ("op",),
+)
+SOURCE_CACHE_REQUESTS = counter(
+    "typing_source_cache_requests_total",
+    "External source fetches by disk cache outcome (fresh, revalidated, downloaded, stale).",
+    ("result",),
+)
+
+
+_SQL_OPS = {"select", "insert", "update", "delete", "replace", "pragma", "with", "create", "begin", "commit"}
+
+
+def sql_op(sql: str) -> str:
+    """Coarse statement kind used as the SQL metric label."""
+    word = sql.lstrip().split(None, 1)[0].lower() if sql.strip() else ""
+    return word if word in _SQL_OPS else "other"
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request by its matched route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = ["500"]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            # Templates, not raw paths, keep label cardinality bounded
+            path = getattr(route, "path", None) or "unmatched"
+            REQUEST_LATENCY.observe(time.perf_counter() - start, scope["method"], path, status[0])
@@ -0,0 +1,152 @@
+"""
+Incremental JSON array reader for large upstream payloads.
+
+``iter_array`` walks a JSON document delivered as text chunks down a key path to
+an array and yields its elements one at a time. Values outside the path are
+skipped by scanning, never decoded, so memory stays bounded by the chunk size
+plus the largest single element regardless of document size.
+"""
+
+import json
+import re
+from typing import Any, Iterable, Iterator, Sequence, Union
+
+# Largest single element (in characters) that will be buffered for decoding
+MAX_ELEMENT_CHARS = 8 * 1024 * 1024
+
+_WHITESPACE = " \t\n\r"
+_NUMBER_TAIL = "0123456789.eE+-"
+_SPECIAL = re.compile(r'["\\\[\]{}]')
+_decoder = json.JSONDecoder()
+
+
+class _Scanner:
+    def __init__(self, chunks: Iterator[str]):
+        self._chunks = chunks
+        self._eof = False
+        self.buf = ""
+        self.pos = 0
+
+    def _fill(self) -> bool:
+        """Append the next chunk, dropping everything already consumed."""
+        if self._eof:
+            return False
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self._eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character ("" at end of input), without consuming it."""
+        while True:
+            buf = self.buf
+            while self.pos < len(buf) and buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(buf):
+                return buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        c = self.peek()
+        if not c or c not in chars:
+            raise ValueError(f"Expected one of {chars!r} at offset {self.pos}, got {c!r}")
+        self.pos += 1
+        return c
+
+    def read_value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                value, end = None, None
+            # A number cut at the chunk edge ("1" of "1.5e3") decodes fine but is
+            # followed by more number characters once the next chunk arrives
+            if end is not None and end < len(self.buf) and self.buf[end] in _NUMBER_TAIL:
+                end = None
+            if end is not None and (end < len(self.buf) or self._eof):
+                self.pos = end
+                return value
+            if len(self.buf) - self.pos > MAX_ELEMENT_CHARS:
+                raise ValueError(f"JSON value exceeds {MAX_ELEMENT_CHARS} characters")
+            if not self._fill():
+                if end is not None:
+                    self.pos = end
+                    return value
+                raise ValueError(f"Truncated or invalid JSON at offset {self.pos}")
+
+    def skip_value(self) -> None:
+        if self.peek() not in '"[{':
+            self.read_value()
+            return
+        depth = 0
+        in_string = False
+        while True:
+            m = _SPECIAL.search(self.buf, self.pos)
+            if m is None:
+                self.pos = len(self.buf)
+                if not self._fill():
+                    raise ValueError("Truncated JSON")
+                continue
+            c = m.group()
+            self.pos = m.end()
+            if in_string:
+                if c == "\\":
+                    if self.pos >= len(self.buf) and not self._fill():
+                        raise ValueError("Truncated JSON")
+                    self.pos += 1
+                elif c == '"':
+                    in_string = False
+                    if depth == 0:
+                        return
+            elif c == '"':
+                in_string = True
+            elif c in "[{":
+                depth += 1
+            elif c in "]}":
+                depth -= 1
+                if depth == 0:
+                    return
+
+
+def iter_array(chunks: Iterable[str], path: Sequence[Union[str, int]] = ()) -> Iterator[Any]:
+    """
+    Yield the elements of the array found at ``path`` (object keys / list indices)
+    in the JSON text made of ``chunks``. Raises KeyError if the path does not
+    exist and ValueError on malformed input.
+    """
+    s = _Scanner(iter(chunks))
+    for segment in path:
+        if isinstance(segment, int):
+            s.expect("[")
+            for _ in range(segment):
+                if s.peek() == "]":
+                    raise KeyError(segment)
+                s.skip_value()
+                s.expect(",")
+            if s.peek() == "]":
+                raise KeyError(segment)
+            continue
+        s.expect("{")
+        while True:
+            if s.peek() == "}":
+                raise KeyError(segment)
+            key = s.read_value()
+            s.expect(":")
+            if key == segment:
+                break
+            s.skip_value()
+            if s.expect(",}") == "}":
+                raise KeyError(segment)
+
+    s.expect("[")
+    if s.peek() == "]":
+        return
+    while True:
+        yield s.read_value()
+        if s.expect(",]") == "]":
+            return
@@ -0,0 +1,171 @@
+"""
+Resumable import of the legacy ``data/attempts.jsonl`` log into the attempts table.
+
+The file is streamed line by line and committed in large batches. Each batch
+advances a byte-offset checkpoint in the same transaction, so an interrupted
+import resumes after the last committed batch. Every imported line is also
+recorded under a content key, which makes re-running over already imported
+lines (after a checkpoint reset, or a rewritten file) a no-op. Lines without
+stored metrics are scored with the same code as live attempts.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from . import storage
+from .database import get_import_checkpoint, import_attempt_batch
+from .metrics import compute_metrics_batch
+
+# Lines committed per transaction
+IMPORT_BATCH_ROWS = 5000
+
+_REQUIRED = ("user_id", "item_id", "lang", "typed_text", "target_text", "duration_ms")
+_METRIC_FIELDS = ("wpm", "cpm", "cer", "error_count", "accuracy", "error_heatmap")
+
+
+def _timestamp(value: Any) -> Optional[str]:
+    """SQLite CURRENT_TIMESTAMP-style UTC text from an ISO string or epoch seconds/ms."""
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        if isinstance(value, (int, float)):
+            seconds = value / 1000 if value > 1e11 else value
+            dt = datetime.fromtimestamp(seconds, tz=timezone.utc)
+        else:
+            dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+            if dt.tzinfo is not None:
+                dt = dt.astimezone(timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        return None
+    return dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _normalize(obj: Any) -> Optional[Dict[str, Any]]:
+    """Attempt fields of a legacy record, or None if it cannot be imported."""
+    if not isinstance(obj, dict) or any(obj.get(k) in (None, "") for k in _REQUIRED):
+        return None
+    try:
+        duration_ms = int(obj["duration_ms"])
+    except (TypeError, ValueError):
+        return None
+    metrics = obj.get("metrics")
+    if not isinstance(metrics, dict):
+        metrics = {k: obj[k] for k in _METRIC_FIELDS if k in obj}
+    return {
+        "user_id": str(obj["user_id"]),
+        "item_id": str(obj["item_id"]),
+        "pack_id": obj.get("pack_id") or obj.get("pack"),
+        "lang": str(obj["lang"]),
+        "typed_text": str(obj["typed_text"]),
+        "target_text": str(obj["target_text"]),
+        "duration_ms": duration_ms,
+        "metrics": metrics if "wpm" in metrics and "accuracy" in metrics else None,
+        "created_at": _timestamp(obj.get("created_at", obj.get("timestamp"))),
+    }
+
+
+def _file_id(f) -> Optional[str]:
+    """
+    Identity of a segment: the hash of its first complete line. Unlike the inode it
+    survives the rename on rotation and gzipping, and the active file starts anew.
+    """
+    f.seek(0)
+    first = f.readline()
+    return hashlib.sha1(first).hexdigest() if first.endswith(b"\n") else None
+
+
+def _commit(
+    source: str, file_id: Optional[str], batch: List[Dict[str, Any]], offset: int, lines: int, skipped: int
+) -> Dict[str, int]:
+    missing = [a for a in batch if a["metrics"] is None]
+    for attempt, metrics in zip(missing, compute_metrics_batch(missing)):
+        attempt["metrics"] = metrics
+    return import_attempt_batch(source, batch, offset, lines, skipped, file_id)
+
+
+def import_legacy_attempts(
+    path: Optional[Path] = None,
+    batch_rows: int = IMPORT_BATCH_ROWS,
+    restart: bool = False,
+    on_progress: Optional[Callable[[Dict[str, int]], None]] = None,
+) -> Dict[str, int]:
+    """
+    Import every segment of the attempt log (just ``path`` if given), each from
+    its checkpoint (from the start if ``restart``) to its last complete line.
+    Returns counts for this run: lines read, imported, duplicates skipped,
+    unparseable or incomplete records skipped, and the end offset of the last
+    segment.
+    """
+    totals = {"lines": 0, "imported": 0, "duplicates": 0, "skipped": 0, "offset": 0}
+    storage.flush()
+    paths = [Path(path)] if path is not None else storage.segment_paths()
+    for segment in paths:
+        if segment.exists():
+            _import_segment(segment, batch_rows, restart, on_progress, totals)
+    return totals
+
+
+def _import_segment(
+    path: Path,
+    batch_rows: int,
+    restart: bool,
+    on_progress: Optional[Callable[[Dict[str, int]], None]],
+    totals: Dict[str, int],
+) -> None:
+    # Offsets refer to uncompressed content, so a segment keeps its checkpoint once gzipped
+    resolved = path.resolve()
+    source = str(resolved.with_suffix("") if resolved.suffix == ".gz" else resolved)
+    checkpoint = None if restart else get_import_checkpoint(source)
+    offset = checkpoint["byte_offset"] if checkpoint else 0
+    start_offset = offset
+    with storage.open_segment(path) as f:
+        file_id = _file_id(f)
+        if checkpoint and checkpoint["file_id"] not in (None, file_id):
+            # A different file now lives at this path (the active log rotated)
+            offset = start_offset = 0
+        elif path.suffix != ".gz" and offset > os.fstat(f.fileno()).st_size:
+            # The file was truncated; content keys still prevent duplicates
+            offset = start_offset = 0
+        f.seek(offset)
+
+        batch: List[Dict[str, Any]] = []
+        lines = skipped = 0
+        while True:
+            line = f.readline()
+            if not line.endswith(b"\n"):
+                # EOF, or a line still being written; resume from its start next time
+                break
+            offset += len(line)
+            body = line.strip()
+            if not body:
+                continue
+            lines += 1
+            try:
+                attempt = _normalize(json.loads(body))
+            except ValueError:
+                attempt = None
+            if attempt is None:
+                skipped += 1
+            else:
+                attempt["key"] = hashlib.sha1(body).hexdigest()
+                batch.append(attempt)
+
+            if lines >= batch_rows:
+                counts = _commit(source, file_id, batch, offset, lines, skipped)
+                for k, v in (("lines", lines), ("skipped", skipped), *counts.items()):
+                    totals[k] += v
+                totals["offset"] = offset
+                if on_progress:
+                    on_progress(dict(totals))
+                batch, lines, skipped = [], 0, 0
+                start_offset = offset
+
+        if lines or offset != start_offset:
+            counts = _commit(source, file_id, batch, offset, lines, skipped)
+            for k, v in (("lines", lines), ("skipped", skipped), *counts.items()):
+                totals[k] += v
+    totals["offset"] = offset
@@ -1,19 +1,58 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
 from typing import Optional, List, Dict, Any
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, Header, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
 
-from .packs import list_packs, get_pack_items, pack_exists
+from .packs import list_packs, get_pack_item_lines, pack_exists, catalog_signature, pack_signature
+from .serialization import FastJSONResponse, dumps
+from .response_cache import ResponseCache, make_etag, etag_matches
 from .database import (
-    record_attempt, get_user_attempts, get_user_stats,
-    update_streak, get_streak, create_user, get_user
+    submit_attempt, record_attempts, get_user_attempts, count_user_attempts, get_user_stats,
+    update_streak, get_streak, create_user, get_user,
+    start_checkpointer, stop_checkpointer, start_writer, stop_writer,
+    run_read, run_write, get_pool, close_pool, pool_metrics
 )
-from .metrics import compute_metrics
-from .external_sources import list_sources, fetch_source_items, SourceNotAvailable
+from .scoring import score_attempt, score_batch, start_scoring_pool, shutdown_scoring_pool
+from .external_sources import list_sources, fetch_source_items, close_http_client, SourceNotAvailable
+from .source_sync import start_source_sync, stop_source_sync
 from .achievements import check_achievements, get_user_achievements
+from . import instrumentation
+from .instrumentation import ATTEMPT_STAGE_LATENCY, MetricsMiddleware
 from datetime import date
 
 
-app = FastAPI(title="Typing+Language Backend", version="0.1.0")
+# Serialized /packs and /packs/{id}/items responses, bounded by total body size
+response_cache = ResponseCache(int(os.environ.get("TYPING_RESPONSE_CACHE_BYTES", str(32 * 1024 * 1024))))
+
+REQUIRED_ATTEMPT_FIELDS = ["user_id", "item_id", "lang", "typed_text", "target_text", "duration_ms"]
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_scoring_pool()
+    get_pool()
+    start_checkpointer()
+    start_writer()
+    start_source_sync()
+    try:
+        yield
+    finally:
+        await stop_source_sync()
+        await close_http_client()
+        stop_writer()
+        stop_checkpointer()
+        close_pool()
+        shutdown_scoring_pool()
+
+
+app = FastAPI(
+    title="Typing+Language Backend",
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,105 +61,275 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+
+
+def _response_cache_samples():
+    stats = response_cache.stats()
+    yield {"result": "hit"}, stats["hits"]
+    yield {"result": "miss"}, stats["misses"]
+
+
+def _pool_samples(key: str):
+    def collect():
+        for kind, stats in pool_metrics().items():
+            yield {"kind": kind}, stats[key]
+    return collect
+
+
+instrumentation.register_collector(
+    "typing_response_cache_lookups_total", "counter",
+    "Response cache lookups by outcome.", _response_cache_samples,
+)
+instrumentation.register_collector(
+    "typing_response_cache_hit_ratio", "gauge", "Share of response cache lookups that hit.",
+    lambda: [({}, response_cache.stats()["hit_ratio"])],
+)
+instrumentation.register_collector(
+    "typing_response_cache_evictions_total", "counter", "Entries evicted from the response cache.",
+    lambda: [({}, response_cache.stats()["evictions"])],
+)
+instrumentation.register_collector(
+    "typing_response_cache_bytes", "gauge", "Bytes held by the response cache.",
+    lambda: [({}, response_cache.stats()["bytes"])],
+)
+instrumentation.register_collector(
+    "typing_db_pool_in_use", "gauge", "Pooled SQLite connections checked out.", _pool_samples("in_use"),
+)
+instrumentation.register_collector(
+    "typing_db_pool_waiting", "gauge", "Callers waiting for a pooled SQLite connection.", _pool_samples("waiting"),
+)
+instrumentation.register_collector(
+    "typing_db_pool_wait_seconds_total", "counter", "Total time spent waiting for pooled connections.",
+    _pool_samples("wait_s_total"),
+)
+
+
+def _cached_json(key: tuple, etag: str, if_none_match: Optional[str], build, current_etag=None) -> Response:
+    """
+    Serve a cacheable JSON body: 304 if the client has it, else from the LRU or
+    freshly built. ``build`` returns the serialized body bytes. If the data can
+    change while it is built, ``current_etag`` recomputes the ETag afterwards;
+    a body that may come from newer data is then served but not cached.
+    """
+    headers = {"ETag": etag, "Cache-Control": "public, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    body = response_cache.get(key, etag)
+    if body is None:
+        body = build()
+        if current_etag is None or current_etag() == etag:
+            response_cache.put(key, etag, body)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 
 @app.get("/packs")
-def api_list_packs(lang: Optional[str] = Query(default=None), topic: Optional[str] = Query(default=None)):
-    return list_packs(lang=lang, topic=topic)
+def api_list_packs(
+    lang: Optional[str] = Query(default=None),
+    topic: Optional[str] = Query(default=None),
+    if_none_match: Optional[str] = Header(default=None),
+):
+    etag = make_etag("packs", catalog_signature(), lang, topic)
+    return _cached_json(
+        ("packs", lang, topic), etag, if_none_match,
+        lambda: dumps(list_packs(lang=lang, topic=topic)),
+    )
+
+
+def _pack_items_body(pack_id: str, offset: int, limit: int, tag: Optional[str]) -> bytes:
+    # Items are spliced in straight from items.jsonl without decoding them
+    head = dumps({"pack_id": pack_id, "offset": offset, "limit": limit})
+    lines = get_pack_item_lines(pack_id, offset=offset, limit=limit, tag=tag)
+    return head[:-1] + b',"items":[' + b",".join(lines) + b"]}"
 
 
 @app.get("/packs/{pack_id}/items")
-def api_get_pack_items(pack_id: str, offset: int = 0, limit: int = 50, tag: Optional[str] = Query(default=None)):
+def api_get_pack_items(
+    pack_id: str,
+    offset: int = 0,
+    limit: int = 50,
+    tag: Optional[str] = Query(default=None),
+    if_none_match: Optional[str] = Header(default=None),
+):
     if not pack_exists(pack_id):
         raise HTTPException(status_code=404, detail="Pack not found")
-    return {
-        "pack_id": pack_id,
-        "offset": offset,
-        "limit": limit,
-        "items": list(get_pack_items(pack_id, offset=offset, limit=limit, tag=tag)),
-    }
+    def items_etag() -> str:
+        return make_etag("items", pack_id, pack_signature(pack_id), offset, limit, tag)
+
+    return _cached_json(
+        ("items", pack_id, offset, limit, tag), items_etag(), if_none_match,
+        lambda: _pack_items_body(pack_id, offset, limit, tag), items_etag,
+    )
 
 
 @app.post("/attempts")
-def api_post_attempt(payload: Dict[str, Any]):
-    required = ["user_id", "item_id", "lang", "typed_text", "target_text", "duration_ms"]
-    for key in required:
+async def api_post_attempt(payload: Dict[str, Any]):
+    for key in REQUIRED_ATTEMPT_FIELDS:
         if key not in payload:
             raise HTTPException(status_code=400, detail=f"Missing field: {key}")
 
-    metrics = compute_metrics(
-        lang=payload.get("lang"),
-        typed_text=payload.get("typed_text", ""),
-        target_text=payload.get("target_text", ""),
-        duration_ms=int(payload.get("duration_ms", 0)),
-    )
-
-    attempt_id = record_attempt(
-        user_id=payload["user_id"],
-        item_id=payload["item_id"],
-        lang=payload["lang"],
-        typed_text=payload["typed_text"],
-        target_text=payload["target_text"],
-        duration_ms=payload["duration_ms"],
-        pack_id=payload.get("pack_id"),
-        metrics=metrics
-    )
-
-    # Update streak
-    today = date.today().isoformat()
-    streak_data = update_streak(payload["user_id"], today)
+    with ATTEMPT_STAGE_LATENCY.time("compute_metrics"):
+        metrics = await score_attempt(
+            lang=payload.get("lang"),
+            typed_text=payload.get("typed_text", ""),
+            target_text=payload.get("target_text", ""),
+            duration_ms=int(payload.get("duration_ms", 0)),
+        )
+
+    # Group-committed with other pending attempts; resolves once the write is durable.
+    # The writer itself times record_attempt / update_streak / commit per group.
+    with ATTEMPT_STAGE_LATENCY.time("write_queued"):
+        written = await asyncio.wrap_future(submit_attempt(
+            user_id=payload["user_id"],
+            item_id=payload["item_id"],
+            lang=payload["lang"],
+            typed_text=payload["typed_text"],
+            target_text=payload["target_text"],
+            duration_ms=payload["duration_ms"],
+            pack_id=payload.get("pack_id"),
+            metrics=metrics,
+            practice_date=date.today().isoformat(),
+        ))
 
     # Check for new achievements
-    new_achievements = check_achievements(payload["user_id"])
+    with ATTEMPT_STAGE_LATENCY.time("check_achievements"):
+        new_achievements = await run_write(
+            check_achievements, payload["user_id"], [{**payload, "metrics": metrics}]
+        )
 
     return {
         "ok": True,
-        "attempt_id": attempt_id,
+        "attempt_id": written["attempt_id"],
         "metrics": metrics,
-        "streak": streak_data,
+        "streak": written["streak"],
         "new_achievements": new_achievements
     }
 
 
-@app.get("/users/{user_id}/progress")
-def api_user_progress(user_id: str):
-    stats = get_user_stats(user_id)
-    streak = get_streak(user_id)
+def _store_attempts(attempts: List[Dict[str, Any]], all_metrics: List[Dict[str, Any]]) -> Dict[str, Any]:
+    attempt_ids = record_attempts([
+        {
+            "user_id": a["user_id"],
+            "item_id": a["item_id"],
+            "lang": a["lang"],
+            "typed_text": a["typed_text"],
+            "target_text": a["target_text"],
+            "duration_ms": a["duration_ms"],
+            "pack_id": a.get("pack_id"),
+            "metrics": m,
+        }
+        for a, m in zip(attempts, all_metrics)
+    ])
+
+    # Streaks and achievements only need evaluating once per user
+    today = date.today().isoformat()
+    streaks: Dict[str, Any] = {}
+    new_achievements: Dict[str, List[Dict[str, Any]]] = {}
+    by_user: Dict[str, List[Dict[str, Any]]] = {}
+    for a, m in zip(attempts, all_metrics):
+        by_user.setdefault(a["user_id"], []).append({**a, "metrics": m})
+    for user_id, user_attempts in by_user.items():
+        streaks[user_id] = update_streak(user_id, today)
+        new_achievements[user_id] = check_achievements(user_id, user_attempts)
+
     return {
+        "ok": True,
+        "results": [
+            {"attempt_id": attempt_id, "metrics": m}
+            for attempt_id, m in zip(attempt_ids, all_metrics)
+        ],
+        "streaks": streaks,
+        "new_achievements": new_achievements,
+    }
+
+
+@app.post("/attempts/batch")
+async def api_post_attempts_batch(payload: Dict[str, Any]):
+    attempts = payload.get("attempts")
+    if not isinstance(attempts, list):
+        raise HTTPException(status_code=400, detail="Missing field: attempts")
+    for i, attempt in enumerate(attempts):
+        if not isinstance(attempt, dict):
+            raise HTTPException(status_code=400, detail=f"attempts[{i}] must be an object")
+        for key in REQUIRED_ATTEMPT_FIELDS:
+            if key not in attempt:
+                raise HTTPException(status_code=400, detail=f"Missing field: attempts[{i}].{key}")
+
+    with ATTEMPT_STAGE_LATENCY.time("compute_metrics_batch"):
+        all_metrics = await score_batch(attempts)
+    with ATTEMPT_STAGE_LATENCY.time("store_batch"):
+        return await run_write(_store_attempts, attempts, all_metrics)
+
+
+@app.get("/users/{user_id}/progress")
+async def api_user_progress(user_id: str):
+    stats, streak = await asyncio.gather(
+        run_read(get_user_stats, user_id),
+        run_read(get_streak, user_id),
+    )
+    # Rows are already JSON-native, so skip jsonable_encoder
+    return FastJSONResponse({
         **stats,
         "streak": streak
-    }
+    })
 
 
 @app.get("/users/{user_id}/attempts")
-def api_user_attempts(
+async def api_user_attempts(
     user_id: str,
     pack_id: Optional[str] = None,
     limit: int = 100,
-    offset: int = 0
+    offset: int = 0,
+    before_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    include_text: bool = False
 ):
-    attempts = get_user_attempts(user_id, pack_id=pack_id, limit=limit, offset=offset)
-    return {
+    if before_id is not None and after_id is not None:
+        raise HTTPException(status_code=400, detail="Use either before_id or after_id, not both")
+    if offset and (before_id is not None or after_id is not None):
+        raise HTTPException(status_code=400, detail="offset cannot be combined with before_id or after_id")
+    attempts, total = await asyncio.gather(
+        run_read(
+            get_user_attempts, user_id, pack_id=pack_id, limit=limit, offset=offset,
+            before_id=before_id, after_id=after_id, include_text=include_text
+        ),
+        run_read(count_user_attempts, user_id, pack_id=pack_id),
+    )
+    # A newer page exists only if a row sorts after the first one shown
+    if not attempts:
+        has_newer = False
+    elif before_id is None and after_id is None:
+        has_newer = offset > 0
+    else:
+        has_newer = bool(await run_read(
+            get_user_attempts, user_id, pack_id=pack_id, limit=1, after_id=attempts[0]["id"]
+        ))
+    # Rows are already JSON-native, so skip jsonable_encoder
+    return FastJSONResponse({
         "user_id": user_id,
         "pack_id": pack_id,
-        "total": len(attempts),
-        "attempts": attempts
-    }
+        "total": total,
+        "attempts": attempts,
+        # Cursors for the neighbouring pages: pass as before_id / after_id
+        "next_before_id": attempts[-1]["id"] if len(attempts) == limit else None,
+        "prev_after_id": attempts[0]["id"] if has_newer else None,
+    })
 
 
 @app.get("/users/{user_id}/streak")
-def api_user_streak(user_id: str):
-    return get_streak(user_id)
+async def api_user_streak(user_id: str):
+    return await run_read(get_streak, user_id)
 
 
 @app.post("/users")
-def api_create_user(payload: Dict[str, Any]):
+async def api_create_user(payload: Dict[str, Any]):
     required = ["user_id", "username"]
     for key in required:
         if key not in payload:
             raise HTTPException(status_code=400, detail=f"Missing field: {key}")
 
-    success = create_user(
+    success = await run_write(
+        create_user,
         user_id=payload["user_id"],
         username=payload["username"],
         email=payload.get("email")
@@ -133,16 +342,31 @@ def api_create_user(payload: Dict[str, Any]):
 
 
 @app.get("/users/{user_id}")
-def api_get_user(user_id: str):
-    user = get_user(user_id)
+async def api_get_user(user_id: str):
+    user = await run_read(get_user, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 
 @app.get("/users/{user_id}/achievements")
-def api_user_achievements(user_id: str):
-    return get_user_achievements(user_id)
+async def api_user_achievements(user_id: str):
+    return await run_read(get_user_achievements, user_id)
+
+
+@app.get("/internal/db-pool")
+def api_db_pool():
+    return pool_metrics()
+
+
+@app.get("/internal/response-cache")
+def api_response_cache():
+    return response_cache.stats()
+
+
+@app.get("/metrics")
+def api_metrics():
+    return Response(content=instrumentation.render(), media_type=instrumentation.CONTENT_TYPE)
 
 
 @app.get("/external/sources")
@@ -166,12 +390,16 @@ def root():
             "/packs",
             "/packs/{id}/items",
             "/attempts",
+            "/attempts/batch",
             "/users",
             "/users/{id}",
             "/users/{id}/progress",
             "/users/{id}/attempts",
             "/users/{id}/streak",
             "/users/{id}/achievements",
+            "/internal/db-pool",
+            "/internal/response-cache",
+            "/metrics",
             "/external/sources",
             "/external/sources/{id}",
         ],
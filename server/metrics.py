@@ -1,4 +1,10 @@
-from typing import Dict, Any, List
+import os
+from typing import Dict, Any, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None  # type: ignore
 
 
 def _levenshtein(a: str, b: str) -> int:
@@ -27,27 +33,228 @@ def _levenshtein(a: str, b: str) -> int:
     return prev[lb]
 
 
-def _error_heatmap(typed: str, target: str) -> Dict[str, int]:
-    # Simple character mismatch counts
+def _levenshtein_bitparallel(a: str, b: str) -> int:
+    """
+    Bit-parallel Levenshtein distance (Myers 1999, Hyyrö 2001) over Python big ints.
+
+    The longer string is encoded as the bitvector so the Python-level loop only runs
+    once per character of the shorter one.
+    """
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    m, n = len(a), len(b)
+    if n == 0:
+        return m
+
+    peq: Dict[str, int] = {}
+    for i, ch in enumerate(a):
+        peq[ch] = peq.get(ch, 0) | (1 << i)
+
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv = mask
+    mv = 0
+    score = m
+    for ch in b:
+        eq = peq.get(ch, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+    return score
+
+
+DISTANCE_ENGINES = {
+    "dp": _levenshtein,
+    "bitparallel": _levenshtein_bitparallel,
+}
+DISTANCE_ENGINE = os.environ.get("TYPING_DISTANCE_ENGINE", "bitparallel")
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance using the engine selected by TYPING_DISTANCE_ENGINE."""
+    return DISTANCE_ENGINES.get(DISTANCE_ENGINE, _levenshtein_bitparallel)(a, b)
+
+
+# Above this many target x typed cells the alignment is split Hirschberg-style
+# instead of keeping every column's delta vectors for the traceback.
+ALIGN_CELL_LIMIT = int(os.environ.get("TYPING_ALIGN_CELL_LIMIT", str(1 << 22)))
+
+_MATCH, _SUB, _DEL, _INS = 0, 1, 2, 3
+
+
+def _bit(x: int, k: int) -> int:
+    return (x >> k) & 1
+
+
+def _delta_columns(target: str, typed: str, keep: bool) -> Tuple[int, int, List[Tuple[int, int, int, int]]]:
+    """
+    Run the bit-parallel recurrence with target as rows and typed as columns.
+    Returns the final vertical delta vectors (pv, mv) of the last column and, if
+    ``keep`` is set, (pv, mv, ph, mh) for every column: bit i-1 of pv/mv marks a
+    +1/-1 step from row i-1 to row i, bit i-1 of ph/mh a +1/-1 step from the
+    previous column in row i.
+    """
+    m = len(target)
+    peq: Dict[str, int] = {}
+    for i, ch in enumerate(target):
+        peq[ch] = peq.get(ch, 0) | (1 << i)
+
+    mask = (1 << m) - 1
+    pv = mask
+    mv = 0
+    cols: List[Tuple[int, int, int, int]] = [(pv, mv, 0, 0)] if keep else []
+    for ch in typed:
+        eq = peq.get(ch, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        phs = ((ph << 1) | 1) & mask
+        mhs = (mh << 1) & mask
+        pv = mhs | (~(xv | phs) & mask)
+        mv = phs & xv
+        if keep:
+            cols.append((pv, mv, ph, mh))
+    return pv, mv, cols
+
+
+def _last_column(target: str, typed: str) -> List[int]:
+    """Distances from every prefix of target to the whole of typed."""
+    pv, mv, _ = _delta_columns(target, typed, keep=False)
+    out = [len(typed)]
+    d = len(typed)
+    for i in range(len(target)):
+        d += _bit(pv, i) - _bit(mv, i)
+        out.append(d)
+    return out
+
+
+def _traceback(target: str, typed: str, ops: List[Tuple[int, str, str]]) -> None:
+    _, _, cols = _delta_columns(target, typed, keep=True)
+    i, j = len(target), len(typed)
+    pv, mv, _, _ = cols[j]
+    d = j + bin(pv).count("1") - bin(mv).count("1")
+    rev: List[Tuple[int, str, str]] = []
+    while i > 0 or j > 0:
+        if i > 0 and j > 0:
+            _, _, ph, mh = cols[j]
+            ppv, pmv, _, _ = cols[j - 1]
+            left = d - _bit(ph, i - 1) + _bit(mh, i - 1)
+            diag = left - _bit(ppv, i - 1) + _bit(pmv, i - 1)
+            tc, yc = target[i - 1], typed[j - 1]
+            if diag + (tc != yc) == d:
+                rev.append((_MATCH if tc == yc else _SUB, tc, yc))
+                i, j, d = i - 1, j - 1, diag
+                continue
+            if _bit(cols[j][0], i - 1):
+                rev.append((_DEL, tc, ""))
+                i, d = i - 1, d - 1
+                continue
+            rev.append((_INS, "", yc))
+            j, d = j - 1, left
+        elif i > 0:
+            rev.append((_DEL, target[i - 1], ""))
+            i, d = i - 1, d - 1
+        else:
+            rev.append((_INS, "", typed[j - 1]))
+            j, d = j - 1, d - 1
+    rev.reverse()
+    ops.extend(rev)
+
+
+def _align_into(target: str, typed: str, ops: List[Tuple[int, str, str]]) -> None:
+    m, n = len(target), len(typed)
+    if m == 0:
+        ops.extend((_INS, "", ch) for ch in typed)
+        return
+    if n == 0:
+        ops.extend((_DEL, ch, "") for ch in target)
+        return
+    if m * n <= ALIGN_CELL_LIMIT or n == 1:
+        _traceback(target, typed, ops)
+        return
+
+    # Hirschberg: split typed in half and find where the optimal path crosses it
+    mid = n // 2
+    fwd = _last_column(target, typed[:mid])
+    bwd = _last_column(target[::-1], typed[mid:][::-1])
+    split = min(range(m + 1), key=lambda i: fwd[i] + bwd[m - i])
+    _align_into(target[:split], typed[:mid], ops)
+    _align_into(target[split:], typed[mid:], ops)
+
+
+def align(typed: str, target: str) -> List[Tuple[int, str, str]]:
+    """
+    Optimal edit alignment of typed against target as (op, target_char, typed_char)
+    tuples, derived from the same bit-parallel pass that yields the distance.
+    Memory stays bounded on long texts by splitting the problem Hirschberg-style.
+    """
+    ops: List[Tuple[int, str, str]] = []
+    if typed == target:
+        ops.extend((_MATCH, ch, ch) for ch in target)
+    else:
+        _align_into(target, typed, ops)
+    return ops
+
+
+def _alignment_stats(typed: str, target: str) -> Dict[str, Any]:
+    substitutions: Dict[str, int] = {}
+    insertions: Dict[str, int] = {}
+    deletions: Dict[str, int] = {}
     heat: Dict[str, int] = {}
-    m = min(len(typed), len(target))
-    for i in range(m):
-        if typed[i] != target[i]:
-            ch = target[i]
-            heat[ch] = heat.get(ch, 0) + 1
-    # Count extra characters as errors under a special key
-    if len(typed) > len(target):
-        heat["<extra>"] = heat.get("<extra>", 0) + (len(typed) - len(target))
-    if len(target) > len(typed):
-        heat["<missing>"] = heat.get("<missing>", 0) + (len(target) - len(typed))
-    return heat
+    matches = 0
+    for op, tc, yc in align(typed, target):
+        if op == _MATCH:
+            matches += 1
+        elif op == _SUB:
+            substitutions[tc] = substitutions.get(tc, 0) + 1
+            heat[tc] = heat.get(tc, 0) + 1
+        elif op == _DEL:
+            deletions[tc] = deletions.get(tc, 0) + 1
+            heat[tc] = heat.get(tc, 0) + 1
+        else:
+            insertions[yc] = insertions.get(yc, 0) + 1
+            heat["<extra>"] = heat.get("<extra>", 0) + 1
+
+    errors = sum(substitutions.values()) + sum(insertions.values()) + sum(deletions.values())
+    total = matches + errors
+    return {
+        "distance": errors,
+        "error_count": errors,
+        "accuracy": 100.0 * matches / total if total else 100.0,
+        "error_heatmap": heat,
+        "error_breakdown": {
+            "substitutions": substitutions,
+            "insertions": insertions,
+            "deletions": deletions,
+        },
+    }
+
+
+def _distance(typed: str, target: str, alignment: Dict[str, Any]) -> int:
+    """Distance from the selected engine; the alignment already carries the bit-parallel one."""
+    if DISTANCE_ENGINES.get(DISTANCE_ENGINE, _levenshtein_bitparallel) is _levenshtein_bitparallel:
+        return alignment["distance"]
+    return edit_distance(typed, target)
 
 
 def compute_metrics(lang: str, typed_text: str, target_text: str, duration_ms: int) -> Dict[str, Any]:
     duration_ms = max(1, int(duration_ms))
 
-    # Levenshtein-based CER
-    distance = _levenshtein(typed_text, target_text)
+    # The alignment gives accuracy and the error heatmap; CER uses the configured engine
+    alignment = _alignment_stats(typed_text, target_text)
+    distance = _distance(typed_text, target_text, alignment)
     denom = max(1, len(target_text))
     cer = distance / denom
 
@@ -64,11 +271,63 @@ def compute_metrics(lang: str, typed_text: str, target_text: str, duration_ms: i
         "cer": cer,
         "distance": distance,
         "duration_ms": duration_ms,
-        "error_heatmap": _error_heatmap(typed_text, target_text),
+        "error_count": alignment["error_count"],
+        "accuracy": alignment["accuracy"],
+        "error_heatmap": alignment["error_heatmap"],
+        "error_breakdown": alignment["error_breakdown"],
     }
     return metrics
 
 
+def compute_metrics_batch(attempts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Score many attempts in one pass. Each attempt needs typed_text, target_text and
+    duration_ms; results match compute_metrics element for element. Identical
+    (typed, target) pairs share one alignment, and rate calculations are
+    vectorized with NumPy when it is installed.
+    """
+    typed = [a.get("typed_text", "") for a in attempts]
+    target = [a.get("target_text", "") for a in attempts]
+    durations = [max(1, int(a.get("duration_ms", 0))) for a in attempts]
+
+    cache: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    alignments = []
+    for pair in zip(typed, target):
+        if pair not in cache:
+            cache[pair] = _alignment_stats(*pair)
+        alignments.append(cache[pair])
+    distances = [_distance(ty, ta, al) for ty, ta, al in zip(typed, target, alignments)]
+
+    if np is not None and attempts:
+        minutes = np.asarray(durations, dtype=np.float64) / 60000.0
+        chars = np.asarray([len(t) for t in typed], dtype=np.float64)
+        denoms = np.maximum(1, np.asarray([len(t) for t in target], dtype=np.float64))
+        wpm = ((chars / 5.0) / minutes).tolist()
+        cpm = (chars / minutes).tolist()
+        cer = (np.asarray(distances, dtype=np.float64) / denoms).tolist()
+    else:
+        minutes = [d / 60000.0 for d in durations]
+        wpm = [(len(t) / 5.0) / m for t, m in zip(typed, minutes)]
+        cpm = [len(t) / m for t, m in zip(typed, minutes)]
+        cer = [d / max(1, len(t)) for d, t in zip(distances, target)]
+
+    return [
+        {
+            "wpm": wpm[i],
+            "cpm": cpm[i],
+            "cer": cer[i],
+            "distance": distances[i],
+            "duration_ms": durations[i],
+            "error_count": alignments[i]["error_count"],
+            "accuracy": alignments[i]["accuracy"],
+            # Copies so duplicate pairs in a batch don't share mutable dicts
+            "error_heatmap": dict(alignments[i]["error_heatmap"]),
+            "error_breakdown": {k: dict(v) for k, v in alignments[i]["error_breakdown"].items()},
+        }
+        for i in range(len(attempts))
+    ]
+
+
 def _mean(values: List[float]) -> float:
     return sum(values) / len(values) if values else 0.0
 
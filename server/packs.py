@@ -1,17 +1,43 @@
+import hashlib
 import json
+import os
+import tempfile
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Iterable
+from threading import Lock
+from typing import IO, Dict, Any, List, Optional, Iterable, Iterator
 
+from .binpack import BinaryPack, finite_json
 
 PACKS_DIR = Path(__file__).resolve().parent.parent / "packs"
+INDEX_NAME = "items.idx.json"
+INDEX_VERSION = 3
+# Optional compiled form of items.jsonl written by etl/build_pack.py --binary
+BINARY_NAME = "items.bin"
 
+# pack_id -> loaded sidecar index (see _load_index)
+_index_cache: Dict[str, Dict[str, Any]] = {}
+# pack_id -> lock serializing index builds and binary opens of that pack only;
+# _index_lock just guards this mapping
+_pack_locks: Dict[str, Lock] = {}
+_index_lock = Lock()
 
-def _iter_pack_dirs() -> Iterable[Path]:
-    if not PACKS_DIR.exists():
-        return []
-    for child in PACKS_DIR.iterdir():
-        if child.is_dir() and (child / "metadata.json").exists() and (child / "items.jsonl").exists():
-            yield child
+# pack_id -> (items.bin signature, opened pack) (see _load_binary)
+_binary_cache: Dict[str, tuple] = {}
+
+# Process-wide pack catalog maintained by _refresh_catalog
+_catalog: Dict[str, Any] = {
+    "dir_sig": None,
+    "dirs": [],
+    "packs": {},
+    "sigs": {},
+    "by_lang": {},
+    "by_topic": {},
+    "any_lang": set(),
+    "order": [],
+    "signature": "",
+}
+_catalog_lock = Lock()
 
 
 def _read_json(path: Path) -> Any:
@@ -24,62 +50,355 @@ def pack_exists(pack_id: str) -> bool:
     return p.is_dir() and (p / "metadata.json").exists()
 
 
-def list_packs(lang: Optional[str] = None, topic: Optional[str] = None) -> List[Dict[str, Any]]:
-    packs: List[Dict[str, Any]] = []
-    for pd in _iter_pack_dirs():
-        meta = _read_json(pd / "metadata.json")
-        pack_id = pd.name
+def _file_sig(path: Path) -> Optional[tuple]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
 
-        # Count items lazily
-        count = 0
-        try:
-            with (pd / "items.jsonl").open("r", encoding="utf-8") as f:
-                for _ in f:
-                    count += 1
-        except FileNotFoundError:
-            count = 0
 
-        if lang and meta.get("languages") and lang not in meta.get("languages", []):
-            continue
+def _pack_sig(pd: Path) -> Optional[tuple]:
+    meta_sig = _file_sig(pd / "metadata.json")
+    items_sig = _file_sig(pd / "items.jsonl")
+    if meta_sig is None or items_sig is None:
+        return None
+    return (meta_sig, items_sig)
 
-        if topic and topic not in meta.get("topics", []):
-            continue
 
-        packs.append({
-            "id": pack_id,
-            "name": meta.get("name", pack_id),
-            "languages": meta.get("languages", []),
-            "license": meta.get("license"),
-            "source": meta.get("source"),
-            "topics": meta.get("topics", []),
-            "count": count,
-        })
-    return sorted(packs, key=lambda x: x["id"])  # deterministic order
+def _catalog_entry(pd: Path) -> Dict[str, Any]:
+    meta = _read_json(pd / "metadata.json")
+    pack_id = pd.name
+    with _binary_pack(pack_id) as binary:
+        count = binary.count if binary is not None else None
+    if count is None:
+        index = _load_index(pack_id)
+        count = len(index["offsets"]) if index else 0
+    return {
+        "id": pack_id,
+        "name": meta.get("name", pack_id),
+        "languages": meta.get("languages", []),
+        "license": meta.get("license"),
+        "source": meta.get("source"),
+        "topics": meta.get("topics", []),
+        "count": count,
+    }
 
 
-def get_pack_items(pack_id: str, offset: int = 0, limit: int = 50, tag: Optional[str] = None) -> Iterable[Dict[str, Any]]:
-    p = PACKS_DIR / pack_id / "items.jsonl"
-    if not p.exists():
-        return []
+def _refresh_catalog() -> Dict[str, Any]:
+    """
+    Bring the process-wide pack catalog up to date.
+    Only packs whose metadata.json or items.jsonl changed are re-read; the
+    pack directory listing is re-scanned only when PACKS_DIR itself changes.
+    """
+    with _catalog_lock:
+        dir_sig = _file_sig(PACKS_DIR)
+        if dir_sig != _catalog["dir_sig"]:
+            names = [c.name for c in PACKS_DIR.iterdir() if c.is_dir()] if dir_sig else []
+            _catalog["dir_sig"] = dir_sig
+            _catalog["dirs"] = sorted(names)
 
-    emitted = 0
-    skipped = 0
-    with p.open("r", encoding="utf-8") as f:
-        for line in f:
+        packs: Dict[str, Dict[str, Any]] = _catalog["packs"]
+        sigs: Dict[str, tuple] = _catalog["sigs"]
+        changed = False
+        seen = set()
+        for name in _catalog["dirs"]:
+            pd = PACKS_DIR / name
+            sig = _pack_sig(pd)
+            if sig is None:
+                continue
+            seen.add(name)
+            if sigs.get(name) == sig and name in packs:
+                continue
+            try:
+                packs[name] = _catalog_entry(pd)
+            except (OSError, ValueError):
+                packs.pop(name, None)
+                sigs.pop(name, None)
+                changed = True
+                continue
+            sigs[name] = sig
+            changed = True
+
+        for name in list(packs):
+            if name not in seen:
+                del packs[name]
+                sigs.pop(name, None)
+                changed = True
+
+        if changed:
+            by_lang: Dict[str, set] = {}
+            by_topic: Dict[str, set] = {}
+            any_lang = set()
+            for pack_id, entry in packs.items():
+                if entry["languages"]:
+                    for lang in entry["languages"]:
+                        by_lang.setdefault(lang, set()).add(pack_id)
+                else:
+                    # Packs without declared languages match every lang filter
+                    any_lang.add(pack_id)
+                for topic in entry["topics"]:
+                    by_topic.setdefault(topic, set()).add(pack_id)
+            _catalog["by_lang"] = by_lang
+            _catalog["by_topic"] = by_topic
+            _catalog["any_lang"] = any_lang
+            _catalog["order"] = sorted(packs)  # deterministic order
+            _catalog["signature"] = hashlib.sha1(repr(sorted(sigs.items())).encode()).hexdigest()
+
+        return _catalog
+
+
+def catalog_signature() -> str:
+    """Digest of every pack's file mtimes/sizes; changes whenever list_packs output can."""
+    return _refresh_catalog()["signature"]
+
+
+def pack_signature(pack_id: str) -> Optional[tuple]:
+    """
+    (mtime_ns, size) of a pack's items.jsonl plus that of its items.bin (which
+    serializes items with a different key order), or None if the pack has no items file.
+    """
+    pd = PACKS_DIR / pack_id
+    items_sig = _file_sig(pd / "items.jsonl")
+    if items_sig is None:
+        return None
+    return (items_sig, _file_sig(pd / BINARY_NAME))
+
+
+def list_packs(lang: Optional[str] = None, topic: Optional[str] = None) -> List[Dict[str, Any]]:
+    catalog = _refresh_catalog()
+    ids = catalog["order"]
+    if lang:
+        wanted = catalog["by_lang"].get(lang, set()) | catalog["any_lang"]
+        ids = [i for i in ids if i in wanted]
+    if topic:
+        wanted = catalog["by_topic"].get(topic, set())
+        ids = [i for i in ids if i in wanted]
+    return [dict(catalog["packs"][i]) for i in ids]
+
+
+def _reject_constant(name: str) -> Any:
+    raise ValueError(f"non-finite number {name} is not valid JSON")
+
+
+def _build_index(f: IO[bytes], stat: os.stat_result) -> Dict[str, Any]:
+    """
+    Scan the open items.jsonl ``f`` once, recording the byte offset of every valid line and tag
+    postings. Lines with NaN/Infinity are kept, re-encoded with nulls in their place.
+    """
+    offsets: List[int] = []
+    tags: Dict[str, List[int]] = {}
+    # item number (as a string, like after a JSON round trip) -> strict JSON line
+    reencoded: Dict[str, str] = {}
+    f.seek(0)
+    pos = 0
+    for line in f:
+        start = pos
+        pos += len(line)
+        strict = True
+        try:
+            # Indexed lines are served verbatim, so they must be strict JSON
+            obj = json.loads(line, parse_constant=_reject_constant)
+        except ValueError:
+            strict = False
             try:
                 obj = json.loads(line)
             except Exception:
                 continue
+        except Exception:
+            continue
+        if not isinstance(obj, dict):
+            continue
+        n = len(offsets)
+        offsets.append(start)
+        if not strict:
+            reencoded[str(n)] = json.dumps(finite_json(obj), ensure_ascii=False, separators=(",", ":"))
+        for t in obj.get("tags", []) or []:
+            postings = tags.setdefault(str(t), [])
+            # Items repeating a tag must only be listed once
+            if not postings or postings[-1] != n:
+                postings.append(n)
+    return {
+        "version": INDEX_VERSION,
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "offsets": offsets,
+        "tags": tags,
+        "reencoded": reencoded,
+    }
 
-            if tag and tag not in obj.get("tags", []):
-                continue
 
-            if skipped < offset:
-                skipped += 1
-                continue
+def _is_fresh(index: Dict[str, Any], stat: os.stat_result) -> bool:
+    return (
+        index.get("version") == INDEX_VERSION
+        and index.get("mtime_ns") == stat.st_mtime_ns
+        and index.get("size") == stat.st_size
+    )
+
+
+def _write_index(index_path: Path, index: Dict[str, Any]) -> None:
+    tmp = None
+    try:
+        # A unique name, so workers building the same index never write into each other's file
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=index_path.parent, prefix=index_path.name + ".", suffix=".tmp", delete=False
+        ) as f:
+            tmp = f.name
+            json.dump(index, f, separators=(",", ":"))
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, index_path)
+    except OSError:
+        # Read-only pack directories still work; the index just lives in memory
+        if tmp is not None:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+
+def _pack_lock(pack_id: str) -> Lock:
+    with _index_lock:
+        lock = _pack_locks.get(pack_id)
+        if lock is None:
+            lock = _pack_locks[pack_id] = Lock()
+        return lock
+
+
+def _load_index(pack_id: str, f: Optional[IO[bytes]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Return the line/tag index for a pack, building the sidecar file on first use.
+    The index is rebuilt whenever items.jsonl changes size or mtime. Given ``f``,
+    an open items.jsonl, the index is checked against (or built from) exactly
+    that file, even if the path has since been replaced.
+    """
+    pd = PACKS_DIR / pack_id
+    if f is None:
+        try:
+            with (pd / "items.jsonl").open("rb") as f:
+                return _load_index(pack_id, f)
+        except FileNotFoundError:
+            return None
+    stat = os.fstat(f.fileno())
+
+    # Building one pack's index must not stall requests for the others
+    with _pack_lock(pack_id):
+        index = _index_cache.get(pack_id)
+        if index is not None and _is_fresh(index, stat):
+            return index
+
+        index_path = pd / INDEX_NAME
+        index = None
+        try:
+            index = _read_json(index_path)
+        except (OSError, ValueError):
+            pass
+        if index is None or not _is_fresh(index, stat):
+            index = _build_index(f, stat)
+            _write_index(index_path, index)
+
+        _index_cache[pack_id] = index
+        return index
 
-            yield obj
-            emitted += 1
-            if emitted >= limit:
-                break
 
+def _load_binary(pack_id: str) -> Optional[BinaryPack]:
+    """
+    The compiled items.bin of a pack, if there is one and it was built from the
+    current items.jsonl; otherwise None and callers fall back to the JSONL index.
+    A returned pack is acquired and must be released (see _binary_pack).
+    """
+    pd = PACKS_DIR / pack_id
+    bin_sig = _file_sig(pd / BINARY_NAME)
+    if bin_sig is None:
+        return None
+    items_sig = _file_sig(pd / "items.jsonl")
+    if items_sig is None:
+        return None
+
+    with _pack_lock(pack_id):
+        cached = _binary_cache.get(pack_id)
+        if cached is not None and cached[0] == bin_sig:
+            pack = cached[1]
+        else:
+            if cached is not None and cached[1] is not None:
+                # Unmapped now, or once the readers still holding it are done
+                cached[1].close()
+            try:
+                pack = BinaryPack(pd / BINARY_NAME)
+            except (OSError, ValueError):
+                pack = None
+            _binary_cache[pack_id] = (bin_sig, pack)
+        if pack is None or pack.source_sig != (items_sig[1], items_sig[0]):
+            return None
+        pack.acquire()
+    return pack
+
+
+@contextmanager
+def _binary_pack(pack_id: str) -> Iterator[Optional[BinaryPack]]:
+    pack = _load_binary(pack_id)
+    try:
+        yield pack
+    finally:
+        if pack is not None:
+            pack.release()
+
+
+def _binary_window(pack: BinaryPack, offset: int, limit: int, tag: Optional[str]) -> Iterable[int]:
+    offset = max(0, offset)
+    limit = max(0, limit)
+    if tag:
+        return pack.tag_indices(tag, offset, limit)
+    return range(min(offset, pack.count), min(offset + limit, pack.count))
+
+
+def get_pack_item_lines(pack_id: str, offset: int = 0, limit: int = 50, tag: Optional[str] = None) -> List[bytes]:
+    """
+    Raw JSON bytes of a page of items, exactly as stored in items.jsonl, so pages
+    can be spliced into a response without a decode/encode round trip. The few
+    lines with NaN/Infinity come re-encoded from the index instead. Packs with a
+    current items.bin are served from it (same items, keys in a different order).
+    """
+    with _binary_pack(pack_id) as binary:
+        if binary is not None:
+            return [binary.line(i) for i in _binary_window(binary, offset, limit, tag)]
+
+    try:
+        f = (PACKS_DIR / pack_id / "items.jsonl").open("rb")
+    except FileNotFoundError:
+        return []
+    with f:
+        # The offsets are read from the very file the index was validated against,
+        # even if ETL or source sync replaces items.jsonl in the meantime
+        index = _load_index(pack_id, f)
+        return _index_window(f, index, offset, limit, tag)
+
+
+def _index_window(f: IO[bytes], index: Dict[str, Any], offset: int, limit: int, tag: Optional[str]) -> List[bytes]:
+    offset = max(0, offset)
+    limit = max(0, limit)
+    offsets = index["offsets"]
+    if tag:
+        window = index["tags"].get(tag, [])[offset:offset + limit]
+    else:
+        window = range(min(offset, len(offsets)), min(offset + limit, len(offsets)))
+
+    reencoded = index["reencoded"]
+    lines = []
+    for n in window:
+        fixed = reencoded.get(str(n)) if reencoded else None
+        if fixed is not None:
+            lines.append(fixed.encode("utf-8"))
+            continue
+        f.seek(offsets[n])
+        lines.append(f.readline().rstrip(b"\r\n"))
+    return lines
+
+
+def get_pack_items(pack_id: str, offset: int = 0, limit: int = 50, tag: Optional[str] = None) -> Iterable[Dict[str, Any]]:
+    with _binary_pack(pack_id) as binary:
+        if binary is not None:
+            for i in _binary_window(binary, offset, limit, tag):
+                yield binary.item(i)
+            return
+    for line in get_pack_item_lines(pack_id, offset=offset, limit=limit, tag=tag):
+        yield json.loads(line)
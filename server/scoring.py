@@ -0,0 +1,84 @@
+"""
+Attempt scoring service.
+
+compute_metrics is CPU-bound pure Python, so running long attempts in FastAPI's
+threadpool serializes them on the GIL. Attempts above a size threshold are
+scored in a process pool instead; short ones run in a worker thread, where the
+IPC round trip would cost more than the scoring itself. Neither runs on the
+event loop.
+"""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from .metrics import compute_metrics, compute_metrics_batch
+
+# Number of scoring processes; 0 disables the pool and scores everything in threads
+SCORING_WORKERS = int(os.environ.get("TYPING_SCORING_WORKERS", str(os.cpu_count() or 1)))
+# Attempts with fewer typed + target characters than this are scored in a thread
+SCORING_INLINE_CHARS = int(os.environ.get("TYPING_SCORING_INLINE_CHARS", "2000"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _mp_context():
+    # Workers start lazily, by which time writer/checkpointer/flusher threads hold
+    # locks and SQLite connections are open; forking then could deadlock a child
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def start_scoring_pool() -> None:
+    """Start the process pool (called from the app lifespan)."""
+    global _pool
+    if _pool is None and SCORING_WORKERS > 0:
+        _pool = ProcessPoolExecutor(max_workers=SCORING_WORKERS, mp_context=_mp_context())
+
+
+def shutdown_scoring_pool() -> None:
+    """Stop the process pool, waiting for in-flight scoring to finish."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+        _pool = None
+
+
+def _size(attempt: Dict[str, Any]) -> int:
+    return len(attempt.get("typed_text", "")) + len(attempt.get("target_text", ""))
+
+
+async def score_attempt(lang: str, typed_text: str, target_text: str, duration_ms: int) -> Dict[str, Any]:
+    """Async wrapper around compute_metrics that offloads large attempts to the pool."""
+    if _pool is None or len(typed_text) + len(target_text) < SCORING_INLINE_CHARS:
+        return await asyncio.to_thread(compute_metrics, lang, typed_text, target_text, duration_ms)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_pool, compute_metrics, lang, typed_text, target_text, duration_ms)
+
+
+async def score_batch(attempts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Async wrapper around compute_metrics_batch. Large batches are cut into
+    chunks of roughly SCORING_INLINE_CHARS characters and spread across the pool.
+    """
+    if _pool is None or sum(_size(a) for a in attempts) < SCORING_INLINE_CHARS:
+        return await asyncio.to_thread(compute_metrics_batch, attempts)
+
+    fields = ("typed_text", "target_text", "duration_ms")
+    chunks: List[List[Dict[str, Any]]] = [[]]
+    chunk_size = 0
+    for a in attempts:
+        if chunks[-1] and chunk_size >= SCORING_INLINE_CHARS:
+            chunks.append([])
+            chunk_size = 0
+        # Only ship the fields scoring needs across the process boundary
+        chunks[-1].append({k: a[k] for k in fields if k in a})
+        chunk_size += _size(a)
+
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(*(
+        loop.run_in_executor(_pool, compute_metrics_batch, chunk) for chunk in chunks
+    ))
+    return [m for chunk_metrics in results for m in chunk_metrics]
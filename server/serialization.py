@@ -0,0 +1,35 @@
+"""
+JSON serialization for API responses.
+
+Uses orjson when it is installed (pip install orjson) and falls back to the
+standard library otherwise; both produce compact UTF-8 JSON.
+"""
+
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None  # type: ignore
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize JSON-native content (dicts, lists, str, int, float, bool, None) to bytes."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    # Same encoding as FastAPI's default JSONResponse
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with dumps(). Used as the app's default response class;
+    handlers that already hold JSON-native data can return it directly to also
+    skip FastAPI's jsonable_encoder pass.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
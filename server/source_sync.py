@@ -0,0 +1,262 @@
+"""
+Materialize external sources into regular packs under ``packs/remote-<id>/``.
+
+Each sync fetches the source, normalizes it with the same code as
+``/external/sources/{id}`` and diffs the result against the previous snapshot
+(``sync_state.json`` next to ``items.jsonl``), keyed by item text. New items are
+appended to ``items.jsonl``; only when an existing item's content changed is
+the file rewritten (atomically, via a temp file). Items keep their ids across
+syncs, and items that disappear upstream stay in the pack.
+
+The state records the size of ``items.jsonl`` it describes; if the two disagree
+(a crash between writing the items and the state, or a hand edit) the state is
+rebuilt from ``items.jsonl``, so items are never appended twice. Writes to a
+pack hold an exclusive ``flock`` on its ``.sync.lock``, and of several server
+processes only the one holding ``data/source_sync.lock`` runs the periodic job.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None  # type: ignore
+
+from . import packs
+from .external_sources import DATA_DIR, fetch_source_items, list_sources, SourceNotAvailable
+
+# Seconds between background syncs (0 disables the job)
+SOURCE_SYNC_INTERVAL_S = float(os.environ.get("TYPING_SOURCE_SYNC_INTERVAL_S", "0"))
+# Comma-separated source ids synced by the background job, or "*" for all of them
+SOURCE_SYNC_IDS = os.environ.get("TYPING_SOURCE_SYNC_IDS", "*")
+
+STATE_FILE = "sync_state.json"
+LOCK_FILE = ".sync.lock"
+# Held by the one process running the periodic job
+JOB_LOCK_PATH = DATA_DIR / "source_sync.lock"
+
+logger = logging.getLogger(__name__)
+
+
+def remote_pack_dir(source_id: str) -> Path:
+    return packs.PACKS_DIR / f"remote-{source_id}"
+
+
+def _content_hash(item: Dict[str, Any]) -> str:
+    body = {k: v for k, v in item.items() if k != "id"}
+    return hashlib.sha1(json.dumps(body, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _item_line(item: Dict[str, Any]) -> str:
+    return json.dumps(item, ensure_ascii=False) + "\n"
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    tmp = None
+    try:
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=path.parent, prefix=path.name + ".", suffix=".tmp", delete=False
+        ) as f:
+            tmp = f.name
+            f.write(text)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if tmp is not None:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+        raise
+
+
+@contextmanager
+def _flock(path: Path, blocking: bool = True) -> Iterator[bool]:
+    """Exclusive ``flock`` on ``path``; yields False if ``blocking`` is off and another process holds it."""
+    if fcntl is None:
+        yield True
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("ab") as f:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _rebuild_state(source_id: str, items_path: Path) -> Dict[str, Any]:
+    """
+    The snapshot state described by the items.jsonl on disk. A torn last line (a
+    crash mid-append) is cut off, since its item was never recorded.
+    """
+    known: Dict[str, Dict[str, str]] = {}
+    next_seq = 1
+    id_re = re.compile(re.escape(source_id) + r"-(\d+)$")
+    with items_path.open("r+b") as f:
+        pos = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                f.truncate(pos)
+                break
+            pos += len(line)
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            known[item["text"]] = {"id": item["id"], "hash": _content_hash(item)}
+            m = id_re.match(str(item["id"]))
+            next_seq = max(next_seq, int(m.group(1)) + 1 if m else len(known) + 1)
+    return {"next_seq": next_seq, "items": known}
+
+
+def _load_state(source_id: str, pd: Path) -> Dict[str, Any]:
+    items_path = pd / "items.jsonl"
+    try:
+        size = items_path.stat().st_size
+    except FileNotFoundError:
+        return {"next_seq": 1, "items": {}}
+    try:
+        state = json.loads((pd / STATE_FILE).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        state = None
+    if state is None or state.get("size") != size:
+        # items.jsonl and the state were not written together; items.jsonl wins
+        state = _rebuild_state(source_id, items_path)
+    return state
+
+
+def apply_snapshot(source_id: str, pack: Dict[str, Any], items: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Merge normalized ``items`` into the remote pack on disk; returns diff counts."""
+    pd = remote_pack_dir(source_id)
+    pd.mkdir(parents=True, exist_ok=True)
+    with _flock(pd / LOCK_FILE):
+        return _apply_snapshot(source_id, pd, pack, items)
+
+
+def _apply_snapshot(source_id: str, pd: Path, pack: Dict[str, Any], items: List[Dict[str, Any]]) -> Dict[str, int]:
+    state = _load_state(source_id, pd)
+    known: Dict[str, Dict[str, str]] = state["items"]
+
+    appended: List[Dict[str, Any]] = []
+    changed: Dict[str, Dict[str, Any]] = {}
+    seen = set()
+    for item in items:
+        key = item["text"]
+        if key in seen:
+            continue
+        seen.add(key)
+        digest = _content_hash(item)
+        prev = known.get(key)
+        if prev is None:
+            item = {**item, "id": f"{source_id}-{state['next_seq']:04d}"}
+            state["next_seq"] += 1
+            known[key] = {"id": item["id"], "hash": digest}
+            appended.append(item)
+        elif prev["hash"] != digest:
+            item = {**item, "id": prev["id"]}
+            prev["hash"] = digest
+            changed[item["id"]] = item
+
+    items_path = pd / "items.jsonl"
+    if changed:
+        lines = []
+        with items_path.open("r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                current = changed.get(json.loads(line).get("id"))
+                lines.append(_item_line(current) if current is not None else line)
+        lines.extend(_item_line(item) for item in appended)
+        _write_atomic(items_path, "".join(lines))
+    elif appended:
+        with items_path.open("a", encoding="utf-8") as f:
+            f.write("".join(_item_line(item) for item in appended))
+    elif not items_path.exists():
+        items_path.touch()
+
+    metadata = {k: v for k, v in pack.items() if k != "count"}
+    metadata_path = pd / "metadata.json"
+    metadata_text = json.dumps(metadata, ensure_ascii=False, indent=2) + "\n"
+    # Rewriting unchanged metadata would needlessly bump the catalog signature
+    if not metadata_path.exists() or metadata_path.read_text(encoding="utf-8") != metadata_text:
+        _write_atomic(metadata_path, metadata_text)
+    state["size"] = items_path.stat().st_size
+    _write_atomic(pd / STATE_FILE, json.dumps(state, ensure_ascii=False))
+
+    return {"added": len(appended), "changed": len(changed), "total": len(known)}
+
+
+async def sync_source(source_id: str, limit: Optional[int] = None) -> Dict[str, Any]:
+    """Fetch ``source_id`` (all items unless ``limit``) and merge it into its remote pack."""
+    result = await fetch_source_items(source_id, limit=limit)
+    counts = await asyncio.to_thread(apply_snapshot, source_id, result["pack"], result["items"])
+    return {"source_id": source_id, "pack_id": result["pack"]["id"], **counts}
+
+
+def configured_source_ids() -> List[str]:
+    ids = [s.strip() for s in SOURCE_SYNC_IDS.split(",") if s.strip()]
+    if "*" in ids:
+        return [s["id"] for s in list_sources()]
+    return ids
+
+
+_sync_task: Optional["asyncio.Task[None]"] = None
+
+
+async def _sync_loop(interval: float) -> None:
+    while True:
+        await _sync_round()
+        await asyncio.sleep(interval)
+
+
+async def _sync_round() -> None:
+    with _flock(JOB_LOCK_PATH, blocking=False) as leader:
+        if not leader:
+            # Another worker process is running this round
+            return
+        for source_id in configured_source_ids():
+            try:
+                await sync_source(source_id)
+            except SourceNotAvailable as exc:
+                # Upstream down or misconfigured; retry on the next round
+                logger.warning("source sync of %s skipped: %s", source_id, exc)
+            except Exception:
+                # Anything else (disk, parse errors) must not end the job for every source
+                logger.exception("source sync of %s failed", source_id)
+
+
+def start_source_sync(interval: Optional[float] = None) -> None:
+    """Start the background task that periodically syncs configured sources."""
+    global _sync_task
+    interval = SOURCE_SYNC_INTERVAL_S if interval is None else interval
+    if _sync_task is not None or interval <= 0:
+        return
+    _sync_task = asyncio.get_running_loop().create_task(_sync_loop(interval))
+
+
+async def stop_source_sync() -> None:
+    global _sync_task
+    task, _sync_task = _sync_task, None
+    if task is None:
+        return
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    except Exception:
+        # Never let a failed job abort the rest of the app's shutdown
+        logger.exception("source sync task failed")
@@ -1,35 +1,413 @@
+"""
+Legacy JSONL attempt log (``data/attempts.jsonl``).
+
+Attempts now live in SQLite; scripts/import_attempts.py moves this log into the
+database. Until that has happened, per-user lookups go through a byte-offset
+index (``data/attempts.idx.json``) that is extended as the log grows, so a
+lookup seeks straight to the user's lines instead of parsing the whole log.
+
+The log is safe to share between processes (e.g. several uvicorn workers):
+appends are buffered in memory and written in one go, under an exclusive
+``fcntl`` lock on ``attempts.lock``, once ``ATTEMPTS_FLUSH_BYTES`` are pending
+or the oldest pending record is ``ATTEMPTS_FLUSH_MS`` old. When the active file
+passes ``ATTEMPTS_SEGMENT_BYTES`` it is sealed as ``attempts.<n>.jsonl`` and,
+with ``ATTEMPTS_GZIP``, compressed to ``attempts.<n>.jsonl.gz`` in the
+background. Byte offsets always refer to uncompressed content.
+"""
+
+import atexit
+import gzip
 import json
+import multiprocessing.util
+import os
+import re
+import tempfile
+import threading
+import time
 from pathlib import Path
 from threading import Lock
-from typing import Dict, Any, List
+from typing import Dict, Any, IO, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None  # type: ignore
 
 
 DATA_DIR = Path(__file__).resolve().parent.parent / "data"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 ATTEMPTS_PATH = DATA_DIR / "attempts.jsonl"
+LOCK_PATH = DATA_DIR / "attempts.lock"
+INDEX_PATH = DATA_DIR / "attempts.idx.json"
+# Newly indexed bytes after which the offset index is written back to disk
+INDEX_PERSIST_BYTES = 1024 * 1024
+
+# Pending bytes / age (ms) that trigger a flush; 0 ms writes every record through
+ATTEMPTS_FLUSH_BYTES = int(os.environ.get("TYPING_ATTEMPTS_FLUSH_BYTES", str(64 * 1024)))
+ATTEMPTS_FLUSH_MS = float(os.environ.get("TYPING_ATTEMPTS_FLUSH_MS", "200"))
+# Size at which the active file is sealed into a numbered segment
+ATTEMPTS_SEGMENT_BYTES = int(os.environ.get("TYPING_ATTEMPTS_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+ATTEMPTS_GZIP = os.environ.get("TYPING_ATTEMPTS_GZIP", "0").lower() in ("1", "true", "yes")
+
+_SEGMENT_RE = re.compile(r"^attempts\.(\d+)\.jsonl(\.gz)?$")
+
 _lock = Lock()
+_pending: List[bytes] = []
+_pending_bytes = 0
+_pending_since = 0.0
+_flush_wakeup = threading.Event()
+_flusher_thread: Optional[threading.Thread] = None
+_gzip_threads: List[threading.Thread] = []
+
+# {"active": {"ino", "size", "users"}, "sealed": {seq: {"size", "users"}}}; users maps
+# user_id -> line offsets within that segment
+_index: Dict[str, Any] = {}
+_persisted_size = 0
+
+
+# ---------------------------------------------------------------------------
+# Segments and cross-process locking
+
+class _FileLock:
+    """``flock`` on LOCK_PATH; shared for readers, exclusive for writers and rotation."""
+
+    def __init__(self, exclusive: bool):
+        self._exclusive = exclusive
+        self._f: Optional[IO[bytes]] = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._f = LOCK_PATH.open("ab")
+            fcntl.flock(self._f.fileno(), fcntl.LOCK_EX if self._exclusive else fcntl.LOCK_SH)
+        return self
+
+    def __exit__(self, *exc):
+        if self._f is not None:
+            fcntl.flock(self._f.fileno(), fcntl.LOCK_UN)
+            self._f.close()
+            self._f = None
+
+
+def _sealed_paths() -> Dict[int, Path]:
+    """Sealed segments by sequence number; a plain copy wins over one still being compressed."""
+    found: Dict[int, Path] = {}
+    for p in ATTEMPTS_PATH.parent.glob(ATTEMPTS_PATH.stem + ".*.jsonl*"):
+        m = _SEGMENT_RE.match(p.name)
+        if m and (int(m.group(1)) not in found or not m.group(2)):
+            found[int(m.group(1))] = p
+    return found
+
+
+def segment_paths() -> List[Path]:
+    """Sealed segments in order, followed by the active file if it exists."""
+    sealed = _sealed_paths()
+    paths = [sealed[n] for n in sorted(sealed)]
+    if ATTEMPTS_PATH.exists():
+        paths.append(ATTEMPTS_PATH)
+    return paths
+
+
+def open_segment(path: Path) -> IO[bytes]:
+    """Binary reader over a segment's uncompressed lines (falls back to the .gz copy)."""
+    if path.suffix == ".gz":
+        return gzip.open(path, "rb")
+    try:
+        return path.open("rb")
+    except FileNotFoundError:
+        # Compressed and removed since it was listed
+        if path == ATTEMPTS_PATH:
+            raise
+        return gzip.open(path.with_name(path.name + ".gz"), "rb")
+
+
+def _compress_segment(path: Path) -> None:
+    gz = path.with_name(path.name + ".gz")
+    tmp = gz.with_name(gz.name + ".tmp")
+    with path.open("rb") as src, gzip.open(tmp, "wb") as out:
+        while True:
+            chunk = src.read(1024 * 1024)
+            if not chunk:
+                break
+            out.write(chunk)
+    os.replace(tmp, gz)
+    path.unlink()
+
+
+def _rotate() -> Path:
+    """Seal the active file as the next numbered segment. Caller holds the exclusive file lock."""
+    sealed = _sealed_paths()
+    seq = max(sealed, default=0) + 1
+    target = ATTEMPTS_PATH.with_name(f"{ATTEMPTS_PATH.stem}.{seq:06d}.jsonl")
+    os.rename(ATTEMPTS_PATH, target)
+    return target
+
+
+# ---------------------------------------------------------------------------
+# Buffered appends
+
+def _write_pending() -> None:
+    """Write out buffered records. Must be called with ``_lock`` held."""
+    global _pending, _pending_bytes
+    if not _pending:
+        return
+    data = b"".join(_pending)
+    sealed = None
+    with _FileLock(exclusive=True):
+        # O_APPEND so concurrent writers (should locking be unavailable) never interleave mid-record
+        fd = os.open(ATTEMPTS_PATH, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            size = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+        if size >= ATTEMPTS_SEGMENT_BYTES:
+            sealed = _rotate()
+    _pending, _pending_bytes = [], 0
+    if sealed is not None and ATTEMPTS_GZIP:
+        thread = threading.Thread(target=_compress_segment, args=(sealed,), name="attempts-gzip", daemon=True)
+        _gzip_threads[:] = [t for t in _gzip_threads if t.is_alive()] + [thread]
+        thread.start()
+
+
+def flush() -> None:
+    """Write any buffered attempts to disk now."""
+    with _lock:
+        _write_pending()
+
+
+def _shutdown() -> None:
+    """Flush buffered records and let running compressions finish before the process exits."""
+    flush()
+    for thread in list(_gzip_threads):
+        thread.join()
+
+
+def _reset_after_fork() -> None:
+    global _lock, _flusher_thread, _pending, _pending_bytes
+    # Each worker process buffers and flushes its own records
+    _lock = Lock()
+    _flusher_thread = None
+    _pending, _pending_bytes = [], 0
+    _gzip_threads.clear()
+    _flush_wakeup.clear()
+
+
+atexit.register(_shutdown)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _flusher_loop() -> None:
+    while True:
+        _flush_wakeup.wait()
+        _flush_wakeup.clear()
+        with _lock:
+            wait = _pending_since + ATTEMPTS_FLUSH_MS / 1000 - time.monotonic() if _pending else None
+        if wait is None:
+            continue
+        if wait > 0:
+            time.sleep(wait)
+        flush()
+
+
+def _start_flusher() -> None:
+    """Start the background flusher. Must be called with ``_lock`` held."""
+    global _flusher_thread
+    if _flusher_thread is None:
+        _flusher_thread = threading.Thread(target=_flusher_loop, name="attempts-flusher", daemon=True)
+        _flusher_thread.start()
+        # multiprocessing children (e.g. uvicorn --workers) leave via os._exit, skipping atexit
+        multiprocessing.util.Finalize(None, _shutdown, exitpriority=10)
 
 
 def append_attempt(record: Dict[str, Any]) -> None:
+    global _pending_bytes, _pending_since
     # Optional: Normalize known fields
     record.setdefault("pack_id", record.get("pack"))
+    line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
     with _lock:
-        with ATTEMPTS_PATH.open("a", encoding="utf-8") as f:
-            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        if not _pending:
+            _pending_since = time.monotonic()
+        _pending.append(line)
+        _pending_bytes += len(line)
+        if _pending_bytes >= ATTEMPTS_FLUSH_BYTES or ATTEMPTS_FLUSH_MS <= 0:
+            _write_pending()
+            return
+        _start_flusher()
+    _flush_wakeup.set()
+
+
+# ---------------------------------------------------------------------------
+# Reading
+
+def iter_attempts() -> Iterator[Dict[str, Any]]:
+    """
+    Every logged attempt, oldest first, read lazily segment by segment. The active
+    file is pinned when iteration starts, so a rotation meanwhile neither skips
+    nor repeats records.
+    """
+    flush()
+    with _FileLock(exclusive=False):
+        sealed = [p for _, p in sorted(_sealed_paths().items())]
+        try:
+            active: Optional[IO[bytes]] = ATTEMPTS_PATH.open("rb")
+            active_size = os.fstat(active.fileno()).st_size
+        except FileNotFoundError:
+            active, active_size = None, 0
+
+    def records(f: IO[bytes], limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        read = 0
+        for line in f:
+            read += len(line)
+            if limit is not None and read > limit:
+                return
+            try:
+                obj = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(obj, dict):
+                yield obj
+
+    try:
+        for path in sealed:
+            with open_segment(path) as f:
+                yield from records(f)
+        if active is not None:
+            yield from records(active, active_size)
+    finally:
+        if active is not None:
+            active.close()
+
+
+def _load_index() -> Dict[str, Any]:
+    global _persisted_size
+    try:
+        index = json.loads(INDEX_PATH.read_text(encoding="utf-8"))
+        index["active"]["size"], index["sealed"]
+    except (OSError, ValueError, KeyError, TypeError):
+        index = {"active": {"ino": None, "size": 0, "users": {}}, "sealed": {}}
+    _persisted_size = _index_bytes(index)
+    return index
+
+
+def _index_bytes(index: Dict[str, Any]) -> int:
+    return index["active"]["size"] + sum(s["size"] for s in index["sealed"].values())
+
+
+def _save_index(index: Dict[str, Any]) -> None:
+    global _persisted_size
+    # Readers of several processes may save at once (all under the shared lock),
+    # so each writes its own temp file; the last rename wins with a complete index
+    tmp = None
+    try:
+        with tempfile.NamedTemporaryFile(
+            "w", encoding="utf-8", dir=INDEX_PATH.parent, prefix=INDEX_PATH.name + ".", suffix=".tmp", delete=False
+        ) as f:
+            tmp = f.name
+            json.dump(index, f, separators=(",", ":"))
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, INDEX_PATH)
+    except BaseException:
+        if tmp is not None:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+        raise
+    _persisted_size = _index_bytes(index)
+
+
+def _scan(f: IO[bytes], offset: int, users: Dict[str, List[int]], limit: Optional[int] = None) -> int:
+    """Add the user offsets of complete lines from ``offset`` on; returns the end offset."""
+    for line in f:
+        if not line.endswith(b"\n") or (limit is not None and offset + len(line) > limit):
+            break
+        try:
+            user_id = json.loads(line).get("user_id")
+        except (ValueError, AttributeError):
+            user_id = None
+        if isinstance(user_id, str):
+            users.setdefault(user_id, []).append(offset)
+        offset += len(line)
+    return offset
+
+
+def _refresh_index() -> Dict[str, Any]:
+    """
+    Bring the offset index up to date. Sealed segments are immutable and indexed
+    once; the active file is append-only, so only bytes past its indexed size are
+    scanned, and it is reindexed after a rotation. Must be called with ``_lock``
+    and the shared file lock held.
+    """
+    global _index
+    if not _index:
+        _index = _load_index()
+
+    sealed = _sealed_paths()
+    entries = _index["sealed"]
+    for seq in [s for s in entries if int(s) not in sealed]:
+        del entries[seq]
+    for seq, path in sealed.items():
+        if str(seq) not in entries:
+            users: Dict[str, List[int]] = {}
+            with open_segment(path) as f:
+                size = _scan(f, 0, users)
+            entries[str(seq)] = {"size": size, "users": users}
+
+    active = _index["active"]
+    try:
+        st = ATTEMPTS_PATH.stat()
+    except FileNotFoundError:
+        st = None
+    if st is None or st.st_ino != active["ino"] or st.st_size < active["size"]:
+        active = _index["active"] = {"ino": st.st_ino if st else None, "size": 0, "users": {}}
+    if st is not None and st.st_size > active["size"]:
+        with ATTEMPTS_PATH.open("rb") as f:
+            f.seek(active["size"])
+            active["size"] = _scan(f, active["size"], active["users"], st.st_size)
+
+    if abs(_index_bytes(_index) - _persisted_size) >= INDEX_PERSIST_BYTES:
+        _save_index(_index)
+    return _index
 
 
 def get_attempts_by_user(user_id: str) -> List[Dict[str, Any]]:
     out: List[Dict[str, Any]] = []
-    if not ATTEMPTS_PATH.exists():
-        return out
+    # Lock order is always _lock, then the file lock. The shared file lock is kept
+    # through the reads so no rotation moves the lines the offsets point at, while
+    # _lock is released so other threads are not serialized behind the reads.
+    file_lock = _FileLock(exclusive=False)
     with _lock:
-        with ATTEMPTS_PATH.open("r", encoding="utf-8") as f:
-            for line in f:
-                try:
-                    obj = json.loads(line)
-                except Exception:
-                    continue
-                if obj.get("user_id") == user_id:
-                    out.append(obj)
+        _write_pending()
+        file_lock.__enter__()
+        try:
+            index = _refresh_index()
+            sealed = _sealed_paths()
+            targets: List[Tuple[Path, List[int]]] = []
+            for seq in sorted(index["sealed"], key=int):
+                offsets = index["sealed"][seq]["users"].get(user_id)
+                if offsets:
+                    targets.append((sealed[int(seq)], list(offsets)))
+            offsets = index["active"]["users"].get(user_id)
+            if offsets:
+                targets.append((ATTEMPTS_PATH, list(offsets)))
+        except BaseException:
+            file_lock.__exit__()
+            raise
+    try:
+        for path, offsets in targets:
+            with open_segment(path) as f:
+                # Ascending offsets, so seeks in a gzip stream only ever move forward
+                for offset in offsets:
+                    f.seek(offset)
+                    try:
+                        obj = json.loads(f.readline())
+                    except ValueError:
+                        continue
+                    if obj.get("user_id") == user_id:
+                        out.append(obj)
+    finally:
+        file_lock.__exit__()
     return out
-
@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Keep server.database (which opens its database at import) away from data/typing.db
+os.environ.setdefault("TYPING_DB_PATH", str(Path(tempfile.mkdtemp(prefix="typing-tests-")) / "typing.db"))
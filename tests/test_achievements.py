@@ -0,0 +1,15 @@
+from server.achievements import compile_criteria
+
+
+def test_equality_criteria_means_threshold_reached():
+    name, predicate = compile_criteria("accuracy == 100")
+    assert name == "accuracy"
+    assert predicate(100)
+    assert predicate(100.00000000001)
+    assert not predicate(99.9)
+    assert not predicate(None)
+
+
+def test_unsupported_criteria_is_skipped():
+    assert compile_criteria("typos == 0") is None
+    assert compile_criteria("wpm ~ 50") is None
@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+from server import binpack
+from server.binpack import BinaryPack, write_binary_pack
+
+
+def _jsonl(path, count):
+    path.write_text(
+        "".join(json.dumps({"id": f"item-{n}", "text": str(n), "tags": ["a1"]}) + "\n" for n in range(count)),
+        encoding="utf-8",
+    )
+    return path
+
+
+def test_compile_leaves_only_the_pack(tmp_path):
+    src = _jsonl(tmp_path / "items.jsonl", 3)
+    assert write_binary_pack(src, tmp_path / "items.bin") == 3
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["items.bin", "items.jsonl"]
+    pack = BinaryPack(tmp_path / "items.bin")
+    assert json.loads(pack.line(2))["id"] == "item-2"
+    pack.close()
+
+
+def test_close_waits_for_readers(tmp_path):
+    src = _jsonl(tmp_path / "items.jsonl", 3)
+    write_binary_pack(src, tmp_path / "items.bin")
+    pack = BinaryPack(tmp_path / "items.bin")
+    pack.acquire()
+    pack.close()
+    assert list(pack.tag_indices("a1", 0, 10)) == [0, 1, 2]
+    pack.release()
+    assert pack._mm.closed
+    with pytest.raises(ValueError):
+        pack.acquire()
+
+
+def test_failed_compile_removes_its_temp_file(tmp_path, monkeypatch):
+    src = _jsonl(tmp_path / "items.jsonl", 3)
+
+    def broken(values):
+        raise RuntimeError("interrupted")
+
+    monkeypatch.setattr(binpack, "_u32_bytes", broken)
+    with pytest.raises(RuntimeError):
+        write_binary_pack(src, tmp_path / "items.bin")
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["items.jsonl"]
@@ -0,0 +1,40 @@
+import uuid
+
+from server.database import create_user, get_user_attempts, record_attempt
+from server.metrics import compute_metrics
+
+
+def _user():
+    user_id = f"db-{uuid.uuid4().hex}"
+    create_user(user_id, user_id)
+    return user_id
+
+
+def _attempt(user_id, n):
+    metrics = compute_metrics("en", "helo", "hello", 1000)
+    return record_attempt(user_id, f"item-{n}", "en", "helo", "hello", 1000, "pack", metrics)
+
+
+def test_keyset_pages():
+    user_id = _user()
+    ids = [_attempt(user_id, n) for n in range(5)]
+    newest = [a["id"] for a in get_user_attempts(user_id, limit=2)]
+    assert newest == ids[:-3:-1]
+    older = [a["id"] for a in get_user_attempts(user_id, limit=2, before_id=newest[-1])]
+    assert older == ids[-3:-5:-1]
+    assert [a["id"] for a in get_user_attempts(user_id, limit=2, after_id=older[0])] == newest
+
+
+def test_keyset_cursor_of_another_user_is_ignored():
+    owner, other = _user(), _user()
+    foreign = _attempt(owner, 0)
+    _attempt(other, 0)
+    assert get_user_attempts(other, before_id=foreign) == []
+    assert get_user_attempts(other, after_id=foreign) == []
+
+
+def test_offset_is_ignored_with_a_cursor():
+    user_id = _user()
+    ids = [_attempt(user_id, n) for n in range(5)]
+    assert [a["id"] for a in get_user_attempts(user_id, limit=2, offset=1, before_id=ids[3])] == ids[2:0:-1]
+    assert [a["id"] for a in get_user_attempts(user_id, limit=2, offset=1, after_id=ids[1])] == ids[3:1:-1]
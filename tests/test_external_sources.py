@@ -0,0 +1,106 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from server import external_sources
+from server.external_sources import SOURCE_CACHE_REQUESTS, SourceNotAvailable, close_http_client, fetch_url
+
+BODY = json.dumps([{"hanzi": "你好", "translations": ["hello"]}]).encode("utf-8")
+ETAG = '"v1"'
+
+
+class _Upstream(BaseHTTPRequestHandler):
+    requests = 0
+    failing = False
+
+    def do_GET(self):
+        type(self).requests += 1
+        if self.failing:
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.send_header("ETag", ETAG)
+            self.end_headers()
+        else:
+            self.send_response(200)
+            self.send_header("ETag", ETAG)
+            self.send_header("Content-Length", str(len(BODY)))
+            self.end_headers()
+            self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def upstream(tmp_path, monkeypatch):
+    monkeypatch.setattr(external_sources, "SOURCE_CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(_Upstream, "requests", 0)
+    monkeypatch.setattr(_Upstream, "failing", False)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Upstream)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/hsk.json"
+    server.shutdown()
+    server.server_close()
+
+
+def _fetch(url):
+    async def run():
+        try:
+            return await fetch_url(url)
+        finally:
+            await close_http_client()
+    return asyncio.run(run())
+
+
+def _outcomes():
+    return dict(SOURCE_CACHE_REQUESTS._values)
+
+
+def _delta(before, result):
+    return _outcomes().get((result,), 0) - before.get((result,), 0)
+
+
+def test_fresh_copy_is_served_from_disk(upstream, tmp_path):
+    before = _outcomes()
+    path = _fetch(upstream)
+    assert path.read_bytes() == BODY
+    assert _delta(before, "downloaded") == 1
+
+    assert _fetch(upstream) == path
+    assert _delta(before, "fresh") == 1
+    assert _Upstream.requests == 1
+    assert not list((tmp_path / "cache").glob("*.tmp"))
+
+
+def test_expired_copy_is_revalidated(upstream, monkeypatch):
+    path = _fetch(upstream)
+    monkeypatch.setattr(external_sources, "SOURCE_CACHE_TTL_S", 0)
+    before = _outcomes()
+    assert _fetch(upstream) == path
+    assert _delta(before, "revalidated") == 1
+    assert _Upstream.requests == 2
+    assert path.read_bytes() == BODY
+
+
+def test_stale_copy_is_served_when_upstream_fails(upstream, monkeypatch):
+    path = _fetch(upstream)
+    monkeypatch.setattr(external_sources, "SOURCE_CACHE_TTL_S", 0)
+    monkeypatch.setattr(_Upstream, "failing", True)
+    before = _outcomes()
+    assert _fetch(upstream) == path
+    assert _delta(before, "stale") == 1
+    assert path.read_bytes() == BODY
+
+
+def test_failure_without_a_cached_copy(upstream, monkeypatch, tmp_path):
+    monkeypatch.setattr(_Upstream, "failing", True)
+    with pytest.raises(SourceNotAvailable):
+        _fetch(upstream)
+    assert not list((tmp_path / "cache").glob("*"))
@@ -0,0 +1,76 @@
+import uuid
+
+import pytest
+
+from server import storage
+from server.database import get_cursor
+from server.legacy_import import import_legacy_attempts
+
+
+@pytest.fixture
+def log(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "ATTEMPTS_PATH", tmp_path / "attempts.jsonl")
+    monkeypatch.setattr(storage, "LOCK_PATH", tmp_path / "attempts.lock")
+    monkeypatch.setattr(storage, "INDEX_PATH", tmp_path / "attempts.idx.json")
+    monkeypatch.setattr(storage, "ATTEMPTS_FLUSH_MS", 0)
+    monkeypatch.setattr(storage, "_index", {})
+    return tmp_path
+
+
+def _append(user_id, count, start=0):
+    for n in range(start, start + count):
+        storage.append_attempt({
+            "user_id": user_id, "item_id": f"item-{n}", "lang": "en", "typed_text": "helo",
+            "target_text": "hello", "duration_ms": 1000 + n, "created_at": "2024-01-01T00:00:00Z",
+        })
+
+
+def _stored(user_id):
+    with get_cursor() as cursor:
+        cursor.execute("SELECT COUNT(*) AS n FROM attempts WHERE user_id = ?", (user_id,))
+        return cursor.fetchone()["n"]
+
+
+def _rotate():
+    with storage._FileLock(exclusive=True):
+        return storage._rotate()
+
+
+def test_resumes_from_checkpoint(log):
+    user_id = f"legacy-{uuid.uuid4().hex}"
+    _append(user_id, 10)
+    assert import_legacy_attempts()["imported"] == 10
+    _append(user_id, 5, start=10)
+    totals = import_legacy_attempts()
+    assert (totals["lines"], totals["imported"], totals["duplicates"]) == (5, 5, 0)
+    assert _stored(user_id) == 15
+
+
+def test_rotated_active_file_is_read_from_the_start(log):
+    user_id = f"legacy-{uuid.uuid4().hex}"
+    _append(user_id, 10)
+    assert import_legacy_attempts()["imported"] == 10
+
+    _rotate()
+    _append(user_id, 15, start=10)
+    totals = import_legacy_attempts()
+    # The sealed segment is re-read once (all duplicates); the new active file in full
+    assert totals["imported"] == 15
+    assert totals["duplicates"] == 10
+    assert _stored(user_id) == 25
+
+    totals = import_legacy_attempts()
+    assert (totals["lines"], totals["imported"]) == (0, 0)
+
+
+def test_gzipped_segment_keeps_its_checkpoint(log):
+    user_id = f"legacy-{uuid.uuid4().hex}"
+    _append(user_id, 10)
+    sealed = _rotate()
+    assert import_legacy_attempts()["imported"] == 10
+
+    storage._compress_segment(sealed)
+    assert not sealed.exists()
+    totals = import_legacy_attempts()
+    assert (totals["lines"], totals["imported"], totals["duplicates"]) == (0, 0, 0)
+    assert _stored(user_id) == 10
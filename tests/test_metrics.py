@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+from server import metrics
+from server.metrics import _MATCH, _levenshtein, _levenshtein_bitparallel, align, compute_metrics
+
+ALPHABETS = {
+    "ascii": "abcde ",
+    "cjk": "你好再见谢中国人",
+    # Astral-plane characters: emoji and CJK Extension B
+    "non_bmp": "😀😃🎉𠀀𠀁a",
+}
+
+
+def _random_pairs(alphabet, count, max_len, seed):
+    rng = random.Random(seed)
+    for _ in range(count):
+        a = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, max_len)))
+        b = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, max_len)))
+        yield a, b
+
+
+@pytest.mark.parametrize("alphabet", sorted(ALPHABETS))
+def test_bitparallel_matches_dp(alphabet):
+    for a, b in _random_pairs(ALPHABETS[alphabet], 300, 20, alphabet):
+        assert _levenshtein_bitparallel(a, b) == _levenshtein(a, b), (a, b)
+
+
+@pytest.mark.parametrize("alphabet", sorted(ALPHABETS))
+def test_bitparallel_matches_dp_beyond_one_word(alphabet):
+    # Longer than 64 characters, so the bitvector spans several machine words
+    for a, b in _random_pairs(ALPHABETS[alphabet], 40, 200, alphabet):
+        assert _levenshtein_bitparallel(a, b) == _levenshtein(a, b)
+    rng = random.Random(1)
+    target = "".join(rng.choice(ALPHABETS[alphabet]) for _ in range(150))
+    typed = target[:70] + target[71:120] + "x" + target[120:]
+    assert len(target) > 64
+    assert _levenshtein_bitparallel(typed, target) == _levenshtein(typed, target) == 2
+
+
+def test_distance_edge_cases():
+    for fn in (_levenshtein, _levenshtein_bitparallel):
+        assert fn("", "") == 0
+        assert fn("", "abc") == 3
+        assert fn("你好", "") == 2
+        assert fn("kitten", "sitting") == 3
+        assert fn("😀", "😃") == 1
+
+
+def _check_alignment(typed, target):
+    ops = align(typed, target)
+    assert "".join(tc for _, tc, _ in ops) == target
+    assert "".join(yc for _, _, yc in ops) == typed
+    assert sum(op != _MATCH for op, _, _ in ops) == _levenshtein(typed, target)
+
+
+def test_alignment_is_optimal():
+    for alphabet in ALPHABETS.values():
+        for typed, target in _random_pairs(alphabet, 100, 90, alphabet):
+            _check_alignment(typed, target)
+
+
+def test_alignment_is_optimal_when_split(monkeypatch):
+    monkeypatch.setattr(metrics, "ALIGN_CELL_LIMIT", 64)
+    for typed, target in _random_pairs(ALPHABETS["cjk"], 50, 120, "split"):
+        _check_alignment(typed, target)
+
+
+@pytest.mark.parametrize("engine", sorted(metrics.DISTANCE_ENGINES))
+def test_compute_metrics_engines_agree(monkeypatch, engine):
+    monkeypatch.setattr(metrics, "DISTANCE_ENGINE", engine)
+    result = compute_metrics("zh", "你好吗再见", "你好再见了", 6000)
+    assert result["cer"] == pytest.approx(2 / 5)
+    result = compute_metrics("en", "helo wrld", "hello world", 6000)
+    assert result["cer"] == pytest.approx(2 / 11)
@@ -0,0 +1,120 @@
+import json
+import os
+import threading
+
+from server import packs
+from server.binpack import write_binary_pack
+
+
+def _write_pack(root, pack_id, lines):
+    pd = root / pack_id
+    pd.mkdir(parents=True)
+    (pd / "metadata.json").write_text(json.dumps({"id": pack_id, "name": pack_id, "languages": ["en"]}))
+    (pd / "items.jsonl").write_text("".join(line + "\n" for line in lines), encoding="utf-8")
+    return pd
+
+
+def _item(n, tags=("a1",)):
+    return json.dumps({"id": f"item-{n}", "text": f"text {n}", "tags": list(tags)})
+
+
+def test_index_is_written_without_leftover_temp_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(packs, "PACKS_DIR", tmp_path)
+    pd = _write_pack(tmp_path, "p", [_item(n) for n in range(10)])
+    items = list(packs.get_pack_items("p", offset=8, limit=5))
+    assert [i["id"] for i in items] == ["item-8", "item-9"]
+    assert sorted(p.name for p in pd.iterdir()) == ["items.idx.json", "items.jsonl", "metadata.json"]
+
+
+def test_building_one_index_does_not_block_other_packs(tmp_path, monkeypatch):
+    monkeypatch.setattr(packs, "PACKS_DIR", tmp_path)
+    _write_pack(tmp_path, "slow", [_item(n) for n in range(5)])
+    _write_pack(tmp_path, "fast", [_item(n) for n in range(5)])
+
+    building = threading.Event()
+    release = threading.Event()
+    build = packs._build_index
+
+    def slow_build(f, stat):
+        if "slow" in f.name:
+            building.set()
+            release.wait(5)
+        return build(f, stat)
+
+    monkeypatch.setattr(packs, "_build_index", slow_build)
+    slow = threading.Thread(target=lambda: list(packs.get_pack_items("slow")))
+    slow.start()
+    try:
+        assert building.wait(5)
+        done = threading.Event()
+        fast = threading.Thread(target=lambda: (list(packs.get_pack_items("fast")), done.set()))
+        fast.start()
+        assert done.wait(2), "the fast pack waited for another pack's index build"
+        fast.join()
+    finally:
+        release.set()
+        slow.join()
+
+
+def test_non_finite_numbers_are_served_as_null(tmp_path, monkeypatch):
+    from server.binpack import write_binary_pack
+
+    monkeypatch.setattr(packs, "PACKS_DIR", tmp_path)
+    lines = [
+        _item(0),
+        '{"id": "item-1", "text": "x", "tags": ["a1"], "difficulty": {"score": NaN, "range": [1, -Infinity]}}',
+        "not json",
+        _item(2, tags=("b2",)),
+    ]
+    pd = _write_pack(tmp_path, "nan", lines)
+    expected = {"id": "item-1", "text": "x", "tags": ["a1"], "difficulty": {"score": None, "range": [1, None]}}
+
+    page = packs.get_pack_item_lines("nan")
+    assert len(page) == 3
+    assert json.loads(page[1]) == expected
+    assert [json.loads(line)["id"] for line in packs.get_pack_item_lines("nan", tag="a1")] == ["item-0", "item-1"]
+
+    # The sidecar index reloaded from disk serves the same lines
+    packs._index_cache.clear()
+    assert packs.get_pack_item_lines("nan") == page
+
+    write_binary_pack(pd / "items.jsonl", pd / packs.BINARY_NAME)
+    assert [json.loads(line) for line in packs.get_pack_item_lines("nan")] == [json.loads(line) for line in page]
+
+
+def test_pages_come_from_the_file_the_index_describes(tmp_path, monkeypatch):
+    monkeypatch.setattr(packs, "PACKS_DIR", tmp_path)
+    pd = _write_pack(tmp_path, "swap", [_item(n) for n in range(3)])
+    list(packs.get_pack_items("swap"))  # index the first version
+
+    # Replace items.jsonl between the index lookup and the reads
+    replacement = pd / "items.new"
+    replacement.write_text("".join(_item(n + 100, tags=("long-tag-" + "x" * n,)) + "\n" for n in range(5)))
+    load = packs._load_index
+
+    def swap_then_load(pack_id, f=None):
+        if replacement.exists():
+            os.replace(replacement, pd / "items.jsonl")
+        return load(pack_id, f)
+
+    monkeypatch.setattr(packs, "_load_index", swap_then_load)
+    ids = [json.loads(line)["id"] for line in packs.get_pack_item_lines("swap")]
+    assert ids == ["item-0", "item-1", "item-2"]
+    ids = [json.loads(line)["id"] for line in packs.get_pack_item_lines("swap")]
+    assert ids == [f"item-{n}" for n in range(100, 105)]
+
+
+def test_rebuilt_binary_pack_unmaps_the_old_one(tmp_path, monkeypatch):
+    monkeypatch.setattr(packs, "PACKS_DIR", tmp_path)
+    pd = _write_pack(tmp_path, "rebuilt", [_item(n) for n in range(3)])
+    write_binary_pack(pd / "items.jsonl", pd / packs.BINARY_NAME)
+    pages = packs.get_pack_items("rebuilt")
+    assert next(pages)["id"] == "item-0"  # holds the first map open
+    old = packs._binary_cache["rebuilt"][1]
+
+    (pd / "items.jsonl").write_text("".join(_item(n) + "\n" for n in range(5)), encoding="utf-8")
+    write_binary_pack(pd / "items.jsonl", pd / packs.BINARY_NAME)
+    assert len(packs.get_pack_item_lines("rebuilt")) == 5
+    assert not old._mm.closed
+    assert [i["id"] for i in pages] == ["item-1", "item-2"]
+    assert old._mm.closed
@@ -0,0 +1,39 @@
+import asyncio
+import threading
+
+from server import scoring
+
+
+def test_short_attempts_are_scored_off_the_event_loop(monkeypatch):
+    threads = []
+
+    def record(fn):
+        def wrapper(*args):
+            threads.append(threading.get_ident())
+            return fn(*args)
+        return wrapper
+
+    monkeypatch.setattr(scoring, "compute_metrics", record(scoring.compute_metrics))
+    monkeypatch.setattr(scoring, "compute_metrics_batch", record(scoring.compute_metrics_batch))
+
+    async def score():
+        single = await scoring.score_attempt("en", "helo", "hello", 1000)
+        batch = await scoring.score_batch([{"typed_text": "helo", "target_text": "hello", "duration_ms": 1000}])
+        return threading.get_ident(), single, batch
+
+    loop_thread, single, batch = asyncio.run(score())
+    assert len(threads) == 2
+    assert loop_thread not in threads
+    assert single["cer"] == batch[0]["cer"] == 0.2
+
+
+def test_pool_workers_are_not_forked_from_the_server(monkeypatch):
+    monkeypatch.setattr(scoring, "SCORING_WORKERS", 1)
+    monkeypatch.setattr(scoring, "SCORING_INLINE_CHARS", 10)
+    scoring.start_scoring_pool()
+    try:
+        assert scoring._pool._mp_context.get_start_method() in ("forkserver", "spawn")
+        metrics = asyncio.run(scoring.score_attempt("en", "helo world", "hello world", 1000))
+        assert metrics["cer"] == 1 / 11
+    finally:
+        scoring.shutdown_scoring_pool()
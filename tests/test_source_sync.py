@@ -0,0 +1,118 @@
+import asyncio
+import json
+
+import pytest
+
+from server import packs, source_sync
+
+
+def test_unexpected_errors_do_not_stop_the_loop(monkeypatch, tmp_path):
+    calls = []
+
+    async def failing_sync(source_id, limit=None):
+        calls.append(source_id)
+        raise OSError("disk full")
+
+    monkeypatch.setattr(source_sync, "JOB_LOCK_PATH", tmp_path / "source_sync.lock")
+    monkeypatch.setattr(source_sync, "configured_source_ids", lambda: ["a", "b"])
+    monkeypatch.setattr(source_sync, "sync_source", failing_sync)
+
+    async def run():
+        source_sync.start_source_sync(interval=0.01)
+        for _ in range(200):
+            if len(calls) >= 6:
+                break
+            await asyncio.sleep(0.01)
+        await source_sync.stop_source_sync()
+
+    asyncio.run(run())
+    # Every source is still tried, round after round
+    assert calls[:6] == ["a", "b"] * 3
+
+
+def test_stop_survives_a_failed_task(monkeypatch):
+    async def run():
+        async def broken():
+            raise RuntimeError("boom")
+
+        source_sync._sync_task = asyncio.get_running_loop().create_task(broken())
+        await asyncio.sleep(0)
+        await source_sync.stop_source_sync()
+        return source_sync._sync_task
+
+    assert asyncio.run(run()) is None
+
+
+PACK = {"id": "remote-demo", "name": "Demo", "languages": ["zh", "en"], "count": 0}
+
+
+def _items(*texts, translation="hi"):
+    return [{"id": f"tmp-{n}", "type": "word", "text": t, "translation": {"en": translation}} for n, t in enumerate(texts)]
+
+
+def _lines(pd):
+    return [json.loads(line) for line in (pd / "items.jsonl").read_text(encoding="utf-8").splitlines()]
+
+
+@pytest.fixture
+def packs_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(packs, "PACKS_DIR", tmp_path)
+    return tmp_path
+
+
+def test_applying_a_snapshot_twice_is_idempotent(packs_dir):
+    assert source_sync.apply_snapshot("demo", PACK, _items("你", "好")) == {"added": 2, "changed": 0, "total": 2}
+    pd = source_sync.remote_pack_dir("demo")
+    before = {p.name: p.read_bytes() for p in pd.iterdir()}
+
+    assert source_sync.apply_snapshot("demo", PACK, _items("你", "好")) == {"added": 0, "changed": 0, "total": 2}
+    assert {p.name: p.read_bytes() for p in pd.iterdir()} == before
+    assert [i["id"] for i in _lines(pd)] == ["demo-0001", "demo-0002"]
+
+
+def test_appends_and_rewrites_keep_ids(packs_dir):
+    source_sync.apply_snapshot("demo", PACK, _items("你", "好"))
+    counts = source_sync.apply_snapshot("demo", PACK, _items("好", "吗") + _items("你", translation="you"))
+    assert counts == {"added": 1, "changed": 1, "total": 3}
+    lines = _lines(source_sync.remote_pack_dir("demo"))
+    assert [(i["id"], i["text"]) for i in lines] == [("demo-0001", "你"), ("demo-0002", "好"), ("demo-0003", "吗")]
+    assert lines[0]["translation"] == {"en": "you"}
+    assert not list(source_sync.remote_pack_dir("demo").glob("*.tmp"))
+
+
+def test_crash_before_the_state_is_saved_does_not_duplicate_items(packs_dir):
+    source_sync.apply_snapshot("demo", PACK, _items("你"))
+    pd = source_sync.remote_pack_dir("demo")
+    old_state = (pd / source_sync.STATE_FILE).read_bytes()
+    source_sync.apply_snapshot("demo", PACK, _items("你", "好"))
+    # As if the process died after appending but before writing the state
+    (pd / source_sync.STATE_FILE).write_bytes(old_state)
+
+    assert source_sync.apply_snapshot("demo", PACK, _items("你", "好", "吗"))["added"] == 1
+    assert [i["id"] for i in _lines(pd)] == ["demo-0001", "demo-0002", "demo-0003"]
+
+
+def test_torn_append_is_discarded(packs_dir):
+    source_sync.apply_snapshot("demo", PACK, _items("你"))
+    pd = source_sync.remote_pack_dir("demo")
+    with (pd / "items.jsonl").open("a", encoding="utf-8") as f:
+        f.write('{"id": "demo-0002", "te')
+
+    assert source_sync.apply_snapshot("demo", PACK, _items("你", "好"))["added"] == 1
+    assert [(i["id"], i["text"]) for i in _lines(pd)] == [("demo-0001", "你"), ("demo-0002", "好")]
+
+
+def test_only_one_process_runs_a_round(monkeypatch, tmp_path):
+    monkeypatch.setattr(source_sync, "JOB_LOCK_PATH", tmp_path / "source_sync.lock")
+    calls = []
+
+    async def record(source_id, limit=None):
+        calls.append(source_id)
+
+    monkeypatch.setattr(source_sync, "configured_source_ids", lambda: ["a"])
+    monkeypatch.setattr(source_sync, "sync_source", record)
+    with source_sync._flock(source_sync.JOB_LOCK_PATH):
+        asyncio.run(source_sync._sync_round())
+    assert calls == []
+    asyncio.run(source_sync._sync_round())
+    assert calls == ["a"]
@@ -0,0 +1,26 @@
+import json
+import multiprocessing
+
+from server import storage
+
+
+def _save_many(index_path, users, rounds):
+    storage.INDEX_PATH = index_path
+    for _ in range(rounds):
+        index = {"active": {"ino": 1, "size": users, "users": {f"u{n}": [n] for n in range(users)}}, "sealed": {}}
+        storage._save_index(index)
+
+
+def test_concurrent_index_saves_never_interleave(tmp_path):
+    index_path = tmp_path / "attempts.idx.json"
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_save_many, args=(index_path, users, 50)) for users in (10, 2000, 5000)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    assert all(p.exitcode == 0 for p in procs)
+
+    index = json.loads(index_path.read_text(encoding="utf-8"))
+    assert len(index["active"]["users"]) == index["active"]["size"]
+    assert [p.name for p in tmp_path.iterdir()] == ["attempts.idx.json"]